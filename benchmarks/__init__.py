@@ -0,0 +1 @@
+"""Micro-benchmarks for the Context Graph prototype. Run modules with `python -m benchmarks.<name>`."""
@@ -0,0 +1,184 @@
+"""
+Local stand-in LLM endpoint for load tests, speaking the HTTPLLMInterface protocol:
+POST /v1/completions {"prompt", "model", "temperature"} -> {"text", "tokens"}.
+Each completion waits a time-to-first-token drawn from a latency distribution, then
+`tokens / tokens_per_sec` more to "generate" its answer.
+
+    python -m benchmarks.fake_llm_server --port 8765 --latency-dist lognormal --latency-mean 0.4
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DISTRIBUTIONS = ["constant", "uniform", "exponential", "lognormal"]
+
+
+def latency_sampler(dist: str, mean: float, sigma: float = 0.5, seed: int = 0) -> Callable[[], float]:
+    """Seconds-to-first-token sampler with the given mean; `sigma` shapes the lognormal tail."""
+    rng = random.Random(seed)
+    if dist == "constant":
+        return lambda: mean
+    if dist == "uniform":
+        return lambda: rng.uniform(0.0, 2.0 * mean)
+    if dist == "exponential":
+        return lambda: rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+    if dist == "lognormal":
+        mu = math.log(mean) - sigma ** 2 / 2 if mean > 0 else float("-inf")
+        return lambda: rng.lognormvariate(mu, sigma) if mean > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {dist}")
+
+
+def respond(prompt: str, answer_tokens: int = 32) -> str:
+    """Plausible answers for the prompt templates in llm_util: Y/N checks, listwise orders, free text."""
+    if "return 'Y'" in prompt:
+        return "Y"
+    if "The final order:" in prompt:
+        count = len(re.findall(r"^\[\d+\]", prompt, flags=re.MULTILINE))
+        return "The final order: [" + ", ".join(str(i + 1) for i in range(count)) + "]"
+    return " ".join(["answer"] * answer_tokens)
+
+
+class FakeLLMServer:
+    """Asyncio HTTP server; `start_in_thread` runs it on a private loop so sync load drivers can use it."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: Callable[[], float] = lambda: 0.0,
+                 tokens_per_sec: Optional[float] = None, answer_tokens: int = 32, max_concurrency: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.answer_tokens = answer_tokens
+        self.max_concurrency = max_concurrency
+        self.completions = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1/completions"
+
+    async def start(self):
+        if self.max_concurrency:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self) -> "FakeLLMServer":
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-llm", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+
+        async def shutdown():
+            self._server.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def _complete(self, prompt: str) -> Tuple[str, int]:
+        text = respond(prompt, self.answer_tokens)
+        tokens = len(text.split())
+        delay = self.latency()
+        if self.tokens_per_sec:
+            delay += tokens / self.tokens_per_sec
+        await asyncio.sleep(delay)
+        self.completions += 1
+        return text, tokens
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        status, payload = 200, {}
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers: Dict[str, str] = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            if request_line[:2] != ["POST", "/v1/completions"]:
+                status, payload = 404, {"error": "POST /v1/completions only"}
+            else:
+                prompt = json.loads(body)["prompt"]
+                if self._semaphore is not None:
+                    async with self._semaphore:
+                        text, tokens = await self._complete(prompt)
+                else:
+                    text, tokens = await self._complete(prompt)
+                payload = {"text": text, "tokens": tokens}
+        except (ValueError, KeyError, IndexError, asyncio.IncompleteReadError):
+            status, payload = 400, {"error": "expected a JSON body with a 'prompt' field"}
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-dist", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-mean", type=float, default=0.3, help="Mean seconds to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Lognormal shape (tail heaviness)")
+    parser.add_argument("--tokens-per-sec", type=float, default=None, help="Generation speed; unset for instant output")
+    parser.add_argument("--answer-tokens", type=int, default=32, help="Length of free-text answers")
+    parser.add_argument("--llm-max-concurrency", type=int, default=None, help="Completions served at once")
+
+
+def server_from_args(args: Any, host: str = "127.0.0.1", port: int = 0) -> FakeLLMServer:
+    return FakeLLMServer(host, port, latency_sampler(args.latency_dist, args.latency_mean, args.latency_sigma),
+                         tokens_per_sec=args.tokens_per_sec, answer_tokens=args.answer_tokens,
+                         max_concurrency=args.llm_max_concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in LLM HTTP server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, args.host, args.port)
+
+    async def serve():
+        await server.start()
+        print(f"Fake LLM listening on {server.url}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Serial versus concurrent LLM scoring in LLMRanker.rerank, using the offline FakeLLMInterface.
+
+    python -m benchmarks.llm_dispatch --candidates 20 --latency 0.2 --max-in-flight 16
+"""
+import argparse
+import time
+
+from graph import ContextGraph
+from llm_util import FakeLLMInterface
+from models import ContextNode, ContextEdge
+from ranker import LLMRanker
+from retriever import Neo4jRetriever
+
+
+def build_graph(n_candidates: int) -> ContextGraph:
+    graph = ContextGraph()
+    graph.add_node(ContextNode("H", "Hub"))
+    for i in range(n_candidates):
+        graph.add_node(ContextNode(f"T{i}", f"Tail {i}"))
+        graph.add_triplet_with_context(ContextEdge("H", "RELATED_TO", f"T{i}"))
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM dispatch micro-benchmark")
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per fake LLM call")
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    args = parser.parse_args()
+
+    retriever = Neo4jRetriever(build_graph(args.candidates))
+    candidates = [{"id": f"T{i}", "name": f"Tail {i}", "description": ""} for i in range(args.candidates)]
+
+    serial_llm = FakeLLMInterface(latency=args.latency)
+    started = time.perf_counter()
+    for cand in candidates:
+        for _ in range(2):  # the two CATS prompts per candidate, one after another
+            serial_llm.generate(f"({cand['name']})")
+    serial = time.perf_counter() - started
+
+    llm = FakeLLMInterface(latency=args.latency, max_in_flight=args.max_in_flight)
+    started = time.perf_counter()
+    LLMRanker(llm, retriever).rerank("hub", "H", candidates)
+    concurrent = time.perf_counter() - started
+
+    print(f"serial     {serial_llm.calls:4d} calls  {serial:.3f}s")
+    print(f"concurrent {llm.calls:4d} calls  {concurrent:.3f}s  speedup x{serial / concurrent:.1f}")
+
+
+if __name__ == "__main__":
+    main()
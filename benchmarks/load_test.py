@@ -0,0 +1,168 @@
+"""
+End-to-end load test: replays a query workload against MACERReasoner through HTTPLLMInterface,
+either closed-loop at a fixed concurrency or open-loop at a target QPS. Unless --llm-url is
+given, a local FakeLLMServer is started with the requested latency profile.
+
+    python -m benchmarks.load_test --edges 20000 --queries 200 --concurrency 16
+    python -m benchmarks.load_test --qps 20 --queries 400 --latency-dist lognormal --latency-mean 0.4
+    python -m benchmarks.load_test --backend neo4j --password your_password --skip-ingest --workload queries.txt
+
+Reports throughput, p50/p95/p99 latency, LLM calls per query and backend round trips per query.
+Open-loop latency is measured from each query's scheduled arrival, so queueing delay is included.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_llm_server import add_server_arguments, server_from_args
+from benchmarks.suite import summarize
+from benchmarks.synthetic import SyntheticGraphSpec, entity_label, load
+from graph import ContextGraph
+from graph_provider import GraphProvider
+from llm_util import HTTPLLMInterface
+from neo4j_provider import Neo4jContextGraph
+from reasoner import MACERReasoner
+
+
+def synthetic_workload(spec: SyntheticGraphSpec, n: int) -> List[str]:
+    """Entity-label queries spread over the id space of a synthetic graph."""
+    step = max(1, spec.entities // max(1, n))
+    return [entity_label((i * step) % spec.entities) for i in range(n)]
+
+
+def run_load(provider: GraphProvider, llm: HTTPLLMInterface, workload: List[str], n_queries: int,
+             concurrency: Optional[int] = None, qps: Optional[float] = None, max_workers: int = 256,
+             max_iterations: int = 3, ranking_mode: str = "pointwise") -> Dict[str, Any]:
+    """Runs `n_queries` queries (cycling through `workload`) closed-loop or open-loop; returns the report."""
+    if (concurrency is None) == (qps is None):
+        raise ValueError("Give exactly one of concurrency or qps")
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def run_one(i: int, arrival: float):
+        try:
+            MACERReasoner(provider, llm, max_iterations=max_iterations, ranking_mode=ranking_mode).reason(
+                workload[i % len(workload)])
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+            return
+        with lock:
+            latencies.append(time.perf_counter() - arrival)
+
+    llm_calls, round_trips = llm.calls, provider.round_trips
+    started = time.perf_counter()
+    if concurrency is not None:
+        counter = iter(range(n_queries))
+
+        def worker():
+            for i in counter:
+                run_one(i, time.perf_counter())
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for i in range(n_queries):
+                arrival = started + i / qps
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(run_one, i, arrival)
+    elapsed = time.perf_counter() - started
+
+    completed = len(latencies)
+    report = {
+        "mode": "closed" if concurrency is not None else "open",
+        "concurrency": concurrency,
+        "target_qps": qps,
+        "queries": n_queries,
+        "completed": completed,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "seconds": elapsed,
+        "throughput_qps": completed / elapsed if elapsed > 0 else None,
+        "llm_calls_per_query": (llm.calls - llm_calls) / n_queries,
+        "round_trips_per_query": (provider.round_trips - round_trips) / n_queries,
+    }
+    if latencies:
+        report["latency"] = summarize(latencies)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end MACER load test")
+    parser.add_argument("--backend", choices=["memory", "neo4j"], default="memory")
+    parser.add_argument("--uri", default="bolt://localhost:7687")
+    parser.add_argument("--user", default="neo4j")
+    parser.add_argument("--password", help="Neo4j password (required for --backend neo4j)")
+    parser.add_argument("--skip-ingest", action="store_true", help="Query the existing graph instead of loading one")
+    parser.add_argument("--edges", type=int, default=20_000, help="Synthetic graph size")
+    parser.add_argument("--workload", help="File with one query per line (default: synthetic entity labels)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries to run (the workload is cycled)")
+    load_shape = parser.add_mutually_exclusive_group()
+    load_shape.add_argument("--concurrency", type=int, help="Closed loop: queries in flight at all times (default 8)")
+    load_shape.add_argument("--qps", type=float, help="Open loop: query arrival rate")
+    parser.add_argument("--max-workers", type=int, default=256, help="Open loop: cap on concurrent queries")
+    parser.add_argument("--ranking-mode", choices=["pointwise", "listwise"], default="pointwise")
+    parser.add_argument("--llm-url", help="Existing completion endpoint; by default a local fake server is started")
+    parser.add_argument("--llm-max-in-flight", type=int, default=64, help="Client-side cap on concurrent LLM calls")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    if args.backend == "neo4j":
+        if not args.password:
+            parser.error("--password is required for --backend neo4j")
+        provider = Neo4jContextGraph(args.uri, args.user, args.password)
+    else:
+        provider = ContextGraph()
+        args.skip_ingest = False
+
+    spec = SyntheticGraphSpec(edges=args.edges)
+    if not args.skip_ingest:
+        provider.initialize_schema()
+        load(provider, spec)
+    if args.workload:
+        with open(args.workload) as f:
+            workload = [line.strip() for line in f if line.strip()]
+    else:
+        workload = synthetic_workload(spec, args.queries)
+
+    server = None
+    url = args.llm_url
+    if url is None:
+        server = server_from_args(args).start_in_thread()
+        url = server.url
+    llm = HTTPLLMInterface(url, max_in_flight=args.llm_max_in_flight)
+
+    try:
+        report = run_load(provider, llm, workload, args.queries,
+                          concurrency=None if args.qps is not None else (args.concurrency or 8),
+                          qps=args.qps, max_workers=args.max_workers, ranking_mode=args.ranking_mode)
+    finally:
+        if server is not None:
+            server.stop()
+        provider.close()
+    report.update({
+        "backend": args.backend,
+        "llm": {"url": url, "latency_dist": args.latency_dist, "latency_mean": args.latency_mean,
+                "tokens_per_sec": args.tokens_per_sec},
+    })
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
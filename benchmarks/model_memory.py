@@ -0,0 +1,142 @@
+"""
+Memory footprint of the model objects on a synthetic scale-free graph: the ContextNode/ContextEdge
+dataclasses versus the slotted CompactNode/CompactEdge and the immutable, context-sharing
+FrozenNode/FrozenEdge. Reports traced bytes per node and per edge, for the objects alone and
+inside a ContextGraph (adjacency, triplet map and label index included).
+
+Every measurement runs in a fresh interpreter, since a variant measured after another reuses
+the heap (freed arenas, interned strings) that one left behind and comes out cheaper; each
+figure is the median of `--repeats` such runs.
+
+    python -m benchmarks.model_memory --edges 200000 --repeats 5 --output memory.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic import SyntheticGraphSpec, entities, triplets
+from graph import ContextGraph
+from models import CompactEdge, CompactNode, ContextPool, FrozenEdge, FrozenNode
+
+VARIANTS = ["dataclass", "compact", "frozen"]
+
+
+def _traced(build: Callable[[], Any]) -> Dict[str, Any]:
+    """Runs `build` under tracemalloc; returns the bytes still held afterwards (and the result, kept alive)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        result = build()
+        seconds = time.perf_counter() - started
+        gc.collect()
+        held, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"bytes": held, "peak_bytes": peak, "seconds": seconds, "result": result}
+
+
+def _objects(spec: SyntheticGraphSpec, variant: str) -> Dict[str, Any]:
+    if variant == "dataclass":
+        to_node, to_edge = (lambda node: node), (lambda edge: edge)
+    elif variant == "compact":
+        to_node, to_edge = CompactNode.from_node, CompactEdge.from_edge
+    else:
+        pool = ContextPool()
+        to_node, to_edge = FrozenNode.from_node, (lambda edge: FrozenEdge.from_edge(edge, pool))
+    nodes = _traced(lambda: [to_node(node) for node in entities(spec)])
+    edges = _traced(lambda: [to_edge(edge) for edge, _ in triplets(spec)])
+    return {"bytes_per_node": nodes["bytes"] / spec.entities, "bytes_per_edge": edges["bytes"] / spec.edges,
+            "seconds": nodes["seconds"] + edges["seconds"]}
+
+
+def _graph(spec: SyntheticGraphSpec, variant: str, batch_size: int) -> Dict[str, Any]:
+    graph = ContextGraph(batch_size=batch_size, compact=variant == "compact", frozen=variant == "frozen")
+    nodes = _traced(lambda: graph.add_entities_bulk(entities(spec)))
+    edges = _traced(lambda: graph.add_triplets_bulk(edge for edge, _ in triplets(spec)))
+    report = {"bytes_per_node": nodes["bytes"] / spec.entities, "bytes_per_edge": edges["bytes"] / spec.edges,
+              "seconds": nodes["seconds"] + edges["seconds"]}
+    if graph._contexts is not None:
+        report["distinct_relation_contexts"] = len(graph._contexts)
+    return report
+
+
+def measure(spec: SyntheticGraphSpec, variant: str, batch_size: int = 1000) -> Dict[str, Any]:
+    """One variant's objects and graph figures, measured in the current process."""
+    return {"objects": _objects(spec, variant), "graph": _graph(spec, variant, batch_size)}
+
+
+def _isolated(spec: SyntheticGraphSpec, variant: str, batch_size: int) -> Dict[str, Any]:
+    """`measure` in a fresh interpreter, so nothing measured earlier shapes the heap."""
+    command = [sys.executable, "-m", "benchmarks.model_memory", "--measure", variant,
+               "--spec", json.dumps(asdict(spec)), "--batch-size", str(batch_size)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(command, capture_output=True, text=True, check=True, cwd=root)
+    return json.loads(result.stdout)
+
+
+def _median(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {key: statistics.median(row[key] for row in rows) for key in rows[0]}
+
+
+def run_benchmark(spec: SyntheticGraphSpec, variants: List[str] = VARIANTS, batch_size: int = 1000,
+                  repeats: int = 3) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"spec": {"edges": spec.edges, "entities": spec.entities, "seed": spec.seed},
+                              "repeats": repeats, "objects": {}, "graph": {}}
+    for variant in variants:
+        runs = [_isolated(spec, variant, batch_size) for _ in range(repeats)]
+        for scope in ("objects", "graph"):
+            report[scope][variant] = _median([run[scope] for run in runs])
+    if "dataclass" in variants:
+        for scope in ("objects", "graph"):
+            base = report[scope]["dataclass"]
+            for variant in variants:
+                row = report[scope][variant]
+                row["node_ratio"] = row["bytes_per_node"] / base["bytes_per_node"]
+                row["edge_ratio"] = row["bytes_per_edge"] / base["bytes_per_edge"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes per node and per edge for each model variant")
+    parser.add_argument("--edges", type=int, default=100_000)
+    parser.add_argument("--avg-degree", type=float, default=4.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=VARIANTS)
+    parser.add_argument("--repeats", type=int, default=3, help="Fresh-process runs per variant (median reported)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    # Internal: one in-process measurement for run_benchmark's child interpreters
+    parser.add_argument("--measure", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--spec", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        spec = SyntheticGraphSpec(**json.loads(args.spec))
+        sys.stdout.write(json.dumps(measure(spec, args.measure, args.batch_size)) + "\n")
+        return
+
+    spec = SyntheticGraphSpec(edges=args.edges, avg_degree=args.avg_degree, seed=args.seed)
+    report = run_benchmark(spec, args.variants, args.batch_size, args.repeats)
+    report.update({"python": platform.python_version(),
+                   "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())})
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
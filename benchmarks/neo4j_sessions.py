@@ -0,0 +1,65 @@
+"""
+Round-trip latency of Neo4jContextGraph reads: one session per call (the old `query` path)
+versus a request-scoped session with `execute_read`, plus streaming via `query_iter`.
+Requires a running Neo4j instance.
+
+    python -m benchmarks.neo4j_sessions --password your_password --iterations 500
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from neo4j_provider import Neo4jContextGraph
+
+PROBE = "MATCH (e:Entity) RETURN e.id AS id LIMIT 10"
+
+
+def _time_calls(fn: Callable[[], object], iterations: int) -> List[float]:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return timings
+
+
+def _summary(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "mean_ms": statistics.fmean(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+def run(provider: Neo4jContextGraph, iterations: int) -> Dict[str, Dict[str, float]]:
+    def session_per_call():
+        with provider.driver.session() as session:
+            return session.run(PROBE).data()
+
+    results = {"session_per_call": _summary(_time_calls(session_per_call, iterations))}
+    with provider.session_scope():
+        results["scoped_execute_read"] = _summary(_time_calls(lambda: provider.execute_read(PROBE), iterations))
+        results["scoped_query_iter"] = _summary(_time_calls(lambda: list(provider.query_iter(PROBE)), iterations))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neo4j session round-trip micro-benchmark")
+    parser.add_argument("--uri", default="bolt://localhost:7687")
+    parser.add_argument("--user", default="neo4j")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    provider = Neo4jContextGraph(args.uri, args.user, args.password)
+    try:
+        for mode, stats in run(provider, args.iterations).items():
+            print(f"{mode:22s} mean={stats['mean_ms']:.3f}ms p50={stats['p50_ms']:.3f}ms p95={stats['p95_ms']:.3f}ms")
+    finally:
+        provider.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Path search on synthetic graphs with high-degree hubs: bounded bidirectional PathFinder
+versus an unbounded one-directional BFS (what a `[*1..k]` expansion effectively does).
+
+    python -m benchmarks.path_search --entities 20000 --hubs 20 --hub-degree 2000
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from graph import ContextGraph
+from models import ContextNode, ContextEdge
+from path_search import PathFinder
+
+
+def build_hub_graph(n_entities: int, n_hubs: int, hub_degree: int, avg_degree: int, seed: int = 0) -> ContextGraph:
+    rng = random.Random(seed)
+    graph = ContextGraph()
+    graph.add_entities_bulk(ContextNode(f"E{i}", f"Entity {i}") for i in range(n_entities))
+    edges = []
+    for i in range(n_entities):
+        for _ in range(avg_degree):
+            edges.append(ContextEdge(f"E{i}", f"R{rng.randrange(20)}", f"E{rng.randrange(n_entities)}"))
+    for h in range(n_hubs):
+        for _ in range(hub_degree):
+            edges.append(ContextEdge(f"E{h}", "HUB_OF", f"E{rng.randrange(n_entities)}"))
+    graph.add_triplets_bulk(edges)
+    return graph
+
+
+def naive_bfs(graph: ContextGraph, head: str, tail: str, max_hops: int) -> int:
+    """Level-by-level expansion from the head only, with no fan-out cap; returns entities touched."""
+    seen = {head}
+    frontier = [head]
+    for _ in range(max_hops):
+        expansions = graph.expand_entities(frontier, fanout=10 ** 9)
+        nxt: List[str] = []
+        for node in frontier:
+            for hop in expansions[node]:
+                other = hop['tail'] if hop['head'] == node else hop['head']
+                if other not in seen:
+                    seen.add(other)
+                    nxt.append(other)
+        if tail in seen:
+            break
+        frontier = nxt
+    return len(seen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bidirectional path search benchmark")
+    parser.add_argument("--entities", type=int, default=20000)
+    parser.add_argument("--hubs", type=int, default=20)
+    parser.add_argument("--hub-degree", type=int, default=2000)
+    parser.add_argument("--avg-degree", type=int, default=3)
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--fanout", type=int, default=50)
+    args = parser.parse_args()
+
+    graph = build_hub_graph(args.entities, args.hubs, args.hub_degree, args.avg_degree)
+    rng = random.Random(1)
+    # Pairs anchored on hubs are the expensive case for unbounded expansion
+    pairs = [(f"E{rng.randrange(args.hubs)}", f"E{rng.randrange(args.entities)}") for _ in range(args.pairs)]
+
+    for max_hops in (2, 3, 4):
+        finder = PathFinder(graph, max_hops=max_hops, fanout=args.fanout)
+        started = time.perf_counter()
+        found = sum(1 for h, t in pairs if finder.find(h, t))
+        bounded = (time.perf_counter() - started) / len(pairs)
+
+        started = time.perf_counter()
+        touched = sum(naive_bfs(graph, h, t, max_hops) for h, t in pairs) / len(pairs)
+        naive = (time.perf_counter() - started) / len(pairs)
+        print(f"max_hops={max_hops} bidirectional={bounded * 1000:.2f}ms/pair ({found}/{len(pairs)} connected)  "
+              f"unbounded_bfs={naive * 1000:.2f}ms/pair ({touched:.0f} entities touched)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Storage and retrieval benchmark suite on a synthetic scale-free context graph.
+Scenarios: ingestion, label lookup, neighborhood expansion, path search, chunk search and
+full MACER runs with an offline fake LLM. Results are written as JSON for regression tracking.
+
+    python -m benchmarks.suite --edges 100000 --output results.json
+    python -m benchmarks.suite --backend neo4j --password your_password --edges 1000000
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.synthetic import SyntheticGraphSpec, entity_label, load
+from graph import ContextGraph
+from graph_provider import GraphProvider
+from llm_util import FakeLLMInterface
+from neo4j_provider import Neo4jContextGraph
+from path_search import PathFinder
+from reasoner import MACERReasoner
+
+SCENARIOS = ["ingestion", "label_lookup", "neighborhood", "path_search", "chunk_search", "macer"]
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "total_seconds": total,
+        "ops_per_sec": len(ordered) / total if total > 0 else float("inf"),
+        "mean_ms": statistics.fmean(ordered) * 1000.0,
+        "p50_ms": ordered[len(ordered) // 2] * 1000.0,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000.0,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000.0,
+    }
+
+
+def _time_each(fn: Callable[[Any], Any], inputs: Sequence[Any]) -> Dict[str, float]:
+    timings = []
+    for item in inputs:
+        started = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+def ingestion(provider: GraphProvider, spec: SyntheticGraphSpec, batch_size: int) -> Dict[str, Any]:
+    results = {}
+    for layer, batches in load(provider, spec, batch_size).items():
+        rows = sum(b["rows"] for b in batches)
+        seconds = sum(b["seconds"] for b in batches)
+        results[layer] = {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds if seconds > 0 else None,
+                          "batches": len(batches)}
+    return results
+
+
+def run_suite(provider: GraphProvider, spec: SyntheticGraphSpec, scenarios: Sequence[str] = SCENARIOS,
+              samples: int = 200, batch_size: int = 1000, llm_latency: float = 0.0) -> Dict[str, Any]:
+    """Loads the synthetic graph and runs the selected scenarios; returns the JSON-ready report."""
+    rng = random.Random(spec.seed + 1)
+    report: Dict[str, Any] = {"spec": dict(asdict(spec), entities=spec.entities, chunks=spec.chunks,
+                                            communities=spec.communities), "scenarios": {}}
+    results = report["scenarios"]
+    entity_ids = [f"E{rng.randrange(spec.entities)}" for _ in range(samples)]
+
+    # Ingestion always runs: it loads the graph the read scenarios query
+    provider.initialize_schema()
+    results["ingestion"] = ingestion(provider, spec, batch_size)
+
+    if "label_lookup" in scenarios:
+        # Two of the three label words: partial matches that need ranking
+        queries = [" ".join(entity_label(int(eid[1:])).split()[:2]) for eid in entity_ids]
+        results["label_lookup"] = _time_each(lambda q: provider.find_entities_by_label(q, 10), queries)
+
+    if "neighborhood" in scenarios:
+        seeds = [entity_ids[i:i + 8] for i in range(0, len(entity_ids), 8)]
+        results["neighborhood"] = {
+            f"k{k}": dict(_time_each(lambda ids: provider.get_neighborhoods(ids, k=k, per_hop_limit=50), seeds),
+                          seeds_per_call=8)
+            for k in (1, 2)
+        }
+
+    if "path_search" in scenarios:
+        finder = PathFinder(provider, max_hops=3, fanout=50)
+        pairs = list(zip(entity_ids, reversed(entity_ids)))[:max(1, samples // 4)]
+        results["path_search"] = _time_each(lambda pair: finder.find(*pair), pairs)
+
+    if "chunk_search" in scenarios:
+        texts = [f"{entity_label(int(eid[1:]))} rel {rng.randrange(spec.relations)}" for eid in entity_ids]
+        results["chunk_search"] = _time_each(lambda q: provider.search_chunks_vector(q, 5), texts)
+
+    if "macer" in scenarios:
+        llm = FakeLLMInterface(latency=llm_latency)
+        reasoner = MACERReasoner(provider, llm)
+        queries = [entity_label(int(eid[1:])) for eid in entity_ids[:max(1, samples // 10)]]
+        summary = _time_each(reasoner.reason, queries)
+        summary["llm_calls_per_query"] = llm.calls / len(queries)
+        results["macer"] = summary
+    return report
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic context graph benchmark suite")
+    parser.add_argument("--backend", choices=["memory", "neo4j"], default="memory")
+    parser.add_argument("--uri", default="bolt://localhost:7687")
+    parser.add_argument("--user", default="neo4j")
+    parser.add_argument("--password", help="Neo4j password (required for --backend neo4j)")
+    parser.add_argument("--edges", type=int, default=10_000)
+    parser.add_argument("--avg-degree", type=float, default=4.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--samples", type=int, default=200, help="Queries per read scenario")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake LLM call in MACER runs")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.backend == "neo4j":
+        if not args.password:
+            parser.error("--password is required for --backend neo4j")
+        provider = Neo4jContextGraph(args.uri, args.user, args.password, batch_size=args.batch_size)
+    else:
+        provider = ContextGraph(batch_size=args.batch_size)
+
+    spec = SyntheticGraphSpec(edges=args.edges, avg_degree=args.avg_degree, seed=args.seed)
+    try:
+        report = run_suite(provider, spec, args.scenarios, args.samples, args.batch_size, args.llm_latency)
+    finally:
+        provider.close()
+    report.update({
+        "backend": args.backend,
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    })
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+import logging
+from array import array
+from collections import deque
+from typing import List, Dict, Iterable, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from graph_provider import GraphProvider, batched
+from llm_util import LLMInterface
+from models import CommunityNode, ContextEdge
+from projection import ENTITY_REF
+from instrumentation import count, span
+from topology import row_positions
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("louvain", "label_propagation")
+
+EdgeInput = Union[ContextEdge, Tuple[str, str, str]]
+
+
+class Adjacency:
+    """
+    Undirected weighted graph in CSR arrays: the neighbors of node i are
+    `indices[indptr[i]:indptr[i + 1]]`. Parallel edges are merged into one weighted edge; after
+    aggregation a group's internal weight sits on its diagonal entry, so degrees always sum to 2m.
+    """
+    __slots__ = ("n", "indptr", "indices", "weights", "degrees", "total_weight")
+
+    def __init__(self, n: int, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray):
+        self.n = n
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.degrees = np.bincount(self.sources(), weights=weights, minlength=n)
+        self.total_weight = float(weights.sum())
+
+    @classmethod
+    def from_pairs(cls, n: int, heads: np.ndarray, tails: np.ndarray) -> "Adjacency":
+        """Symmetrized graph over `n` nodes from directed (head, tail) index pairs; self-loops are dropped."""
+        keep = heads != tails
+        heads, tails = heads[keep], tails[keep]
+        rows = np.concatenate([heads, tails])
+        cols = np.concatenate([tails, heads])
+        return cls._from_coo(n, rows, cols, np.ones(rows.size))
+
+    @classmethod
+    def _from_coo(cls, n: int, rows: np.ndarray, cols: np.ndarray, weights: np.ndarray) -> "Adjacency":
+        keys, inverse = np.unique(rows.astype(np.int64) * n + cols, return_inverse=True)
+        merged = np.bincount(inverse.ravel(), weights=weights, minlength=keys.size)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // n, minlength=n), out=indptr[1:])
+        return cls(n, indptr, (keys % n).astype(np.int32), merged)
+
+    def sources(self) -> np.ndarray:
+        """Row index of every stored entry."""
+        return np.repeat(np.arange(self.n), np.diff(self.indptr))
+
+    def neighbors(self, nodes: np.ndarray) -> np.ndarray:
+        positions, _ = row_positions(self.indptr, nodes)
+        return np.unique(self.indices[positions])
+
+    def aggregate(self, groups: np.ndarray, n_groups: int) -> "Adjacency":
+        """Graph whose nodes are the groups; the weight between two groups sums the edges between their members."""
+        return Adjacency._from_coo(n_groups, groups[self.sources()], groups[self.indices], self.weights)
+
+
+def label_propagation(adj: Adjacency, labels: Optional[np.ndarray] = None, active: Optional[np.ndarray] = None,
+                      max_iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Semi-synchronous weighted label propagation. Each round updates the active nodes in two
+    random halves; a node takes the label with the largest edge weight among its neighbors and
+    keeps its own on ties. After the first round only neighbors of nodes that changed are active,
+    so a run seeded with `active` stays within the region its changes reach.
+    """
+    rng = np.random.default_rng(seed)
+    labels = np.arange(adj.n) if labels is None else labels.copy()
+    active = np.arange(adj.n) if active is None else np.unique(active)
+    for _ in range(max_iterations):
+        if not active.size:
+            break
+        changed = np.concatenate([_propagate(adj, labels, half)
+                                  for half in np.array_split(rng.permutation(active), 2)])
+        if not changed.size:
+            break
+        active = adj.neighbors(changed)
+    return labels
+
+
+def _propagate(adj: Adjacency, labels: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """One synchronous update of `nodes` in place; returns the nodes whose label changed."""
+    positions, lengths = row_positions(adj.indptr, nodes)
+    sources = np.repeat(nodes, lengths)
+    neighbors = adj.indices[positions]
+    # Self-loops (a group's internal weight after aggregation) would only ever vote for the current label
+    keep = neighbors != sources
+    sources, neighbors, weights = sources[keep], neighbors[keep], adj.weights[positions][keep]
+    if not sources.size:
+        return sources
+    n = adj.n
+    keys, inverse = np.unique(sources.astype(np.int64) * n + labels[neighbors], return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=weights, minlength=keys.size)
+    node, label = keys // n, keys % n
+    # Per node: heaviest label first, then its own label, then the smallest label
+    order = np.lexsort((label, label != labels[node], -totals, node))
+    node, label = node[order], label[order]
+    first = np.ones(node.size, dtype=bool)
+    first[1:] = node[1:] != node[:-1]
+    node, label = node[first], label[first]
+    moved = labels[node] != label
+    labels[node] = label
+    return node[moved]
+
+
+def louvain_move(adj: Adjacency, communities: Optional[np.ndarray] = None, active: Optional[np.ndarray] = None,
+                 resolution: float = 1.0, seed: int = 0, max_rounds: int = 20) -> np.ndarray:
+    """
+    Louvain local moving phase with a node queue: each node joins the neighboring community with the
+    best modularity gain, and the neighbors of a node that moved are queued again. Starts from
+    `communities` (ids below `adj.n`, default singletons) with the `active` nodes queued (default all).
+    When the queue drains after any move, every node visited so far is swept again, up to `max_rounds`.
+    """
+    n = adj.n
+    comm = list(range(n)) if communities is None else communities.tolist()
+    if adj.total_weight == 0:
+        return np.asarray(comm, dtype=np.int64)
+    degree = adj.degrees.tolist()
+    tot = np.bincount(np.asarray(comm), weights=adj.degrees, minlength=n).tolist()
+    indptr, indices, weights = adj.indptr.tolist(), adj.indices.tolist(), adj.weights.tolist()
+    m2 = adj.total_weight
+    rng = np.random.default_rng(seed)
+    scope = np.arange(n) if active is None else np.unique(active)
+    queued = bytearray(n)
+    visited = bytearray(n)
+    moves = 0
+    for _ in range(max_rounds):
+        queue = deque(rng.permutation(scope).tolist())
+        for i in queue:
+            queued[i] = 1
+        round_moves = 0
+        while queue:
+            i = queue.popleft()
+            queued[i] = 0
+            visited[i] = 1
+            ci, ki = comm[i], degree[i]
+            links: Dict[int, float] = {}
+            for p in range(indptr[i], indptr[i + 1]):
+                j = indices[p]
+                if j != i:
+                    links[comm[j]] = links.get(comm[j], 0.0) + weights[p]
+            tot[ci] -= ki
+            scale = resolution * ki / m2
+            best, best_gain = ci, links.get(ci, 0.0) - tot[ci] * scale
+            for c, w in links.items():
+                gain = w - tot[c] * scale
+                if gain > best_gain + 1e-12:
+                    best, best_gain = c, gain
+            tot[best] += ki
+            if best != ci:
+                comm[i] = best
+                round_moves += 1
+                for p in range(indptr[i], indptr[i + 1]):
+                    j = indices[p]
+                    if not queued[j] and comm[j] != best:
+                        queued[j] = 1
+                        queue.append(j)
+        moves += round_moves
+        if not round_moves:
+            break
+        scope = np.flatnonzero(np.frombuffer(visited, dtype=np.uint8))
+    count("community_moves_total", moves)
+    return np.asarray(comm, dtype=np.int64)
+
+
+def _seed_labels(membership: np.ndarray, previous: np.ndarray, n_nodes: int) -> np.ndarray:
+    """
+    Initial labels for the nodes of one level from the previous run: each node (a group of entities)
+    takes the previous label most of its entities had; nodes made only of new entities (-1) start alone.
+    """
+    known = previous >= 0
+    width = int(previous.max()) + 1 if known.any() else 1
+    keys, votes = np.unique(membership[known].astype(np.int64) * width + previous[known], return_counts=True)
+    node, label = keys // width, keys % width
+    order = np.lexsort((label, -votes, node))
+    node, label = node[order], label[order]
+    first = np.ones(node.size, dtype=bool)
+    first[1:] = node[1:] != node[:-1]
+    seeded = np.full(n_nodes, -1, dtype=np.int64)
+    seeded[node[first]] = label[first]
+    fresh = np.flatnonzero(seeded < 0)
+    seeded[fresh] = -1 - np.arange(fresh.size)
+    return np.unique(seeded, return_inverse=True)[1].ravel()
+
+
+def cluster(adj: Adjacency, method: str = "louvain", levels: int = 2, resolution: float = 1.0, seed: int = 0,
+            max_iterations: int = 20, previous: Optional[List[np.ndarray]] = None,
+            affected: Optional[np.ndarray] = None) -> List[np.ndarray]:
+    """
+    Hierarchical clustering: level 0 clusters the nodes, every further level clusters the aggregated
+    graph of the level below. Returns per level the (0-based, dense) community of every node of `adj`;
+    stops early once a level merges nothing.
+
+    Incremental runs pass the `previous` per-level memberships (-1 for nodes added since) and the
+    `affected` nodes: those restart as singletons, every level starts from the previous partition,
+    and only the groups holding affected nodes and their neighbors are queued for moves.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown community detection method: {method}")
+    result: List[np.ndarray] = []
+    graph, membership = adj, np.arange(adj.n)
+    for level in range(levels):
+        start = active = None
+        if previous is not None and affected is not None and level < len(previous):
+            prior = previous[level].copy()
+            if level == 0:
+                prior[affected] = -1
+            start = _seed_labels(membership, prior, graph.n)
+            touched = np.unique(membership[affected])
+            active = np.union1d(touched, graph.neighbors(touched))
+            count("community_nodes_reclustered_total", active.size, level=level)
+        if method == "louvain":
+            labels = louvain_move(graph, start, active, resolution, seed, max_iterations)
+        else:
+            labels = label_propagation(graph, start, active, max_iterations, seed)
+        groups, labels = np.unique(labels, return_inverse=True)
+        labels = labels.ravel()
+        if level > 0 and groups.size == graph.n:
+            break
+        membership = labels[membership]
+        result.append(membership)
+        graph = graph.aggregate(labels, groups.size)
+    return result
+
+
+class CommunityDetector:
+    """
+    Community detection over the Entity-Triplet-Entity graph of any GraphProvider.
+    `detect` loads every hop and clusters from scratch; `update` adds new triplets and re-clusters only
+    the affected region: their endpoints restart as singletons, every level starts from the previous
+    partition and only groups around the change are queued. Community ids are carried over from the previous
+    partition by largest overlap, and `write` upserts through bulk PART_OF writes only the communities
+    whose membership changed (regenerating just their summaries) and deletes the ones that vanished.
+    The first `detect` reads back the communities an earlier run wrote under `id_prefix`, so ids and
+    summaries carry over across processes; incremental updates need the instance that ran `detect`.
+    """
+
+    def __init__(self, provider: GraphProvider, llm: Optional[LLMInterface] = None, method: str = "louvain",
+                 levels: int = 2, resolution: float = 1.0, min_size: int = 2, seed: int = 0,
+                 max_iterations: int = 20, id_prefix: str = "community", max_members: int = 20,
+                 max_facts: int = 20, batch_size: Optional[int] = None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown community detection method: {method}")
+        self.provider = provider
+        self.llm = llm
+        self.method = method
+        self.levels = levels
+        self.resolution = resolution
+        self.min_size = min_size
+        self.seed = seed
+        self.max_iterations = max_iterations
+        self.id_prefix = id_prefix
+        # Caps on what a summary is built from: highest-degree members and internal facts
+        self.max_members = max_members
+        self.max_facts = max_facts
+        self.batch_size = batch_size or getattr(provider, "batch_size", 1000)
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.relations: List[str] = []
+        self._relation_codes: Dict[str, int] = {}
+        self._heads, self._tails, self._rels = array("i"), array("i"), array("i")
+        self._edge_keys: Set[Tuple[int, int, int]] = set()
+        self.adjacency: Optional[Adjacency] = None
+        # Per level: community index of every entity, and the community id of every index
+        self.membership: List[np.ndarray] = []
+        self.names: List[List[str]] = []
+        self._next_id = 0
+        # Community id -> (level, members) as last written to the provider
+        self.written: Dict[str, Tuple[int, frozenset]] = {}
+
+    def _node(self, entity_id: str) -> int:
+        idx = self.index.get(entity_id)
+        if idx is None:
+            idx = self.index[entity_id] = len(self.ids)
+            self.ids.append(entity_id)
+        return idx
+
+    def _add_edges(self, edges: Iterable[EdgeInput]) -> List[int]:
+        """Appends unseen hops; returns the endpoints of the ones that were new."""
+        touched = []
+        for edge in edges:
+            head, relation, tail = edge if isinstance(edge, tuple) else (edge.head, edge.relation, edge.tail)
+            h, t = self._node(head), self._node(tail)
+            r = self._relation_codes.get(relation)
+            if r is None:
+                r = self._relation_codes[relation] = len(self.relations)
+                self.relations.append(relation)
+            if (h, r, t) in self._edge_keys:
+                continue
+            self._edge_keys.add((h, r, t))
+            self._heads.append(h)
+            self._tails.append(t)
+            self._rels.append(r)
+            touched += (h, t)
+        return touched
+
+    def _arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return (np.frombuffer(self._heads, dtype=np.int32), np.frombuffer(self._tails, dtype=np.int32),
+                np.frombuffer(self._rels, dtype=np.int32))
+
+    def detect(self) -> Dict[str, int]:
+        """Loads the whole entity graph from the provider and clusters it from scratch."""
+        with span("communities.detect", method=self.method) as s:
+            if not self.membership and not self.written:
+                self._load_written()
+            self._add_edges(self.provider.iter_entity_edges())
+            self._recluster(None)
+            s.set(entities=len(self.ids), levels=len(self.membership))
+        return self.summary()
+
+    def update(self, edges: Iterable[EdgeInput]) -> Dict[str, int]:
+        """Adds new hops (ContextEdges or (head, relation, tail) triples) and re-clusters the affected region."""
+        with span("communities.update", method=self.method) as s:
+            touched = self._add_edges(edges)
+            if not self.membership:
+                self._recluster(None)
+            elif touched:
+                self._recluster(np.unique(np.asarray(touched, dtype=np.int64)))
+            s.set(affected=len(set(touched)))
+        return self.summary()
+
+    def _load_written(self):
+        """Seeds `written` with the provider's communities under our id prefix, from an earlier run."""
+        prefix = f"{self.id_prefix}-"
+        for cid, level, members in self.provider.iter_communities():
+            if not cid.startswith(prefix):
+                continue
+            self.written[cid] = (level, frozenset(members))
+            serial = cid.rsplit("-", 1)[-1]
+            if serial.isdigit():
+                self._next_id = max(self._next_id, int(serial) + 1)
+
+    def _previous(self, level: int) -> Optional[Tuple[np.ndarray, List[str]]]:
+        """Community index of every entity at `level` in the last partition (-1 if none), and the ids."""
+        if level < len(self.membership):
+            return self.membership[level], self.names[level]
+        names = sorted(cid for cid, (lvl, _) in self.written.items() if lvl == level)
+        if not names:
+            return None
+        old = np.full(len(self.ids), -1, dtype=np.int64)
+        for g, cid in enumerate(names):
+            idx = [self.index[eid] for eid in self.written[cid][1] if eid in self.index]
+            old[idx] = g
+        return old, names
+
+    def _recluster(self, affected: Optional[np.ndarray]):
+        heads, tails, _ = self._arrays()
+        self.adjacency = Adjacency.from_pairs(len(self.ids), heads, tails)
+        previous = None
+        if affected is not None:
+            # Entities added since the last run have no previous community
+            grow = len(self.ids) - self.membership[0].size
+            previous = [np.concatenate([m, np.full(grow, -1, dtype=np.int64)]) for m in self.membership]
+        membership = cluster(self.adjacency, self.method, self.levels, self.resolution, self.seed,
+                             self.max_iterations, previous, affected)
+        self.names = [self._carry_ids(level, m) for level, m in enumerate(membership)]
+        self.membership = membership
+
+    def _carry_ids(self, level: int, membership: np.ndarray) -> List[str]:
+        """Names new communities after the previous community they overlap most, one name per community."""
+        n_groups = int(membership.max()) + 1 if membership.size else 0
+        names: List[Optional[str]] = [None] * n_groups
+        previous = self._previous(level)
+        if previous is not None:
+            old, old_names = previous
+            new = membership[:old.size]
+            known = old >= 0
+            n_old = len(old_names)
+            keys, overlap = np.unique(new[known].astype(np.int64) * n_old + old[known], return_counts=True)
+            used = set()
+            for i in np.argsort(-overlap, kind="stable"):
+                g_new, g_old = divmod(int(keys[i]), n_old)
+                if names[g_new] is None and g_old not in used:
+                    names[g_new] = old_names[g_old]
+                    used.add(g_old)
+        for g, name in enumerate(names):
+            if name is None:
+                names[g] = f"{self.id_prefix}-{level}-{self._next_id}"
+                self._next_id += 1
+        return names
+
+    def communities(self) -> Dict[str, Tuple[int, frozenset]]:
+        """Current communities of at least `min_size` entities: id -> (level, member entity ids)."""
+        result = {}
+        for level, (membership, names) in enumerate(zip(self.membership, self.names)):
+            order = np.argsort(membership, kind="stable")
+            bounds = np.flatnonzero(np.diff(membership[order])) + 1
+            for group in np.split(order, bounds):
+                if group.size >= self.min_size:
+                    result[names[membership[group[0]]]] = (level, frozenset(self.ids[i] for i in group.tolist()))
+        return result
+
+    def summary(self) -> Dict[str, int]:
+        stats = {"entities": len(self.ids), "edges": len(self._heads), "levels": len(self.membership)}
+        for level, membership in enumerate(self.membership):
+            stats[f"level_{level}_communities"] = int(membership.max()) + 1 if membership.size else 0
+        return stats
+
+    def write(self) -> Dict[str, int]:
+        """
+        Syncs the provider with the current partition: changed or new communities are upserted with
+        `replace_members` and fresh summaries, vanished ones are deleted, unchanged ones are not touched.
+        """
+        with span("communities.write") as s:
+            current = self.communities()
+            changed = [cid for cid, value in current.items() if self.written.get(cid) != value]
+            removed = [cid for cid in self.written if cid not in current]
+            labels, summaries = self._summarize({cid: current[cid] for cid in changed})
+            nodes = (CommunityNode(cid, labels[cid], summaries[cid], sorted(current[cid][1]), level=current[cid][0])
+                     for cid in changed)
+            self.provider.add_communities_bulk(nodes, self.batch_size, replace_members=True)
+            if removed:
+                self.provider.delete_communities(removed, self.batch_size)
+            self.written = current
+            count("communities_summarized_total", len(changed))
+            s.set(changed=len(changed), removed=len(removed))
+        logger.info("Communities: %d written (%d changed, %d removed)", len(current), len(changed), len(removed))
+        return {"communities": len(current), "changed": len(changed), "removed": len(removed),
+                "unchanged": len(current) - len(changed)}
+
+    def _summarize(self, communities: Dict[str, Tuple[int, frozenset]]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Labels and summaries for the given communities, from their top members and internal facts."""
+        if not communities:
+            return {}, {}
+        heads, tails, rels = self._arrays()
+        degree = self.adjacency.degrees
+        top: Dict[str, List[int]] = {}
+        facts: Dict[str, List[Tuple[int, int, int]]] = {}
+        internal_by_level: Dict[int, Dict[int, np.ndarray]] = {}
+        for cid, (level, members) in communities.items():
+            membership = self.membership[level]
+            if level not in internal_by_level:
+                # Edges inside a community at this level, grouped by community
+                internal = np.flatnonzero(membership[heads] == membership[tails])
+                internal = internal[np.argsort(membership[heads[internal]], kind="stable")]
+                groups = membership[heads[internal]]
+                bounds = np.flatnonzero(np.diff(groups)) + 1
+                internal_by_level[level] = {int(groups[start]): part[:self.max_facts]
+                                            for start, part in zip(np.r_[0, bounds], np.split(internal, bounds))
+                                            if part.size}
+            idx = np.fromiter((self.index[eid] for eid in members), dtype=np.int64, count=len(members))
+            top[cid] = idx[np.argsort(-degree[idx], kind="stable")[:self.max_members]].tolist()
+            part = internal_by_level[level].get(int(membership[idx[0]]), np.empty(0, dtype=np.int64))
+            facts[cid] = list(zip(heads[part].tolist(), rels[part].tolist(), tails[part].tolist()))
+
+        needed = {i for ids in top.values() for i in ids}
+        needed.update(i for fs in facts.values() for h, _, t in fs for i in (h, t))
+        names: Dict[int, str] = {}
+        for batch in batched(sorted(needed), self.batch_size):
+            for entity in self.provider.get_entities([self.ids[i] for i in batch], fields=ENTITY_REF):
+                names[self.index[entity["id"]]] = entity.get("label") or entity["id"]
+
+        labels, summaries, prompts = {}, {}, {}
+        for cid, (level, members) in communities.items():
+            member_labels = [names.get(i, self.ids[i]) for i in top[cid]]
+            fact_lines = [f"({names.get(h, self.ids[h])}, {self.relations[r]}, {names.get(t, self.ids[t])})"
+                          for h, r, t in facts[cid]]
+            labels[cid] = " / ".join(member_labels[:3])
+            if self.llm is not None:
+                prompts[cid] = self.llm.build_community_summary_prompt(member_labels, fact_lines)
+            else:
+                relation_names = list(dict.fromkeys(self.relations[r] for _, r, _ in facts[cid]))
+                summaries[cid] = (f"{len(members)} entities including {', '.join(member_labels[:5])}."
+                                  + (f" Relations: {', '.join(relation_names[:5])}." if relation_names else ""))
+        if prompts:
+            for cid, text in zip(prompts, self.llm.generate_many(list(prompts.values()))):
+                summaries[cid] = text.strip()
+        return labels, summaries
@@ -0,0 +1,140 @@
+import json
+import math
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterator, Optional, Set
+from label_index import tokenize
+
+
+def estimate_tokens(text: str) -> int:
+    """Whitespace tokens: a tokenizer-free approximation of prompt tokens."""
+    return len(text.split())
+
+
+def _text_values(record: Dict[str, Any]) -> Iterator[str]:
+    for key, value in record.items():
+        if key in ("metadata", "attributes", "provenance") and isinstance(value, str):
+            # JSON-encoded maps: index their values, not their syntax
+            try:
+                value = json.loads(value)
+            except ValueError:
+                yield value
+                continue
+        if isinstance(value, dict):
+            yield from (str(v) for v in value.values() if isinstance(v, (str, int, float)))
+        elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            yield str(value)
+        elif isinstance(value, list):
+            yield from (str(v) for v in value if isinstance(v, (str, int, float)))
+
+
+@dataclass
+class ContextEntry:
+    """One gathered triplet with its attachments and its normalized text, computed once on insert."""
+    tid: str
+    row: Dict[str, Any]
+    order: int
+    text: str
+    terms: Set[str]
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+    communities: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def fact(self) -> str:
+        return f"({self.row['e'].get('label')}, {self.row['tr'].get('relation')}, {self.row['tail'].get('label')})"
+
+
+class ContextStore:
+    """
+    Evidence gathered during one MACER run, keyed by triplet id so repeated rows are stored once.
+    Each entry's lowercased text and terms are computed on insert and indexed incrementally, so the
+    reflector's sufficiency check only scans entries added since it last asked, and `pack` ranks
+    evidence by IDF-weighted overlap with the query to fit a token budget.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, ContextEntry] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        # phrase -> (entries scanned so far, matched); entries are append-only, so scans resume
+        self._phrases: Dict[str, List[Any]] = {}
+        self._order: List[str] = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, tid: str) -> bool:
+        return tid in self.entries
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        """Adds a neighborhood row ({'e', 'tr', 'tail', 'chunks'?, 'communities'?}); False if already present."""
+        tid = row['tr']['id']
+        if tid in self.entries:
+            return False
+        chunks = row.get('chunks') or []
+        communities = row.get('communities') or []
+        parts = []
+        for record in (row['e'], row['tr'], row['tail'], *chunks, *communities):
+            parts.extend(_text_values(record))
+        text = " ".join(parts).lower()
+        terms = set(tokenize(text))
+        self.entries[tid] = ContextEntry(tid, row, len(self._order), text, terms, chunks, communities)
+        self._order.append(tid)
+        for term in terms:
+            self._postings.setdefault(term, set()).add(tid)
+        return True
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Gathered rows in insertion order."""
+        return [self.entries[tid].row for tid in self._order]
+
+    def contains(self, phrase: str) -> bool:
+        """Whether any entry's text contains `phrase` (case-insensitive)."""
+        phrase = phrase.lower()
+        state = self._phrases.setdefault(phrase, [0, False])
+        if not state[1]:
+            for tid in self._order[state[0]:]:
+                if phrase in self.entries[tid].text:
+                    state[1] = True
+                    break
+            state[0] = len(self._order)
+        return state[1]
+
+    def _relevance(self, entry: ContextEntry, query_terms: Set[str]) -> float:
+        n = len(self.entries)
+        return sum(math.log(1.0 + n / len(self._postings[t])) for t in query_terms & entry.terms)
+
+    def ranked(self, query: str) -> List[ContextEntry]:
+        """Entries by relevance to `query`, ties in insertion order."""
+        query_terms = set(tokenize(query))
+        return sorted(self.entries.values(), key=lambda e: (-self._relevance(e, query_terms), e.order))
+
+    def pack(self, query: str, token_budget: Optional[int] = None) -> str:
+        """
+        Materials for the answer prompt, most relevant first: each fact followed by its evidence
+        chunks and, once per community, the community summary. Items that would exceed
+        `token_budget` are skipped; chunks and summaries are never repeated.
+        """
+        lines: List[str] = []
+        used = 0
+        seen_chunks: Set[str] = set()
+        seen_communities: Set[str] = set()
+
+        def fits(line: str) -> bool:
+            nonlocal used
+            cost = estimate_tokens(line)
+            if token_budget is not None and used + cost > token_budget:
+                return False
+            used += cost
+            lines.append(line)
+            return True
+
+        for entry in self.ranked(query):
+            if not fits(f"- {entry.fact}"):
+                continue
+            for chunk in entry.chunks:
+                if chunk.get('id') not in seen_chunks and fits(f"  Evidence: {chunk.get('content', '')}"):
+                    seen_chunks.add(chunk.get('id'))
+            for community in entry.communities:
+                if community.get('id') not in seen_communities and \
+                        fits(f"  Community {community.get('label')}: {community.get('summary', '')}"):
+                    seen_communities.add(community.get('id'))
+        return "\n".join(lines)
@@ -0,0 +1,169 @@
+import json
+import os
+import zlib
+from typing import List, Dict, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from label_index import TOKEN_PATTERN
+
+
+class Embedder(Protocol):
+    """Maps texts to L2-normalized float32 vectors of a fixed dimension."""
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+class HashingEmbedder:
+    """
+    Offline default embedder: signed feature hashing of word unigrams and bigrams with
+    sublinear TF weighting. Needs no model download and is stable across processes.
+    """
+
+    def __init__(self, dim: int = 256, bigrams: bool = True):
+        self.dim = dim
+        self.bigrams = bigrams
+
+    def _features(self, text: str) -> List[str]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if self.bigrams:
+            tokens = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return tokens
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts: Dict[int, float] = {}
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                slot = h % self.dim
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                counts[slot] = counts.get(slot, 0.0) + sign
+            for slot, value in counts.items():
+                out[row, slot] = np.sign(value) * (1.0 + np.log(abs(value))) if value else 0.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+class VectorIndex:
+    """
+    Dense chunk vectors in a growable float32 matrix with vectorized top-k cosine search.
+    Vectors are stored L2-normalized, so cosine similarity is a single matrix-vector product.
+    `build_ivf` adds an optional IVF-style coarse quantizer for large corpora, and `save`/`load`
+    persist the matrix as .npy so it can be memory-mapped read-only.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self.ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments: Optional[np.ndarray] = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._matrix[:len(self.ids)]
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self._matrix.shape[0] and self._matrix.flags.writeable:
+            return
+        grown = np.zeros((max(needed, 2 * self._matrix.shape[0], 1), self.dim), dtype=np.float32)
+        grown[:len(self.ids)] = self.vectors
+        self._matrix = grown
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors.reshape(-1, vectors.shape[-1])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def add_many(self, ids: Sequence[str], vectors: np.ndarray):
+        """Upserts vectors; existing ids are overwritten in place."""
+        vectors = self._normalize(vectors)
+        self._ensure_capacity(len(self.ids) + len(ids))
+        rows = []
+        for item_id in ids:
+            pos = self._positions.get(item_id)
+            if pos is None:
+                pos = len(self.ids)
+                self._positions[item_id] = pos
+                self.ids.append(item_id)
+            rows.append(pos)
+        self._matrix[rows] = vectors
+        if self._centroids is not None:
+            assignments = np.argmax(vectors @ self._centroids.T, axis=1)
+            if len(self._assignments) < len(self.ids):
+                self._assignments = np.resize(self._assignments, len(self.ids))
+            self._assignments[rows] = assignments
+
+    def add(self, item_id: str, vector: np.ndarray):
+        self.add_many([item_id], np.asarray(vector).reshape(1, -1))
+
+    def build_ivf(self, n_lists: Optional[int] = None, n_iter: int = 10, seed: int = 0):
+        """Clusters the vectors with spherical k-means; searches then probe only the nearest lists."""
+        n = len(self.ids)
+        if n == 0:
+            return
+        n_lists = min(n, n_lists or max(1, int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        data = self.vectors
+        centroids = data[rng.choice(n, n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = data[assignments == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = self._normalize(centroids)
+        self._centroids = centroids
+        self._assignments = np.argmax(data @ centroids.T, axis=1)
+
+    def search(self, query: np.ndarray, k: int = 5, n_probe: int = 4) -> List[Tuple[str, float]]:
+        """Top-k (id, cosine) pairs, best first. Uses the IVF lists when `build_ivf` has run."""
+        n = len(self.ids)
+        if n == 0 or k <= 0:
+            return []
+        q = self._normalize(np.asarray(query).reshape(1, -1))[0]
+        if self._centroids is not None:
+            lists = np.argsort(-(self._centroids @ q))[:n_probe]
+            candidates = np.flatnonzero(np.isin(self._assignments[:n], lists))
+            scores = self.vectors[candidates] @ q
+        else:
+            candidates = None
+            scores = self.vectors @ q
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = candidates[top] if candidates is not None else top
+        return [(self.ids[r], float(s)) for r, s in zip(rows, scores[top])]
+
+    def save(self, path: str):
+        """Writes `<path>.npy` (vectors) and `<path>.ids.json`."""
+        np.save(f"{path}.npy", self.vectors)
+        with open(f"{path}.ids.json", "w") as f:
+            json.dump(self.ids, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorIndex":
+        """Opens a saved index; with `mmap` the matrix stays on disk and is paged in on demand."""
+        matrix = np.load(f"{path}.npy", mmap_mode="r" if mmap else None)
+        with open(f"{path}.ids.json") as f:
+            ids = json.load(f)
+        index = cls(matrix.shape[1], capacity=0)
+        index._matrix = matrix
+        index.ids = ids
+        index._positions = {item_id: i for i, item_id in enumerate(ids)}
+        return index
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(f"{path}.npy") and os.path.exists(f"{path}.ids.json")
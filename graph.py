@@ -1,25 +1,143 @@
-from typing import List, Dict, Optional, Any
-from models import ContextNode, ContextEdge, EntityContext, RelationContext
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
+from models import (ContextNode, ContextEdge, EntityContext, RelationContext, ChunkNode, CommunityNode, triplet_id,
+                    CompactNode, CompactEdge, FrozenNode, FrozenEdge, ContextPool, entity_properties, chunk_properties, community_properties, triplet_properties)
+from graph_provider import TripletInput, neighborhood_rows, run_batches
+from projection import FULL, Fields, Projection, chunk_record, entity_record, triplet_record
+from temporal import IntervalIndex, TimeWindow
+from topology import TopologyIndex
+from label_index import LabelIndex
+from embeddings import Embedder, HashingEmbedder, VectorIndex
+from instrumentation import count
 
 class ContextGraph:
-    """An in-memory graph storage for entities and relations with context."""
-    
-    def __init__(self):
+    """
+    An in-memory graph storage for entities and relations with context.
+    Implements the GraphProvider interface, so the whole MACER loop can run in-process.
+    """
+    # Writes live only as long as the process (see ingest checkpoints)
+    persistent = False
+
+    def __init__(self, batch_size: int = 1000, embedder: Optional[Embedder] = None, compact: bool = False,
+                 frozen: bool = False):
+        # compact: store nodes/edges as slotted CompactNode/CompactEdge; frozen: as immutable
+        # FrozenNode/FrozenEdge with equal relation contexts shared (see models, "Compact variants")
+        self._node_type = FrozenNode if frozen else CompactNode if compact else None
+        self._edge_type = FrozenEdge if frozen else CompactEdge if compact else None
+        self._contexts = ContextPool() if frozen else None
         self.nodes: Dict[str, ContextNode] = {}
         # adjacency list: head_id -> [ContextEdge]
         self.edges: Dict[str, List[ContextEdge]] = {}
+        self.batch_size = batch_size
+        # Reified triplets (triplet id -> edge) and their incoming adjacency: tail_id -> [ContextEdge]
+        self.triplets: Dict[str, ContextEdge] = {}
+        self._in_edges: Dict[str, List[ContextEdge]] = {}
+        self.chunks: Dict[str, ChunkNode] = {}
+        self.communities: Dict[str, CommunityNode] = {}
+        # EVIDENCE_IN links (triplet id -> chunk ids) and PART_OF links (entity id -> community ids)
+        self.evidence: Dict[str, List[str]] = {}
+        self.memberships: Dict[str, List[str]] = {}
+        # The same PART_OF links by community: community id -> entity ids
+        self.members: Dict[str, List[str]] = {}
+        self.label_index = LabelIndex()
+        # Interval tree over triplet validity, built on first time-window query (see temporal_index)
+        self._temporal: Optional[IntervalIndex] = None
+        # CSR adjacency over entity/relation codes, built on first use (see topology)
+        self._topology: Optional[TopologyIndex] = None
+        # The columnar snapshot behind nodes/edges/triplets when opened with snapshot.load_snapshot
+        self.snapshot = None
+        self.embedder = embedder or HashingEmbedder()
+        self.chunk_index = VectorIndex(self.embedder.dim)
+        # Bumped on every write so read-side caches can tell they are stale
+        self.generation = 0
+        # Provider calls that would each be one Neo4j round trip, for load reports comparable across backends
+        self.round_trips = 0
+        self._round_trip_lock = threading.Lock()
 
     def add_node(self, node: ContextNode):
         """Adds a node to the graph."""
+        self.generation += 1
+        if self._node_type is not None:
+            node = self._node_type.from_node(node)
         self.nodes[node.entity_id] = node
+        self.label_index.add(node.entity_id, node.label)
         if node.entity_id not in self.edges:
             self.edges[node.entity_id] = []
+            self._in_edges[node.entity_id] = []
+        if self._topology is not None:
+            self._topology.add_node(node.entity_id)
 
     def add_edge(self, edge: ContextEdge):
         """Adds a directed edge between two nodes."""
         if edge.head not in self.nodes or edge.tail not in self.nodes:
             raise ValueError("Both head and tail nodes must exist in the graph.")
-        self.edges[edge.head].append(edge)
+        self.generation += 1
+        if self._edge_type is not None:
+            edge = self._edge_type.from_edge(edge, self._contexts)
+        tid = triplet_id(edge)
+        existing = self.triplets.get(tid)
+        if existing is not None:
+            # Same (h, r, t): replace the context in place, like MERGE on the Triplet node
+            self.edges[edge.head][self.edges[edge.head].index(existing)] = edge
+            self._in_edges[edge.tail][self._in_edges[edge.tail].index(existing)] = edge
+        else:
+            self.edges[edge.head].append(edge)
+            self._in_edges[edge.tail].append(edge)
+            if self._topology is not None:
+                self._topology.add_edge(edge.head, edge.relation, edge.tail)
+        self.triplets[tid] = edge
+        if self._temporal is not None:
+            self._temporal.add(tid, edge.context.interval)
+
+    @property
+    def temporal_index(self) -> IntervalIndex:
+        """Triplet id -> validity interval tree; built from all triplets on first use, then kept current by add_edge."""
+        if self._temporal is None:
+            index = IntervalIndex()
+            for tid, edge in self.triplets.items():
+                index.add(tid, edge.context.interval)
+            self._temporal = index
+        return self._temporal
+
+    @property
+    def topology(self) -> TopologyIndex:
+        """
+        Bidirectional CSR index of the entity graph for vectorized neighbors/in_neighbors/k_hop and degree
+        queries; built from the node and triplet dicts on first use, then fed by add_node/add_edge and
+        merged lazily, so a bulk insert is folded in once on the next read.
+        """
+        if self._topology is None:
+            if self.snapshot is None:
+                self._topology = TopologyIndex.build(self.nodes, self.triplets.values())
+            else:
+                # Codes and CSR rows come from the snapshot columns; only this process's writes are decoded
+                index = TopologyIndex.from_snapshot(self.snapshot)
+                for entity_id in self.nodes.added():
+                    index.add_node(entity_id)
+                for tid in self.triplets.added():
+                    edge = self.triplets[tid]
+                    index.add_edge(edge.head, edge.relation, edge.tail)
+                self._topology = index
+        return self._topology
+
+    def neighbors(self, entity_ids: List[str], relations: Optional[List[str]] = None) -> List[str]:
+        """Distinct tail ids of the entities' outgoing triplets (optionally only the given relations)."""
+        topo = self.topology
+        codes = topo.relation_codes(relations) if relations is not None else None
+        return topo.decode(topo.neighbors(topo.encode(entity_ids), codes))
+
+    def in_neighbors(self, entity_ids: List[str], relations: Optional[List[str]] = None) -> List[str]:
+        """Distinct head ids of the entities' incoming triplets."""
+        topo = self.topology
+        codes = topo.relation_codes(relations) if relations is not None else None
+        return topo.decode(topo.in_neighbors(topo.encode(entity_ids), codes))
+
+    def k_hop(self, entity_ids: List[str], k: int, direction: str = "out") -> Dict[str, int]:
+        """Entities within `k` hops ("out", "in" or "both") of the seeds -> hop distance, nearest first."""
+        topo = self.topology
+        nodes, hops = topo.k_hop(topo.encode(entity_ids), k, direction)
+        return dict(zip(topo.decode(nodes), hops.tolist()))
 
     def get_node(self, entity_id: str) -> Optional[ContextNode]:
         """Retrieves a node by its ID."""
@@ -29,9 +147,13 @@ class ContextGraph:
         """Retrieves all outgoing edges from a node."""
         return self.edges.get(entity_id, [])
 
-    def search_by_label(self, label: str) -> List[ContextNode]:
-        """Simple label-based search for entities."""
-        return [node for node in self.nodes.values() if label.lower() in node.label.lower()]
+    def get_incoming_edges(self, entity_id: str) -> List[ContextEdge]:
+        """Retrieves all incoming edges of a node."""
+        return self._in_edges.get(entity_id, [])
+
+    def search_by_label(self, label: str, limit: int = 10) -> List[ContextNode]:
+        """Case-insensitive label search, ranked by the label index (best match first)."""
+        return [self.nodes[eid] for eid, _ in self.label_index.search(label, limit)]
 
     def get_triples_with_context(self, entity_id: str) -> List[Dict[str, Any]]:
         """Returns triples (h, r, t) with their full context for reasoning."""
@@ -39,7 +161,7 @@ class ContextGraph:
         head_node = self.nodes.get(entity_id)
         if not head_node:
             return []
-            
+
         for edge in self.get_outgoing_edges(entity_id):
             tail_node = self.nodes.get(edge.tail)
             results.append({
@@ -49,3 +171,241 @@ class ContextGraph:
                 "context": edge.context
             })
         return results
+
+    # --- GraphProvider interface ---
+
+    def close(self):
+        pass
+
+    def initialize_schema(self):
+        """Nothing to provision in memory."""
+        pass
+
+    def _count_round_trip(self):
+        with self._round_trip_lock:
+            self.round_trips += 1
+        count("backend_round_trips_total", backend="memory")
+
+    @contextmanager
+    def session_scope(self):
+        """No sessions in memory; provided for interface parity with Neo4jContextGraph."""
+        yield self
+
+    def add_entities_bulk(self, nodes: Iterable[ContextNode], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        def write(batch: List[ContextNode]):
+            self._count_round_trip()
+            for node in batch:
+                self.add_node(node)
+        return run_batches(nodes, batch_size or self.batch_size, write)
+
+    def add_chunks_bulk(self, chunks: Iterable[ChunkNode], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        def write(batch: List[ChunkNode]):
+            self._count_round_trip()
+            self.generation += 1
+            for chunk in batch:
+                self.chunks[chunk.chunk_id] = chunk
+            self.chunk_index.add_many([c.chunk_id for c in batch], self.embedder.embed([c.content for c in batch]))
+        return run_batches(chunks, batch_size or self.batch_size, write)
+
+    def add_communities_bulk(self, communities: Iterable[CommunityNode], batch_size: Optional[int] = None,
+                             replace_members: bool = False) -> List[Dict[str, Any]]:
+        """
+        Upserts communities and their PART_OF links. With `replace_members` the links of entities
+        no longer listed are dropped, so a re-clustered community ends up with exactly its new members.
+        """
+        def write(batch: List[CommunityNode]):
+            self._count_round_trip()
+            self.generation += 1
+            for community in batch:
+                mid = community.community_id
+                self.communities[mid] = community
+                members = self.members.setdefault(mid, [])
+                if replace_members:
+                    keep = set(community.entities)
+                    for entity_id in members:
+                        if entity_id not in keep:
+                            self.memberships[entity_id].remove(mid)
+                    members[:] = [eid for eid in members if eid in keep]
+                linked = set(members)
+                for entity_id in community.entities:
+                    if entity_id not in self.nodes or entity_id in linked:
+                        continue
+                    linked.add(entity_id)
+                    members.append(entity_id)
+                    self.memberships.setdefault(entity_id, []).append(mid)
+        return run_batches(communities, batch_size or self.batch_size, write)
+
+    def delete_communities(self, community_ids: Iterable[str], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Removes communities together with their PART_OF links."""
+        def write(batch: List[str]):
+            self._count_round_trip()
+            self.generation += 1
+            for mid in batch:
+                self.communities.pop(mid, None)
+                for entity_id in self.members.pop(mid, []):
+                    self.memberships[entity_id].remove(mid)
+        return run_batches(community_ids, batch_size or self.batch_size, write)
+
+    def add_triplets_bulk(self, triplets: Iterable[TripletInput], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Adds reified triplets with their Relation Context (rc).
+        Like the Neo4j MATCH, triplets whose head or tail entity is missing are skipped.
+        """
+        def write(batch: List[TripletInput]):
+            self._count_round_trip()
+            for item in batch:
+                edge, chunk_ids = item if isinstance(item, tuple) else (item, None)
+                if edge.head not in self.nodes or edge.tail not in self.nodes:
+                    continue
+                self.add_edge(edge)
+                links = self.evidence.setdefault(triplet_id(edge), [])
+                for cid in chunk_ids or []:
+                    if cid in self.chunks and cid not in links:
+                        links.append(cid)
+        return run_batches(triplets, batch_size or self.batch_size, write)
+
+    def add_entity(self, node: ContextNode):
+        self.add_entities_bulk([node])
+
+    def add_chunk(self, chunk: ChunkNode):
+        self.add_chunks_bulk([chunk])
+
+    def add_community(self, community: CommunityNode):
+        self.add_communities_bulk([community])
+
+    def add_triplet_with_context(self, edge: ContextEdge, chunk_ids: List[str] = None):
+        """Adds a reified triplet (h, r, t, rc) with optional EVIDENCE_IN chunks."""
+        self.add_triplets_bulk([(edge, chunk_ids)])
+
+    def find_entities_by_label(self, label: str, limit: int = 10) -> List[str]:
+        self._count_round_trip()
+        return [eid for eid, _ in self.label_index.search(label, limit)]
+
+    def get_entity(self, entity_id: str, fields: Fields = None) -> Dict[str, Any]:
+        self._count_round_trip()
+        node = self.nodes.get(entity_id)
+        return entity_record(entity_properties(node, fields)) if node else {}
+
+    def get_entities(self, entity_ids: List[str], fields: Fields = None) -> List[Dict[str, Any]]:
+        """Property maps (only `fields`, when given) of the given entities that exist, in one round trip."""
+        self._count_round_trip()
+        return [entity_record(entity_properties(self.nodes[eid], fields)) for eid in entity_ids if eid in self.nodes]
+
+    def iter_entity_edges(self) -> Iterator[Tuple[str, str, str]]:
+        """Every Entity-Triplet-Entity hop as (head id, relation, tail id), e.g. for community detection."""
+        self._count_round_trip()
+        # From the topology columns, so no Relation Context is built (or decoded from a snapshot)
+        yield from self.topology.triples()
+
+    def iter_communities(self) -> Iterator[Tuple[str, int, List[str]]]:
+        """Every Community as (id, level, member entity ids)."""
+        self._count_round_trip()
+        for mid, community in list(self.communities.items()):
+            yield mid, community.level, list(self.members.get(mid, []))
+
+    def get_relation_context(self, tid: str) -> Dict[str, Any]:
+        self._count_round_trip()
+        edge = self.triplets.get(tid)
+        return triplet_record(triplet_properties(edge)) if edge else {}
+
+    def _communities_of(self, entity_id: str) -> List[Dict[str, Any]]:
+        return [community_properties(self.communities[mid]) for mid in self.memberships.get(entity_id, [])]
+
+    def get_communities_for(self, entity_ids: List[str]) -> List[Dict[str, Any]]:
+        self._count_round_trip()
+        seen = {}
+        for eid in entity_ids:
+            for community in self._communities_of(eid):
+                seen.setdefault(community["id"], community)
+        return list(seen.values())
+
+    def get_triplet_chunks(self, tid: str) -> List[Dict[str, Any]]:
+        self._count_round_trip()
+        return [chunk_record(chunk_properties(self.chunks[cid])) for cid in self.evidence.get(tid, [])]
+
+    def get_fewshot_triples(self, relation: str, limit: int = 3) -> List[Dict[str, Any]]:
+        self._count_round_trip()
+        results = []
+        for edge in self.triplets.values():
+            if edge.relation != relation:
+                continue
+            results.append({"head": self.nodes[edge.head].label, "relation": edge.relation, "tail": self.nodes[edge.tail].label})
+            if len(results) >= limit:
+                break
+        return results
+
+    def expand_entities(self, entity_ids: List[str], fanout: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+        """One Entity-Triplet-Entity hop in either direction, at most `fanout` hops per entity."""
+        self._count_round_trip()
+        expansions = {}
+        for eid in entity_ids:
+            hops = []
+            for edge in self.get_outgoing_edges(eid) + self.get_incoming_edges(eid):
+                if len(hops) >= fanout:
+                    break
+                hops.append({
+                    "tid": triplet_id(edge),
+                    "head": edge.head,
+                    "relation": edge.relation,
+                    "tail": edge.tail,
+                    "head_label": self.nodes[edge.head].label,
+                    "tail_label": self.nodes[edge.tail].label
+                })
+            expansions[eid] = hops
+        return expansions
+
+    def search_chunks_vector(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Dense chunk retrieval: rows of {'c': chunk properties, 'score': cosine}, best first."""
+        self._count_round_trip()
+        hits = self.chunk_index.search(self.embedder.embed([query])[0], limit)
+        return [{"c": chunk_record(chunk_properties(self.chunks[cid])), "score": score} for cid, score in hits if score > 0]
+
+    def find_triplets_in_window(self, window: TimeWindow, limit: int = 100) -> List[str]:
+        """Ids of dated triplets valid at some point of `window`, earliest first, from the interval tree."""
+        self._count_round_trip()
+        index = self.temporal_index
+        tids = index.overlapping(window.start, window.end)
+        # Open-started intervals last, like nulls in Cypher's ORDER BY
+        tids.sort(key=lambda tid: (index.intervals[tid][0] is None, index.intervals[tid][0] or 0))
+        return tids[:limit]
+
+    def get_neighbors(self, entity_id: str, window: Optional[TimeWindow] = None) -> List[Dict[str, Any]]:
+        """Neighbors and their contexts, in the same row shape as Neo4jContextGraph.get_neighbors."""
+        return neighborhood_rows(self.get_neighborhoods([entity_id], k=1, window=window))
+
+    def get_neighborhoods(self, entity_ids: List[str], k: int = 1, per_hop_limit: Optional[int] = None,
+                          projection: Projection = FULL, window: Optional[TimeWindow] = None) -> Dict[str, Any]:
+        """k-hop outgoing expansion of many seeds; same contract as Neo4jContextGraph.get_neighborhoods."""
+        self._count_round_trip()
+        seen = set()
+        frontier = []
+        for eid in entity_ids:
+            if eid in self.nodes and eid not in seen:
+                seen.add(eid)
+                frontier.append(eid)
+        rows, chunks, communities = [], {}, {}
+        for hop in range(1, k + 1):
+            reached = []
+            for eid in frontier:
+                head = entity_record(entity_properties(self.nodes[eid], projection.head))
+                edges = self.get_outgoing_edges(eid)
+                if window is not None:
+                    # Filtered before the per-hop limit, like the WHERE ahead of LIMIT in Cypher. Only the
+                    # visited edges are checked, so a snapshot-backed graph decodes no more than it returns.
+                    edges = [e for e in edges if window.overlaps(e.context.interval)]
+                if per_hop_limit is not None:
+                    edges = edges[:per_hop_limit]
+                for edge in edges:
+                    tid = triplet_id(edge)
+                    rows.append({"e": head, "tr": triplet_record(triplet_properties(edge), projection.triplet),
+                                 "tail": entity_record(entity_properties(self.nodes[edge.tail], projection.tail)),
+                                 "hop": hop})
+                    if self.evidence.get(tid):
+                        chunks[tid] = [chunk_record(chunk_properties(self.chunks[cid])) for cid in self.evidence[tid]]
+                    if edge.tail not in seen:
+                        seen.add(edge.tail)
+                        reached.append(edge.tail)
+                if edges and self.memberships.get(eid):
+                    communities[eid] = self._communities_of(eid)
+            frontier = reached
+        return {"triplets": rows, "chunks": chunks, "communities": communities}
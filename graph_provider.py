@@ -0,0 +1,121 @@
+import time
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, ContextManager, Protocol, Tuple, Union
+from models import ContextNode, ContextEdge, ChunkNode, CommunityNode
+from projection import FULL, Fields, Projection
+from temporal import TimeWindow
+
+TripletInput = Union[ContextEdge, Tuple[ContextEdge, Optional[List[str]]]]
+
+
+class GraphProvider(Protocol):
+    """
+    Storage interface shared by the Neo4j and in-memory backends.
+    Records are returned as read-only property maps shaped like Neo4j nodes (see
+    `models.entity_properties` and friends, wrapped in `projection` records that decode JSON
+    fields on access), so agents never see which backend is in use. Entity and neighborhood
+    reads take the fields to return (`projection.Fields` / `projection.Projection`) so the
+    backend only ships what the caller uses. Neighborhood reads also take a `temporal.TimeWindow`
+    that the backend applies to triplet validity intervals (`valid_from`/`valid_to`) itself.
+    `generation` increases with every write made through the provider; `round_trips` counts
+    backend round trips (queries and transactions) issued so far. `persistent` says whether
+    writes outlive the process.
+    """
+    generation: int
+    round_trips: int
+    persistent: bool
+
+    def close(self) -> None: ...
+
+    def initialize_schema(self) -> None: ...
+
+    def session_scope(self) -> ContextManager[Any]: ...
+
+    # Writes
+    def add_entities_bulk(self, nodes: Iterable[ContextNode], batch_size: Optional[int] = None) -> List[Dict[str, Any]]: ...
+
+    def add_chunks_bulk(self, chunks: Iterable[ChunkNode], batch_size: Optional[int] = None) -> List[Dict[str, Any]]: ...
+
+    def add_triplets_bulk(self, triplets: Iterable[TripletInput], batch_size: Optional[int] = None) -> List[Dict[str, Any]]: ...
+
+    def add_communities_bulk(self, communities: Iterable[CommunityNode], batch_size: Optional[int] = None,
+                             replace_members: bool = False) -> List[Dict[str, Any]]: ...
+
+    def delete_communities(self, community_ids: Iterable[str], batch_size: Optional[int] = None) -> List[Dict[str, Any]]: ...
+
+    def add_entity(self, node: ContextNode) -> None: ...
+
+    def add_chunk(self, chunk: ChunkNode) -> None: ...
+
+    def add_community(self, community: CommunityNode) -> None: ...
+
+    def add_triplet_with_context(self, edge: ContextEdge, chunk_ids: List[str] = None) -> None: ...
+
+    # Reads
+    def find_entities_by_label(self, label: str, limit: int = 10) -> List[str]: ...
+
+    def get_entity(self, entity_id: str, fields: Fields = None) -> Dict[str, Any]: ...
+
+    def get_entities(self, entity_ids: List[str], fields: Fields = None) -> List[Dict[str, Any]]: ...
+
+    def iter_entity_edges(self) -> Iterator[Tuple[str, str, str]]: ...
+
+    def iter_communities(self) -> Iterator[Tuple[str, int, List[str]]]: ...
+
+    def get_relation_context(self, tid: str) -> Dict[str, Any]: ...
+
+    def get_communities_for(self, entity_ids: List[str]) -> List[Dict[str, Any]]: ...
+
+    def get_triplet_chunks(self, tid: str) -> List[Dict[str, Any]]: ...
+
+    def get_fewshot_triples(self, relation: str, limit: int = 3) -> List[Dict[str, Any]]: ...
+
+    def expand_entities(self, entity_ids: List[str], fanout: int = 50) -> Dict[str, List[Dict[str, Any]]]: ...
+
+    def search_chunks_vector(self, query: str, limit: int = 5) -> List[Dict[str, Any]]: ...
+
+    def find_triplets_in_window(self, window: TimeWindow, limit: int = 100) -> List[str]: ...
+
+    def get_neighbors(self, entity_id: str, window: Optional[TimeWindow] = None) -> List[Dict[str, Any]]: ...
+
+    def get_neighborhoods(self, entity_ids: List[str], k: int = 1, per_hop_limit: Optional[int] = None,
+                          projection: Projection = FULL, window: Optional[TimeWindow] = None) -> Dict[str, Any]: ...
+
+
+def batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Splits an iterable into lists of at most `size` items."""
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def run_batches(items: Iterable[Any], size: int, write: Callable[[List[Any]], Any]) -> List[Dict[str, Any]]:
+    """
+    Feeds `items` to `write` in batches of `size`.
+    Returns per-batch throughput stats: batch index, rows, seconds, rows/sec.
+    """
+    stats = []
+    for i, batch in enumerate(batched(items, size)):
+        started = time.perf_counter()
+        write(batch)
+        elapsed = time.perf_counter() - started
+        stats.append({
+            "batch": i,
+            "rows": len(batch),
+            "seconds": elapsed,
+            "rows_per_sec": len(batch) / elapsed if elapsed > 0 else float("inf")
+        })
+    return stats
+
+
+def neighborhood_rows(neighborhood: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Flattens a `get_neighborhoods` result into get_neighbors-style rows
+    ({'e', 'tr', 'tail', 'hop', 'chunks', 'communities'}), attaching each aggregate once per triplet.
+    """
+    chunks, communities = neighborhood["chunks"], neighborhood["communities"]
+    return [dict(row, chunks=chunks.get(row['tr']['id'], []), communities=communities.get(row['e']['id'], []))
+            for row in neighborhood["triplets"]]
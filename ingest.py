@@ -0,0 +1,386 @@
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import List, Dict, Any, Callable, Iterator, Optional, Sequence, Tuple
+
+from graph_provider import GraphProvider
+from models import ContextNode, ContextEdge, EntityContext, RelationContext, ChunkNode, CommunityNode
+from temporal import time_span
+from instrumentation import count, span
+
+logger = logging.getLogger(__name__)
+
+# Dependency order: triplets MATCH their entities and chunks, communities their entities
+LAYERS = ("entities", "chunks", "quadruples", "communities")
+
+# A raw record: a JSONL line (bytes) or a CSV row (list of cells)
+RawRecord = Any
+
+
+class ParseError(ValueError):
+    """A record that does not describe a valid entity, chunk, quadruple or community."""
+
+
+def _required(record: Dict[str, Any], key: str) -> str:
+    value = record.get(key)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        raise ParseError(f"missing '{key}'")
+    return str(value)
+
+
+def _structured(value: Any, kind: type, key: str) -> Any:
+    """Dict/list fields: taken as-is from JSON, decoded from JSON text in CSV cells; '|' separates CSV lists."""
+    if value is None or value == "":
+        return kind()
+    if isinstance(value, str):
+        text = value.strip()
+        if text[:1] in "{[":
+            try:
+                value = json.loads(text)
+            except ValueError:
+                raise ParseError(f"'{key}' is not valid JSON")
+        elif kind is list:
+            value = [part.strip() for part in text.split("|") if part.strip()]
+    if not isinstance(value, kind):
+        raise ParseError(f"'{key}' must be a {kind.__name__}")
+    return value
+
+
+def _number(value: Any, key: str, cast: Callable = float) -> Any:
+    try:
+        number = cast(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ParseError(f"'{key}' must be a number")
+    # int() would silently truncate 1.5 to 1
+    if cast is int and isinstance(value, float) and not value.is_integer():
+        raise ParseError(f"'{key}' must be an integer")
+    return number
+
+
+def _scalar(value: str) -> Any:
+    """CSV cells of flattened maps (temporal_*, prop_*): ints and floats come back as numbers."""
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _prefixed(record: Dict[str, Any], prefix: str) -> Dict[str, Any]:
+    return {k[len(prefix):]: _scalar(v) if isinstance(v, str) else v
+            for k, v in record.items() if k.startswith(prefix) and v not in (None, "")}
+
+
+def parse_entity(record: Dict[str, Any]) -> ContextNode:
+    return ContextNode(_required(record, "id"), _required(record, "label"), record.get("type") or "Entity",
+                       EntityContext(attributes=_structured(record.get("attributes"), dict, "attributes"),
+                                     metadata=_structured(record.get("metadata"), dict, "metadata"),
+                                     external_links=_structured(record.get("external_links"), list, "external_links"),
+                                     multimodal_context=_structured(record.get("multimodal_context"), list,
+                                                                    "multimodal_context")))
+
+
+def parse_chunk(record: Dict[str, Any]) -> ChunkNode:
+    return ChunkNode(_required(record, "id"), _required(record, "content"),
+                     _structured(record.get("metadata"), dict, "metadata"))
+
+
+def parse_quadruple(record: Dict[str, Any]) -> Tuple[ContextEdge, List[str]]:
+    """
+    (h, r, t, rc) plus the ids of its evidence chunks. Relation Context fields are top-level keys;
+    CSV files may flatten `temporal`/`details` into temporal_<key>/prop_<key> columns like the stored Triplets.
+    """
+    temporal = _structured(record.get("temporal"), dict, "temporal")
+    temporal.update(_prefixed(record, "temporal_"))
+    details = _structured(record.get("details"), dict, "details")
+    details.update(_prefixed(record, "prop_"))
+    confidence = _number(record.get("confidence", 1.0) if record.get("confidence") not in (None, "") else 1.0,
+                         "confidence")
+    if not 0.0 <= confidence <= 1.0:
+        raise ParseError("'confidence' must be between 0 and 1")
+    quantitative = _structured(record.get("quantitative"), dict, "quantitative")
+    bounds = {}
+    for key in ("valid_from", "valid_to"):
+        value = record.get(key)
+        if value in (None, ""):
+            continue
+        bounds[key] = _scalar(value) if isinstance(value, str) else value
+        if time_span(bounds[key]) is None:
+            raise ParseError(f"'{key}' is not a year, ISO date or YYYYMMDD day code")
+    context = RelationContext(temporal=temporal or None, geographic=record.get("geographic") or None,
+                              quantitative=quantitative or None,
+                              provenance=_structured(record.get("provenance"), list, "provenance"),
+                              confidence=confidence, details=details, **bounds)
+    edge = ContextEdge(_required(record, "head"), _required(record, "relation"), _required(record, "tail"), context)
+    return edge, [str(c) for c in _structured(record.get("chunk_ids"), list, "chunk_ids")]
+
+
+def parse_community(record: Dict[str, Any]) -> CommunityNode:
+    level = record.get("level")
+    return CommunityNode(_required(record, "id"), record.get("label") or "", record.get("summary") or "",
+                         [str(e) for e in _structured(record.get("entities"), list, "entities")],
+                         level=_number(level, "level", int) if level not in (None, "") else 0)
+
+
+PARSERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "entities": parse_entity,
+    "chunks": parse_chunk,
+    "quadruples": parse_quadruple,
+    "communities": parse_community,
+}
+
+
+def parse_block(layer: str, fieldnames: Optional[List[str]], items: Sequence[RawRecord],
+                first: int) -> Tuple[List[Any], List[Tuple[int, str]], float]:
+    """
+    Worker entry point: decodes and validates one block of raw records.
+    Returns the parsed records, (record number, error) for rejected ones, and the CPU seconds spent.
+    """
+    started = time.process_time()
+    parse = PARSERS[layer]
+    records, errors = [], []
+    for offset, item in enumerate(items):
+        try:
+            if fieldnames is None:
+                record = json.loads(item)
+                if not isinstance(record, dict):
+                    raise ParseError("expected a JSON object")
+            else:
+                record = dict(zip(fieldnames, item))
+            records.append(parse(record))
+        except ValueError as e:
+            errors.append((first + offset, str(e)))
+    return records, errors, time.process_time() - started
+
+
+class Checkpoint:
+    """
+    Per-file progress of an ingestion run, rewritten atomically after every committed write batch.
+    Records before `records` (and, for JSONL, bytes before `offset`) are known to be in the backend.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.state: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def get(self, layer: str, source: str) -> Dict[str, Any]:
+        entry = self.state.get(layer)
+        stat = os.stat(source)
+        if entry and entry.get("source") == os.path.abspath(source) and entry.get("size") == stat.st_size:
+            return entry
+        # Unknown, or the file changed since the checkpoint: start over
+        return {"source": os.path.abspath(source), "size": stat.st_size, "records": 0, "offset": 0,
+                "rejected": 0, "done": False}
+
+    def update(self, layer: str, entry: Dict[str, Any]):
+        self.state[layer] = entry
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def _read_blocks(source: str, start: Dict[str, Any], block_size: int
+                 ) -> Iterator[Tuple[Optional[List[str]], List[RawRecord], int, int]]:
+    """
+    Yields (CSV header or None, raw records, number of the first record, byte offset after the block).
+    JSONL resumes by seeking to the checkpointed offset; CSV re-reads and skips the committed rows.
+    """
+    if source.endswith(".csv"):
+        with open(source, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            fieldnames = [name.strip() for name in next(reader, [])]
+            index, block = 0, []
+            for row in reader:
+                if not any(cell.strip() for cell in row):
+                    continue
+                index += 1
+                if index <= start["records"]:
+                    continue
+                block.append(row)
+                if len(block) == block_size:
+                    yield fieldnames, block, index - len(block), 0
+                    block = []
+            if block:
+                yield fieldnames, block, index - len(block), 0
+        return
+    with open(source, "rb") as f:
+        f.seek(start["offset"])
+        index, block = start["records"], []
+        offset = start["offset"]
+        for line in f:
+            offset += len(line)
+            if not line.strip():
+                continue
+            block.append(line)
+            index += 1
+            if len(block) == block_size:
+                yield None, block, index - len(block), offset
+                block = []
+        if block:
+            yield None, block, index - len(block), offset
+
+
+class _InlineExecutor(Executor):
+    """Runs submissions in the calling thread, for workers=0 and tiny inputs."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def _writer(provider: GraphProvider, layer: str) -> Callable[[List[Any], int], Any]:
+    return {
+        "entities": provider.add_entities_bulk,
+        "chunks": provider.add_chunks_bulk,
+        "quadruples": provider.add_triplets_bulk,
+        "communities": provider.add_communities_bulk,
+    }[layer]
+
+
+def ingest_file(provider: GraphProvider, layer: str, source: str, executor: Executor, checkpoint: Checkpoint,
+                block_size: int = 1000, batch_size: int = 1000, max_pending: int = 8,
+                rejects: Optional[Any] = None) -> Dict[str, Any]:
+    """
+    Streams one file through read -> parse (executor) -> write. At most `max_pending` blocks are
+    parsed ahead of the writer, so a slow backend stalls reading instead of filling memory. Parsed
+    records are written in `batch_size` batches at block boundaries, and the checkpoint advances
+    after each write, so a rerun resumes after the last committed block (writes are MERGEs, so a
+    block replayed after a crash is harmless).
+    """
+    if layer not in PARSERS:
+        raise ValueError(f"Unknown layer: {layer}")
+    entry = checkpoint.get(layer, source)
+    stats = {"source": source, "resumed_from": entry["records"], "records": 0, "rejected": 0,
+             "read_seconds": 0.0, "parse_seconds": 0.0, "parse_cpu_seconds": 0.0, "write_seconds": 0.0}
+    if entry["done"]:
+        logger.info("Ingest %s: %s already complete, skipping", layer, source)
+        stats["skipped"] = True
+        return stats
+    write = _writer(provider, layer)
+    pending: deque = deque()
+    buffer: List[Any] = []
+    started = time.perf_counter()
+
+    def drain(block_end: Tuple[int, int], final: bool = False):
+        nonlocal buffer
+        if buffer and (final or len(buffer) >= batch_size):
+            began = time.perf_counter()
+            write(buffer, batch_size)
+            stats["write_seconds"] += time.perf_counter() - began
+            count("ingest_rows_written_total", len(buffer), layer=layer)
+            buffer = []
+        if not buffer:
+            entry["records"], entry["offset"] = block_end
+            checkpoint.update(layer, entry)
+
+    # End of the last block handed to the buffer: where the final, partial batch leaves the file
+    last_end = (entry["records"], entry["offset"])
+
+    def collect():
+        nonlocal last_end
+        future, block_end = pending.popleft()
+        last_end = block_end
+        began = time.perf_counter()
+        records, errors, cpu = future.result()
+        # Parse stage time is the wall time the pipeline waited on parsing (workers' CPU time overlaps)
+        stats["parse_seconds"] += time.perf_counter() - began
+        stats["parse_cpu_seconds"] += cpu
+        stats["records"] += len(records)
+        stats["rejected"] += len(errors)
+        entry["rejected"] += len(errors)
+        for number, message in errors:
+            if rejects is not None:
+                rejects.write(json.dumps({"layer": layer, "source": source, "record": number, "error": message}) + "\n")
+        if errors:
+            count("ingest_rows_rejected_total", len(errors), layer=layer)
+            logger.warning("Ingest %s: %d invalid records in %s (first: record %d, %s)",
+                           layer, len(errors), source, errors[0][0], errors[0][1])
+        buffer.extend(records)
+        drain(block_end)
+
+    with span("ingest.file", layer=layer, source=source):
+        blocks = _read_blocks(source, entry, block_size)
+        while True:
+            began = time.perf_counter()
+            block = next(blocks, None)
+            stats["read_seconds"] += time.perf_counter() - began
+            if block is None:
+                break
+            fieldnames, items, first, offset = block
+            began = time.perf_counter()
+            future = executor.submit(parse_block, layer, fieldnames, items, first)
+            stats["parse_seconds"] += time.perf_counter() - began
+            pending.append((future, (first + len(items), offset)))
+            # Backpressure: the reader waits for the oldest block once enough are in flight
+            while len(pending) >= max_pending:
+                collect()
+        while pending:
+            collect()
+        if buffer:
+            drain(last_end, final=True)
+    entry["done"] = True
+    checkpoint.update(layer, entry)
+
+    wall = time.perf_counter() - started
+    stats["wall_seconds"] = wall
+    stats["rows_per_sec"] = {
+        stage: (stats["records"] + (stats["rejected"] if stage != "write" else 0)) / stats[f"{stage}_seconds"]
+        if stats[f"{stage}_seconds"] > 0 else None
+        for stage in ("read", "parse", "write")
+    }
+    stats["rows_per_sec"]["total"] = stats["records"] / wall if wall > 0 else None
+    logger.info("Ingest %s: %d records (%d rejected) from %s in %.1fs", layer, stats["records"],
+                stats["rejected"], source, wall)
+    return stats
+
+
+def ingest(provider: GraphProvider, sources: Dict[str, str], workers: Optional[int] = None, block_size: int = 1000,
+           batch_size: Optional[int] = None, max_pending: Optional[int] = None, checkpoint_path: Optional[str] = None,
+           rejects_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Loads JSONL/CSV files ({layer: path}, layers in LAYERS) in dependency order. Parsing runs in a
+    pool of `workers` processes (default: CPU count; 0 parses inline). Returns per-layer stage stats.
+    A checkpoint needs a provider whose writes outlive the process (`persistent`).
+    """
+    unknown = set(sources) - set(LAYERS)
+    if unknown:
+        raise ValueError(f"Unknown layers: {sorted(unknown)}")
+    if checkpoint_path and not getattr(provider, "persistent", True):
+        raise ValueError("Checkpoints need a persistent backend: a resumed in-memory load would skip records "
+                         "the checkpoint marks as written but the new graph does not have")
+    workers = os.cpu_count() or 1 if workers is None else workers
+    batch_size = batch_size or getattr(provider, "batch_size", 1000)
+    max_pending = max_pending or max(2, 2 * workers)
+    checkpoint = Checkpoint(checkpoint_path)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else _InlineExecutor()
+    rejects = open(rejects_path, "a", encoding="utf-8") if rejects_path else None
+    report: Dict[str, Any] = {"layers": {}}
+    started = time.perf_counter()
+    try:
+        provider.initialize_schema()
+        for layer in LAYERS:
+            if layer in sources:
+                report["layers"][layer] = ingest_file(provider, layer, sources[layer], executor, checkpoint,
+                                                      block_size, batch_size, max_pending, rejects)
+    finally:
+        executor.shutdown()
+        if rejects is not None:
+            rejects.close()
+    report["seconds"] = time.perf_counter() - started
+    report["workers"] = workers
+    return report
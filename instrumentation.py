@@ -0,0 +1,222 @@
+import contextvars
+import itertools
+import json
+import threading
+import time
+from typing import List, Dict, Any, Optional, Protocol, Tuple
+
+# Span duration histogram buckets, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    """One timed stage. Spans opened while another is active on the same context become its children."""
+    __slots__ = ("tracer", "name", "attrs", "span_id", "parent_id", "trace_id", "start", "duration", "_started", "_token")
+
+    def __init__(self, tracer: "Instrumentation", name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = next(_ids)
+        self.parent_id: Optional[int] = None
+        self.trace_id = self.span_id
+        self.start = 0.0
+        self.duration = 0.0
+        self._started = 0.0
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        if parent is not None:
+            self.parent_id = parent.span_id
+            self.trace_id = parent.trace_id
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Exited from another context (e.g. a generator finalized elsewhere); nothing to restore
+            pass
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "name": self.name, "start": self.start, "duration_ms": self.duration * 1000.0,
+                "attrs": self.attrs}
+
+
+class _NoopSpan:
+    """Returned while instrumentation is disabled, so `with span(...)` costs one call and no allocation."""
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Exporter(Protocol):
+    def export_span(self, span: Dict[str, Any]) -> None: ...
+
+    def flush(self, instrumentation: "Instrumentation") -> None: ...
+
+
+class JSONLinesExporter:
+    """Appends every finished span to a JSON-lines trace file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export_span(self, span: Dict[str, Any]):
+        line = json.dumps(span, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def flush(self, instrumentation: "Instrumentation"):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusExporter:
+    """Writes counters and span-duration histograms in the Prometheus text exposition format on flush."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export_span(self, span: Dict[str, Any]):
+        pass
+
+    def flush(self, instrumentation: "Instrumentation"):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(instrumentation.render_prometheus())
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class Instrumentation:
+    """
+    Nested timing spans plus labelled counters for the MACER loop.
+    Disabled by default: `span` then returns a shared no-op and `count` returns immediately.
+    Finished spans go to the exporters; counters and per-stage histograms are kept in memory
+    and written by `flush` (e.g. Prometheus text).
+    """
+
+    def __init__(self, enabled: bool = False, exporters: Optional[List[Exporter]] = None):
+        self.enabled = enabled
+        self.exporters: List[Exporter] = list(exporters or [])
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        # span name -> [bucket counts..., +Inf count, sum]
+        self.histograms: Dict[str, List[float]] = {}
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def count(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get((name, tuple(sorted((k, str(v)) for k, v in labels.items()))), 0)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            hist = self.histograms.setdefault(span.name, [0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if span.duration <= bound:
+                    hist[i] += 1
+            hist[len(BUCKETS)] += 1
+            hist[-1] += span.duration
+        if self.exporters:
+            record = span.to_dict()
+            for exporter in self.exporters:
+                exporter.export_span(record)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((name, list(h)) for name, h in self.histograms.items())
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"macer_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_labels(labels)} {value:g}")
+        if histograms:
+            lines.append("# TYPE macer_stage_seconds histogram")
+        for name, hist in histograms:
+            for i, bound in enumerate(BUCKETS):
+                lines.append(f"macer_stage_seconds_bucket{_labels((('stage', name), ('le', f'{bound:g}')))} {hist[i]:g}")
+            lines.append(f"macer_stage_seconds_bucket{_labels((('stage', name), ('le', '+Inf')))} {hist[len(BUCKETS)]:g}")
+            lines.append(f"macer_stage_seconds_sum{_labels((('stage', name),))} {hist[-1]:g}")
+            lines.append(f"macer_stage_seconds_count{_labels((('stage', name),))} {hist[len(BUCKETS)]:g}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        for exporter in self.exporters:
+            exporter.flush(self)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+# Process-wide instance used by every module; disabled until `configure` is called
+instrumentation = Instrumentation()
+
+
+def configure(enabled: bool = True, exporters: Optional[List[Exporter]] = None) -> Instrumentation:
+    instrumentation.enabled = enabled
+    instrumentation.exporters = list(exporters or [])
+    return instrumentation
+
+
+def span(name: str, **attrs):
+    return instrumentation.span(name, **attrs)
+
+
+def count(name: str, value: float = 1, **labels):
+    instrumentation.count(name, value, **labels)
@@ -0,0 +1,111 @@
+import math
+import re
+from collections import defaultdict
+from typing import List, Dict, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Kept in line with the stop words of Neo4j's 'english' full-text analyzer
+STOPWORDS = frozenset([
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "if", "in", "into", "is", "it",
+    "no", "not", "of", "on", "or", "such", "that", "the", "their", "then", "there", "these",
+    "they", "this", "to", "was", "will", "with",
+])
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens with stop words removed."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class LabelIndex:
+    """
+    Case-insensitive inverted index over entity labels, maintained incrementally.
+    Token postings rank partial (multi-word) matches by IDF overlap; trigram postings
+    narrow substring matches down to a few candidates instead of scanning every label.
+    """
+
+    def __init__(self):
+        self._labels: Dict[str, str] = {}  # entity id -> lowercased label
+        self._label_tokens: Dict[str, Set[str]] = {}
+        self._tokens: Dict[str, Set[str]] = defaultdict(set)
+        self._trigrams: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self):
+        return len(self._labels)
+
+    def add(self, entity_id: str, label: str):
+        if entity_id in self._labels:
+            self.remove(entity_id)
+        lowered = label.lower()
+        tokens = set(tokenize(lowered))
+        self._labels[entity_id] = lowered
+        self._label_tokens[entity_id] = tokens
+        for token in tokens:
+            self._tokens[token].add(entity_id)
+        for gram in trigrams(lowered):
+            self._trigrams[gram].add(entity_id)
+
+    def remove(self, entity_id: str):
+        lowered = self._labels.pop(entity_id, None)
+        if lowered is None:
+            return
+        for token in self._label_tokens.pop(entity_id):
+            self._discard(self._tokens, token, entity_id)
+        for gram in trigrams(lowered):
+            self._discard(self._trigrams, gram, entity_id)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[str]], key: str, entity_id: str):
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(entity_id)
+            if not ids:
+                del postings[key]
+
+    def _idf(self, token: str) -> float:
+        return math.log(1.0 + len(self._labels) / (1 + len(self._tokens.get(token, ()))))
+
+    def _substring_matches(self, query: str) -> Set[str]:
+        if len(query) < 3:
+            return {eid for eid, label in self._labels.items() if query in label}
+        grams = sorted(trigrams(query), key=lambda g: len(self._trigrams.get(g, ())))
+        candidates = set(self._trigrams.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= self._trigrams.get(gram, set())
+        return {eid for eid in candidates if query in self._labels[eid]}
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Ranked (entity id, score) matches. Labels containing the whole query score in (1, 2]
+        (2 for an exact match); otherwise the score is the IDF-weighted cosine between the
+        query tokens and the label tokens.
+        """
+        q = query.lower().strip()
+        if not q:
+            return []
+        scores: Dict[str, float] = {}
+        for eid in self._substring_matches(q):
+            scores[eid] = 1.0 + len(q) / len(self._labels[eid])
+
+        query_tokens = set(tokenize(q))
+        query_weight = sum(self._idf(t) for t in query_tokens)
+        matched: Dict[str, float] = defaultdict(float)
+        for token in query_tokens:
+            idf = self._idf(token)
+            for eid in self._tokens.get(token, ()):
+                matched[eid] += idf
+        for eid, weight in matched.items():
+            if eid in scores:
+                continue
+            label_weight = sum(self._idf(t) for t in self._label_tokens[eid])
+            scores[eid] = weight / math.sqrt(label_weight * query_weight)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self._labels[item[0]]), item[0]))
+        return ranked[:limit]
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from llm_util import LLMInterface
+from instrumentation import count
+
+
+class LLMCache:
+    """
+    Two-tier, content-addressed cache for LLM completions.
+    Tier 1 is an in-memory LRU bounded by entry count and bytes; tier 2 is an optional
+    SQLite file that survives restarts. Both tiers honour the same TTL.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = None, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(prompt: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps({"prompt": prompt, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    @staticmethod
+    def _size(key: str, value: str) -> int:
+        return len(key) + len(value.encode("utf-8"))
+
+    def _remember(self, key: str, value: str, created_at: float):
+        if key in self._memory:
+            self._bytes -= self._size(key, self._memory.pop(key)[0])
+        self._memory[key] = (value, created_at)
+        self._bytes += self._size(key, value)
+        while self._memory and (len(self._memory) > self.max_entries or self._bytes > self.max_bytes):
+            old_key, (old_value, _) = self._memory.popitem(last=False)
+            self._bytes -= self._size(old_key, old_value)
+            self.counters["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1]):
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    count("llm_cache_lookups_total", result="memory_hit")
+                    return entry[0]
+                self._bytes -= self._size(key, self._memory.pop(key)[0])
+            if self._db is not None:
+                row = self._db.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if not self._expired(row[1]):
+                        self._remember(key, row[0], row[1])
+                        self.counters["disk_hits"] += 1
+                        count("llm_cache_lookups_total", result="disk_hit")
+                        return row[0]
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+            self.counters["misses"] += 1
+            count("llm_cache_lookups_total", result="miss")
+            return None
+
+    def put(self, key: str, value: str):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, value, created_at)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                                 (key, value, created_at))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus the current memory-tier footprint."""
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            lookups = hits + self.counters["misses"]
+            return dict(self.counters, hits=hits, hit_rate=hits / lookups if lookups else 0.0,
+                        entries=len(self._memory), bytes=self._bytes)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class CachedLLMInterface(LLMInterface):
+    """
+    Drop-in LLMInterface that serves repeated (prompt, model params) pairs from an LLMCache. Misses go
+    through the backend's own `generate`/`agenerate`, so only real completions count as LLM calls;
+    hits are counted by the cache (`llm_cache_lookups_total`).
+    """
+
+    def __init__(self, backend: LLMInterface, cache: Optional[LLMCache] = None):
+        super().__init__(backend.model, backend.temperature, **backend.dispatch_config())
+        self.backend = backend
+        self.cache = cache or LLMCache()
+
+    def params(self) -> Dict[str, Any]:
+        return self.backend.params()
+
+    def generate(self, prompt: str) -> str:
+        key = LLMCache.make_key(prompt, self.params())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        response = self.backend.generate(prompt)
+        self.cache.put(key, response)
+        return response
+
+    async def agenerate(self, prompt: str) -> str:
+        key = LLMCache.make_key(prompt, self.params())
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        # The backend applies its own timeout and retry policy
+        response = await self.backend.agenerate(prompt)
+        self.cache.put(key, response)
+        return response
@@ -1,21 +1,123 @@
-from typing import List, Dict, Any
+import asyncio
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterator, Optional, Sequence, Union
+from instrumentation import count, instrumentation
+
+logger = logging.getLogger(__name__)
+
+# Failures worth another attempt; anything else is a bug and propagates immediately
+RETRYABLE_ERRORS = (asyncio.TimeoutError, TimeoutError, ConnectionError)
 
 class LLMInterface:
     """
     A utility to handle LLM completions for Ranking and Reasoning.
     In this environment, it will use the system's reasoning capabilities.
+
+    `agenerate`/`generate_many` dispatch prompts concurrently: at most `max_in_flight` calls run at once,
+    each bounded by `timeout` seconds and retried up to `max_retries` times with exponential backoff.
+
+    Backends implement `_generate` (and optionally `_agenerate_once`); `generate` and `agenerate`
+    wrap them so every completion is counted once in the LLM call metrics.
     """
+
+    def __init__(self, model: str = "placeholder", temperature: float = 0.0, max_in_flight: int = 8,
+                 timeout: Optional[float] = 60.0, max_retries: int = 2, retry_backoff: float = 0.5):
+        self.model = model
+        self.temperature = temperature
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # Created here rather than on first use so concurrent callers share one pool (its threads start lazily)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm")
+
+    def params(self) -> Dict[str, Any]:
+        """Model parameters that, together with the prompt, determine a completion."""
+        return {"backend": type(self).__name__, "model": self.model, "temperature": self.temperature}
     
     def generate(self, prompt: str) -> str:
+        """Blocking completion of `prompt`."""
+        self._count_call(prompt)
+        return self._generate(prompt)
+
+    def _generate(self, prompt: str) -> str:
         """
         Sends the prompt to the LLM. 
         Note: In a local deployment, this would be an API call to Gemini or a local vLLM instance.
         """
-        print(f"\n--- [LLM PROMPT START] ---\n{prompt}\n--- [LLM PROMPT END] ---\n")
+        logger.debug("LLM prompt:\n%s", prompt)
         
         # Placeholder for real LLM integration (e.g., vertexai or openai)
         return "Y" # Defaulting to 'Y' for prototype flow
 
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        The completion as a sequence of text chunks. Backends with token streaming override this
+        (calling `_count_call` once); the default yields the whole completion at once.
+        """
+        yield self.generate(prompt)
+
+    def dispatch_config(self) -> Dict[str, Any]:
+        """Concurrency settings, so wrappers can inherit them from the backend they wrap."""
+        return {"max_in_flight": self.max_in_flight, "timeout": self.timeout,
+                "max_retries": self.max_retries, "retry_backoff": self.retry_backoff}
+
+    async def _agenerate_once(self, prompt: str) -> str:
+        """
+        A single attempt. Backends with native async I/O override this; the default runs the
+        blocking `_generate` on a worker thread (a timed-out thread finishes in the background).
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._generate, prompt)
+
+    def _count_call(self, prompt: str):
+        if not instrumentation.enabled:
+            return
+        backend = type(self).__name__
+        count("llm_calls_total", backend=backend)
+        count("llm_prompt_chars_total", len(prompt), backend=backend)
+        # Whitespace tokens: a tokenizer-free approximation of prompt tokens
+        count("llm_prompt_tokens_total", len(prompt.split()), backend=backend)
+
+    async def agenerate(self, prompt: str) -> str:
+        """Async completion with a per-call timeout and retries with exponential backoff."""
+        self._count_call(prompt)
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.wait_for(self._agenerate_once(prompt), self.timeout)
+            except RETRYABLE_ERRORS:
+                count("llm_retries_total", backend=type(self).__name__)
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+    async def agenerate_many(self, prompts: Sequence[str]) -> List[str]:
+        """Completes all prompts concurrently (at most `max_in_flight` at once), preserving order."""
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def bounded(prompt: str) -> str:
+            async with semaphore:
+                return await self.agenerate(prompt)
+
+        return list(await asyncio.gather(*(bounded(p) for p in prompts)))
+
+    def generate_many(self, prompts: Sequence[str]) -> List[str]:
+        """Blocking entry point for `agenerate_many`, usable from sync code."""
+        if not prompts:
+            return []
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.agenerate_many(prompts))
+        # Called from inside an event loop: run the batch on a private loop in a helper thread
+        with ThreadPoolExecutor(max_workers=1) as helper:
+            return helper.submit(asyncio.run, self.agenerate_many(prompts)).result()
+
     def build_ranking_prompt(self, query: str, head_context: str, candidates: List[Dict[str, Any]]) -> str:
         """Appendix A.3: Context-aware Re-Ranking template."""
         prompt = f"Context-aware Re-Ranking:\n"
@@ -70,3 +172,82 @@ Please return 'Y' if there is sufficient evidence from the knowledge graph to in
 {context_summary}
 
 Determine what information is missing. Generate a short sub-query to expand the context graph search radius."""
+
+    def build_community_summary_prompt(self, member_labels: List[str], facts: List[str]) -> str:
+        """ToG-3 community summary template: a short report over a cluster's entities and internal facts."""
+        members = "\n".join(f"- {label}" for label in member_labels)
+        relations = "\n".join(f"- {fact}" for fact in facts) or "- (none)"
+        return f"""Write a short summary of the community of entities below for use as retrieval context.
+Entities:
+{members}
+Facts within the community:
+{relations}
+Describe what the entities have in common and how they are related in at most three sentences. Do not say anything else except the summary."""
+
+
+class FakeLLMInterface(LLMInterface):
+    """
+    Offline stand-in LLM with configurable latency, for tests and benchmarks.
+    `latency` is seconds per call (or a callable returning it); `responder` maps a prompt to its answer.
+    """
+
+    def __init__(self, latency: Union[float, Callable[[], float]] = 0.0,
+                 responder: Optional[Callable[[str], str]] = None, **kwargs):
+        kwargs.setdefault("model", "fake")
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.responder = responder or (lambda prompt: "Y")
+        self.calls = 0
+        self.prompts: List[str] = []
+        self._calls_lock = threading.Lock()
+
+    def _delay(self) -> float:
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _record(self, prompt: str) -> str:
+        # Called from executor threads as well as the event loop
+        with self._calls_lock:
+            self.calls += 1
+            self.prompts.append(prompt)
+        return self.responder(prompt)
+
+    def _generate(self, prompt: str) -> str:
+        time.sleep(self._delay())
+        return self._record(prompt)
+
+    async def _agenerate_once(self, prompt: str) -> str:
+        await asyncio.sleep(self._delay())
+        return self._record(prompt)
+
+
+class HTTPLLMInterface(LLMInterface):
+    """
+    Completions from an HTTP/JSON endpoint: POST {"prompt", "model", "temperature"} -> {"text"}.
+    `benchmarks/fake_llm_server.py` serves this protocol with configurable latency for load tests.
+    """
+
+    def __init__(self, url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def params(self) -> Dict[str, Any]:
+        return dict(super().params(), url=self.url)
+
+    def _generate(self, prompt: str) -> str:
+        body = json.dumps({"prompt": prompt, "model": self.model, "temperature": self.temperature}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                raise
+            raise ConnectionError(f"LLM endpoint {self.url} answered {e.code}") from e
+        except urllib.error.URLError as e:
+            # Refused or reset connections are worth a retry
+            raise ConnectionError(f"LLM endpoint {self.url} unreachable: {e.reason}") from e
+        with self._calls_lock:
+            self.calls += 1
+        return payload["text"]
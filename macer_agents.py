@@ -1,56 +1,101 @@
-from typing import List, Dict, Any, Tuple, Optional
+import logging
+from typing import List, Dict, Any, Iterator, Tuple, Optional
 from llm_util import LLMInterface
-from neo4j_provider import Neo4jContextGraph
 from retriever import Neo4jRetriever
+from graph_provider import GraphProvider, neighborhood_rows
+from subgraph_cache import SubgraphCache
+from context_store import ContextStore
+from temporal import TimeWindow
+
+logger = logging.getLogger(__name__)
 
 class ToG3Constructor:
     """Agent that builds/modifies the heterogeneous graph on the fly."""
-    def __init__(self, provider: Neo4jContextGraph, retriever: Neo4jRetriever):
+    def __init__(self, provider: GraphProvider, retriever: Neo4jRetriever, k: int = 1, per_hop_limit: Optional[int] = None):
         self.provider = provider
         self.retriever = retriever
+        self.k = k
+        self.per_hop_limit = per_hop_limit
 
-    def evolve_subgraph(self, sub_query: str, current_nodes: List[str]) -> List[Dict[str, Any]]:
+    def evolve_subgraph(self, sub_query: str, current_nodes: List[str], cache: Optional[SubgraphCache] = None,
+                        window: Optional[TimeWindow] = None) -> List[Dict[str, Any]]:
         """
         Dynamically expands the graph based on a sub-query.
         In a real ToG-3 system, this might involve extracting NEW triples from chunks.
+
+        Expands the already-linked `current_nodes` (falling back to a label search on `sub_query`
+        when none are given). With a SubgraphCache only the unexpanded frontier hits the backend
+        and triplets gathered earlier in the run are dropped. `window` restricts expansion to
+        triplets valid within it.
         """
-        print(f"Constructor: Evolving subgraph for query '{sub_query}'...")
-        # For the prototype, we fetch k-hop neighbors for any new entities found in sub_query
-        new_heads = self.retriever.retrieve_entities_by_label(sub_query)
-        expanded_context = []
-        for eid in new_heads:
-            expanded_context.extend(self.retriever.get_k_hop_neighborhood(eid))
-        return expanded_context
+        logger.debug("Constructor: evolving subgraph for query %r", sub_query)
+        if current_nodes:
+            new_heads = list(current_nodes)
+            if cache is not None:
+                cache.count("label_searches_avoided")
+        else:
+            new_heads = self.retriever.retrieve_entities_by_label(sub_query)
+        frontier = cache.frontier(new_heads) if cache is not None else new_heads
+        if not frontier:
+            return []
+        # All frontier entities are expanded in one batched round trip
+        rows = neighborhood_rows(self.retriever.get_neighborhoods(frontier, k=self.k, per_hop_limit=self.per_hop_limit,
+                                                                  window=window))
+        if cache is None:
+            return rows
+
+        by_head: Dict[str, List[Dict[str, Any]]] = {eid: [] for eid in frontier}
+        for row in rows:
+            by_head.setdefault(row['e']['id'], []).append(row)
+        for eid, head_rows in by_head.items():
+            cache.store_neighborhood(eid, head_rows)
+        return cache.new_triplets(rows)
 
 class ToG3Reflector:
     """Agent that assesses context sufficiency and manages query evolution."""
     def __init__(self, llm: LLMInterface):
         self.llm = llm
 
-    def reflect(self, query: str, context: List[Dict[str, Any]]) -> Tuple[bool, Optional[str]]:
+    def reflect(self, query: str, store: ContextStore) -> Tuple[bool, Optional[str]]:
         """
         Evaluates gathered context and suggests a sub-query for evolution.
+        The store's phrase check resumes where the previous iteration stopped, so repeated
+        reflection over a growing context costs only the newly gathered facts.
         """
         # (Placeholder for real LLM logic using prompts like Appendix A.2)
         # We simplify for the iterative loop logic
-        if not context:
+        if not len(store):
             return False, f"Tell me more about the entities related to '{query}'"
         
         # Heuristic: if we have facts but they don't mention the query's core terms, evolve
-        has_direct_match = any(query.lower() in str(c).lower() for c in context)
-        if not has_direct_match and len(context) < 3:
+        has_direct_match = store.contains(query)
+        if not has_direct_match and len(store) < 3:
             return False, f"Expand search for '{query}' by looking for indirect connections."
         
         return True, None
 
 class ToG3Responser:
     """Agent responsible for final answer synthesis (Stage 3)."""
-    def __init__(self, llm: LLMInterface):
+    def __init__(self, llm: LLMInterface, token_budget: Optional[int] = 1024):
         self.llm = llm
+        # Approximate (whitespace) tokens of materials in the answer prompt; None packs everything
+        self.token_budget = token_budget
 
-    def generate_final_answer(self, query: str, context: List[Dict[str, Any]]) -> str:
-        """Synthesizes the final answer from all gathered context."""
+    def generate_final_answer(self, query: str, store: ContextStore) -> str:
+        """Synthesizes the final answer from the most relevant gathered context that fits the budget."""
         # Instruction: "Output all possible answers you can find IN THE MATERIALS"
-        context_str = "\n".join([f"- {c['tr']['relation']} -> {c['tail']['label']}" for c in context])
-        prompt = f"Context-aware Reasoning:\nQuery: {query}\n\nMaterials:\n{context_str}\n\nFinal Answer:"
-        return self.llm.generate(prompt)
+        return self.llm.generate(self._answer_prompt(query, store))
+
+    def stream_final_answer(self, query: str, store: ContextStore) -> Iterator[str]:
+        """Like `generate_final_answer`, yielding the answer as it is produced."""
+        return self.llm.stream(self._answer_prompt(query, store))
+
+    @staticmethod
+    def best_effort_answer(store: ContextStore) -> Optional[str]:
+        """Answer without an LLM call, for runs cut short: the distinct tails of the gathered facts."""
+        tails = list(dict.fromkeys(row['tail']['label'] for row in store.rows()))
+        return ", ".join(tails) if tails else None
+
+    def _answer_prompt(self, query: str, store: ContextStore) -> str:
+        context_str = store.pack(query, self.token_budget)
+        return f"Context-aware Reasoning:\nQuery: {query}\n\nMaterials:\n{context_str}\n\nFinal Answer:"
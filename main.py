@@ -1,13 +1,26 @@
 import argparse
+import json
+import logging
 import os
 from models import ContextNode, ContextEdge, EntityContext, RelationContext, ChunkNode, CommunityNode
 from neo4j_provider import Neo4jContextGraph
+from graph import ContextGraph
+from graph_provider import GraphProvider
 from llm_util import LLMInterface
+from llm_cache import LLMCache, CachedLLMInterface
 from reasoner import MACERReasoner
+from server import QueryService, serve
+from communities import METHODS, CommunityDetector
+from snapshot import export_neo4j, load_snapshot, save_snapshot
+from ingest import ingest
+from temporal import TimeWindow
+from instrumentation import JSONLinesExporter, PrometheusExporter, configure
 
-def ingest_sample_data(provider: Neo4jContextGraph):
+logger = logging.getLogger(__name__)
+
+def ingest_sample_data(provider: GraphProvider):
     """Ingests heterogeneous context graph data (Quadruples)."""
-    print("Ingesting sample CGR3 data into Neo4j...")
+    logger.info("Ingesting sample CGR3 data into %s", type(provider).__name__)
     provider.initialize_schema()
 
     # 1. Chunks (Source Text / Evidence)
@@ -38,32 +51,153 @@ def ingest_sample_data(provider: Neo4jContextGraph):
     edge1 = ContextEdge("Q937", "WON", "Q38104", context=rc)
     provider.add_triplet_with_context(edge1, chunk_ids=["C1", "C2"])
 
+def build_provider(args, parser: argparse.ArgumentParser) -> GraphProvider:
+    if args.backend == "neo4j":
+        if not args.password:
+            parser.error("--password is required for --backend neo4j")
+        provider = Neo4jContextGraph(args.uri, args.user, args.password)
+    elif args.snapshot:
+        provider = load_snapshot(args.snapshot)
+    else:
+        provider = ContextGraph()
+        # An in-memory graph starts empty, so load the sample data unless files are being ingested
+        args.ingest = args.command != "ingest"
+
+    if args.ingest:
+        try:
+            ingest_sample_data(provider)
+            logger.info("Ingestion complete")
+        except Exception as e:
+            logger.error("Ingestion failed: %s", e)
+            provider.close()
+            return None
+    return provider
+
+def build_llm(args) -> LLMInterface:
+    llm = LLMInterface()
+    if args.llm_cache:
+        llm = CachedLLMInterface(llm, LLMCache(path=args.llm_cache))
+    return llm
+
 def main():
     parser = argparse.ArgumentParser(description="Context Graph (CGR3/ToG-3/CATS) Implementation")
-    parser.add_argument("--query", type=str, required=True, help="User query to process")
-    parser.add_argument("--ingest", action="store_true", help="Ingest sample data into Neo4j")
+    parser.add_argument("--query", type=str, help="User query to process")
+    parser.add_argument("--ingest", action="store_true", help="Ingest sample data into the graph backend")
+    parser.add_argument("--backend", choices=["memory", "neo4j"], default="neo4j",
+                        help="Graph backend: in-process ContextGraph or a live Neo4j instance")
     
     # Neo4j Config
     parser.add_argument("--uri", default="bolt://localhost:7687")
     parser.add_argument("--user", default="neo4j")
-    parser.add_argument("--password", required=True)
+    parser.add_argument("--password", help="Neo4j password (required for --backend neo4j)")
+    parser.add_argument("--ranking-mode", choices=["pointwise", "listwise"], default="pointwise",
+                        help="Candidate ranking: two Y/N prompts per candidate, or windowed listwise prompts")
+    parser.add_argument("--llm-cache", help="SQLite file for the persistent LLM response cache")
+    parser.add_argument("--snapshot", help="Open the memory backend from this snapshot directory")
+    parser.add_argument("--time-window", help="Only expand triplets valid in this window: 1921, 1921-11, 1921..1925, "
+                                              "..1930, or 'auto' for the years named in the query")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--trace", help="Append per-stage timing spans to this JSON-lines file")
+    parser.add_argument("--metrics", help="Write counters and stage histograms here in Prometheus text format")
+
+    commands = parser.add_subparsers(dest="command")
+    serve_parser = commands.add_parser("serve", help="Run the HTTP/JSON query service")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--workers", type=int, default=8, help="Concurrent MACER runs")
+    serve_parser.add_argument("--max-queue", type=int, default=256,
+                              help="Queries allowed to wait for a worker before new ones get 503")
+    snapshot_parser = commands.add_parser("snapshot", help="Write the graph (memory or Neo4j) as a snapshot directory")
+    snapshot_parser.add_argument("--output", required=True, help="Snapshot directory to create")
+    communities_parser = commands.add_parser("communities", help="Detect communities and write them with summaries")
+    communities_parser.add_argument("--method", choices=METHODS, default="louvain")
+    communities_parser.add_argument("--levels", type=int, default=2, help="Hierarchy depth (level 0 is finest)")
+    communities_parser.add_argument("--resolution", type=float, default=1.0, help="Louvain resolution")
+    communities_parser.add_argument("--min-size", type=int, default=2, help="Smallest community written")
+    communities_parser.add_argument("--llm-summaries", action="store_true",
+                                    help="Summarize communities with the LLM instead of extractively")
+    ingest_parser = commands.add_parser("ingest", help="Stream JSONL/CSV files into the graph backend")
+    ingest_parser.add_argument("--entities", help="Entities file (.jsonl or .csv)")
+    ingest_parser.add_argument("--chunks", help="Chunks file (.jsonl or .csv)")
+    ingest_parser.add_argument("--quadruples", help="Triplets with Relation Context (.jsonl or .csv)")
+    ingest_parser.add_argument("--communities", help="Communities file (.jsonl or .csv)")
+    ingest_parser.add_argument("--workers", type=int, help="Parser processes (default: CPU count, 0 parses inline)")
+    ingest_parser.add_argument("--block-size", type=int, default=1000, help="Records per parse task")
+    ingest_parser.add_argument("--batch-size", type=int, help="Records per backend write transaction")
+    ingest_parser.add_argument("--max-pending", type=int, help="Parsed blocks allowed ahead of the writer")
+    ingest_parser.add_argument("--checkpoint", help="Progress file; rerunning with it resumes an interrupted load")
+    ingest_parser.add_argument("--rejects", help="Append invalid records (file, record number, error) here as JSON lines")
+    ingest_parser.add_argument("--save-snapshot", help="Memory backend: write the loaded graph to this snapshot directory")
     
     args = parser.parse_args()
-    
-    provider = Neo4jContextGraph(args.uri, args.user, args.password)
-    
-    if args.ingest:
+    if args.command is None and not args.query:
+        parser.error("--query is required unless a subcommand is given")
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    time_window = args.time_window
+    if time_window not in (None, "auto"):
         try:
-            ingest_sample_data(provider)
-            print("Ingestion complete.\n")
-        except Exception as e:
-            print(f"Ingestion failed: {e}")
-            provider.close()
-            return
+            time_window = TimeWindow.parse(time_window)
+        except ValueError as e:
+            parser.error(f"--time-window: {e}")
+
+    exporters = []
+    if args.trace:
+        exporters.append(JSONLinesExporter(args.trace))
+    if args.metrics:
+        exporters.append(PrometheusExporter(args.metrics))
+    # Instrumentation stays disabled (no-op spans and counters) unless an exporter asks for it
+    instrumentation = configure(enabled=bool(exporters), exporters=exporters)
+
+    provider = build_provider(args, parser)
+    if provider is None:
+        return
+    llm = build_llm(args)
+
+    if args.command == "serve":
+        # One provider (driver) and LLM client shared by every request
+        serve(QueryService(provider, llm, workers=args.workers, max_queue=args.max_queue,
+                           ranking_mode=args.ranking_mode), args.host, args.port)
+        instrumentation.flush()
+        provider.close()
+        return
+
+    if args.command == "snapshot":
+        if isinstance(provider, Neo4jContextGraph):
+            manifest = export_neo4j(provider, args.output)
+        else:
+            manifest = save_snapshot(provider, args.output)
+        print(f"Snapshot written to {args.output}: {manifest}")
+        provider.close()
+        return
+
+    if args.command == "ingest":
+        sources = {layer: getattr(args, layer) for layer in ("entities", "chunks", "quadruples", "communities")
+                   if getattr(args, layer)}
+        if not sources:
+            parser.error("ingest needs at least one of --entities, --chunks, --quadruples, --communities")
+        if args.checkpoint and not provider.persistent:
+            parser.error("--checkpoint needs a persistent backend; an in-memory load cannot resume")
+        report = ingest(provider, sources, workers=args.workers, block_size=args.block_size,
+                        batch_size=args.batch_size, max_pending=args.max_pending,
+                        checkpoint_path=args.checkpoint, rejects_path=args.rejects)
+        print(json.dumps(report, indent=2))
+        if args.save_snapshot and not isinstance(provider, Neo4jContextGraph):
+            print(f"Snapshot written to {args.save_snapshot}: {save_snapshot(provider, args.save_snapshot)}")
+        instrumentation.flush()
+        provider.close()
+        return
+
+    if args.command == "communities":
+        detector = CommunityDetector(provider, llm if args.llm_summaries else None, method=args.method,
+                                     levels=args.levels, resolution=args.resolution, min_size=args.min_size)
+        print(f"Detected: {detector.detect()}")
+        print(f"Written: {detector.write()}")
+        instrumentation.flush()
+        provider.close()
+        return
 
     # Initialize Components
-    llm = LLMInterface()
-    reasoner = MACERReasoner(provider, llm)
+    reasoner = MACERReasoner(provider, llm, ranking_mode=args.ranking_mode, time_window=time_window)
     
     print(f"Executing Integrated Reasoning Loop for: '{args.query}'\n")
     
@@ -84,7 +218,12 @@ def main():
         temporal = [f"{k}:{v}" for k,v in tr.items() if k.startswith('temporal')]
         if temporal:
              print(f"  Temporal: {temporal}")
-            
+
+    if args.llm_cache:
+        print(f"\nLLM cache: {llm.cache.stats()}")
+        llm.cache.close()
+
+    instrumentation.flush()
     provider.close()
 
 if __name__ == "__main__":
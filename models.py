@@ -1,5 +1,8 @@
+import json
+import sys
 from dataclasses import dataclass, field
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterable, Optional
+from temporal import Interval, interval_of
 
 @dataclass
 class EntityContext:
@@ -18,6 +21,15 @@ class RelationContext:
     provenance: List[str] = field(default_factory=list)  # Supporting sentences
     confidence: float = 1.0
     details: Dict[str, Any] = field(default_factory=dict)
+    # Explicit validity bounds (years, ISO dates or YYYYMMDD day codes); when unset the interval
+    # is derived from `temporal`, see temporal.interval_of
+    valid_from: Optional[Any] = None
+    valid_to: Optional[Any] = None
+
+    @property
+    def interval(self) -> Interval:
+        """Normalized [valid_from, valid_to) day codes, None where unbounded."""
+        return interval_of(self.temporal, self.valid_from, self.valid_to)
 
 @dataclass
 class ChunkNode:
@@ -33,6 +45,7 @@ class CommunityNode:
     label: str
     summary: str
     entities: List[str] = field(default_factory=list) # Entity IDs
+    level: int = 0 # 0 = finest; higher levels group the communities below them
 
 @dataclass
 class ContextNode:
@@ -46,7 +59,7 @@ class ContextNode:
         return hash(self.entity_id)
 
     def __eq__(self, other):
-        if not isinstance(other, ContextNode):
+        if not isinstance(other, (ContextNode, CompactNode)):
             return False
         return self.entity_id == other.entity_id
 
@@ -57,3 +70,370 @@ class ContextEdge:
     relation: str
     tail: str  # Node ID
     context: RelationContext = field(default_factory=RelationContext)
+
+def triplet_id(edge: ContextEdge) -> str:
+    """Deterministic id of the reified Triplet node for (h, r, t)."""
+    return f"{edge.head}_{edge.relation}_{edge.tail}"
+
+_ENTITY_PROPERTIES = {
+    "id": lambda node: node.entity_id,
+    "label": lambda node: node.label,
+    "attributes": lambda node: json.dumps(node.context.attributes),
+    "metadata": lambda node: json.dumps(node.context.metadata),
+    "external_links": lambda node: node.context.external_links
+}
+
+def entity_properties(node: ContextNode, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Flattens an entity into the property map stored on an Entity node (only `fields`, when given)."""
+    if fields is None:
+        return {name: get(node) for name, get in _ENTITY_PROPERTIES.items()}
+    return {name: _ENTITY_PROPERTIES[name](node) for name in fields if name in _ENTITY_PROPERTIES}
+
+def chunk_properties(chunk: ChunkNode) -> Dict[str, Any]:
+    """Flattens a chunk into the property map stored on a Chunk node."""
+    return {
+        "id": chunk.chunk_id,
+        "content": chunk.content,
+        "metadata": json.dumps(chunk.metadata)
+    }
+
+def community_properties(community: CommunityNode) -> Dict[str, Any]:
+    """Flattens a community into the property map stored on a Community node."""
+    return {
+        "id": community.community_id,
+        "label": community.label,
+        "summary": community.summary,
+        "level": community.level
+    }
+
+def triplet_properties(edge: ContextEdge) -> Dict[str, Any]:
+    """Flattens the Relation Context (rc) into the property map stored on a Triplet node."""
+    rc_props = {
+        "id": triplet_id(edge),
+        "relation": edge.relation,
+        "confidence": edge.context.confidence,
+        "geographic": edge.context.geographic,
+        "provenance": json.dumps(edge.context.provenance)
+    }
+
+    if edge.context.temporal:
+        for k, v in edge.context.temporal.items():
+            rc_props[f"temporal_{k}"] = v
+
+    if edge.context.details:
+        for k, v in edge.context.details.items():
+            rc_props[f"prop_{k}"] = v
+
+    # Normalized, indexed validity interval (absent when the fact is undated)
+    valid_from, valid_to = edge.context.interval
+    if valid_from is not None:
+        rc_props["valid_from"] = valid_from
+    if valid_to is not None:
+        rc_props["valid_to"] = valid_to
+
+    return rc_props
+
+def entity_from_properties(props: Dict[str, Any]) -> ContextNode:
+    """Inverse of `entity_properties`, e.g. for exporting Neo4j nodes."""
+    return ContextNode(props["id"], props.get("label") or "", context=EntityContext(
+        attributes=json.loads(props.get("attributes") or "{}"),
+        metadata=json.loads(props.get("metadata") or "{}"),
+        external_links=list(props.get("external_links") or [])
+    ))
+
+def chunk_from_properties(props: Dict[str, Any]) -> ChunkNode:
+    """Inverse of `chunk_properties`."""
+    return ChunkNode(props["id"], props.get("content") or "", json.loads(props.get("metadata") or "{}"))
+
+def edge_from_properties(head: str, tail: str, props: Dict[str, Any]) -> ContextEdge:
+    """Inverse of `triplet_properties`: folds temporal_* and prop_* keys back into the Relation Context."""
+    temporal = {k[len("temporal_"):]: v for k, v in props.items() if k.startswith("temporal_")}
+    details = {k[len("prop_"):]: v for k, v in props.items() if k.startswith("prop_")}
+    context = RelationContext(
+        temporal=temporal or None,
+        geographic=props.get("geographic"),
+        provenance=json.loads(props.get("provenance") or "[]"),
+        confidence=props.get("confidence", 1.0),
+        details=details
+    )
+    # Stored bounds that `temporal` does not imply were set explicitly
+    stored = (props.get("valid_from"), props.get("valid_to"))
+    if stored != context.interval:
+        context.valid_from, context.valid_to = stored
+    return ContextEdge(head, props["relation"], tail, context)
+
+# --- Compact variants ---
+# Slotted stand-ins for ContextNode/ContextEdge and their contexts for very large in-memory graphs:
+# no per-instance __dict__, interned id/label/relation strings, and a context object only when it
+# holds something (empty ones, and empty containers inside contexts, are shared read-only singletons).
+# The Frozen* forms are immutable throughout, so they can be shared across threads and deduplicated.
+
+class FrozenDict(dict):
+    """A dict that refuses mutation; used for shared empty maps and frozen contexts."""
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+class FrozenList(list):
+    """A list that refuses mutation; used for shared empty lists and frozen contexts."""
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = append = clear = extend = insert = pop = remove = \
+        reverse = sort = _readonly
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+EMPTY_DICT = FrozenDict()
+EMPTY_LIST = FrozenList()
+
+def freeze(value: Any) -> Any:
+    """Deep read-only copy of a JSON-like value (dicts and lists become FrozenDict/FrozenList)."""
+    if isinstance(value, dict):
+        return FrozenDict({sys.intern(k) if isinstance(k, str) else k: freeze(v) for k, v in value.items()}) \
+            if value else EMPTY_DICT
+    if isinstance(value, (list, tuple)):
+        return FrozenList(freeze(v) for v in value) if value else EMPTY_LIST
+    return value
+
+def _shared(value: Any, frozen: bool) -> Any:
+    """Empty containers become the shared singletons; non-empty ones are kept (or frozen)."""
+    if frozen:
+        return freeze(value)
+    if isinstance(value, dict) and not value:
+        return EMPTY_DICT
+    if isinstance(value, list) and not value:
+        return EMPTY_LIST
+    return value
+
+class _Slotted:
+    """Field-wise equality and repr for the slotted models; compares equal to the dataclass counterpart."""
+    __slots__ = ()
+    _fields: tuple = ()
+
+    def __eq__(self, other):
+        if not all(hasattr(other, name) for name in self._fields):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{n}={getattr(self, n)!r}' for n in self._fields)})"
+
+    def __setattr__(self, name, value):
+        if getattr(type(self), "_frozen", False):
+            raise AttributeError(f"{type(self).__name__} is immutable")
+        object.__setattr__(self, name, value)
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, name) for name in self._fields)
+
+class CompactEntityContext(_Slotted):
+    """Slotted EntityContext; empty containers are shared read-only singletons (assign a new one to fill)."""
+    __slots__ = ("attributes", "metadata", "external_links", "multimodal_context")
+    _fields = __slots__
+    _frozen = False
+
+    def __init__(self, attributes=None, metadata=None, external_links=None, multimodal_context=None):
+        frozen = self._frozen
+        object.__setattr__(self, "attributes", _shared(attributes or {}, frozen))
+        object.__setattr__(self, "metadata", _shared(metadata or {}, frozen))
+        object.__setattr__(self, "external_links", _shared(external_links or [], frozen))
+        object.__setattr__(self, "multimodal_context", _shared(multimodal_context or [], frozen))
+
+    def is_empty(self) -> bool:
+        return not (self.attributes or self.metadata or self.external_links or self.multimodal_context)
+
+class FrozenEntityContext(CompactEntityContext):
+    """Immutable EntityContext, safe to share across threads and nodes."""
+    __slots__ = ()
+    _frozen = True
+
+class CompactRelationContext(_Slotted):
+    """Slotted RelationContext; empty containers are shared read-only singletons (assign a new one to fill)."""
+    __slots__ = ("temporal", "geographic", "quantitative", "provenance", "confidence", "details",
+                 "valid_from", "valid_to")
+    _fields = __slots__
+    _frozen = False
+
+    def __init__(self, temporal=None, geographic=None, quantitative=None, provenance=None, confidence=1.0,
+                 details=None, valid_from=None, valid_to=None):
+        frozen = self._frozen
+        values = (freeze(temporal) if frozen and temporal else temporal, geographic,
+                  freeze(quantitative) if frozen and quantitative else quantitative,
+                  _shared(provenance or [], frozen), confidence, _shared(details or {}, frozen), valid_from, valid_to)
+        for name, value in zip(self._fields, values):
+            object.__setattr__(self, name, value)
+
+    interval = RelationContext.interval
+
+    def is_default(self) -> bool:
+        return self == _DEFAULT_RELATION
+
+    def key(self) -> Optional[tuple]:
+        """Hashable identity of the field values, or None when a value is not hashable as JSON-like data."""
+        try:
+            key = tuple(_key(getattr(self, name)) for name in self._fields)
+            hash(key)
+            return key
+        except TypeError:
+            return None
+
+class FrozenRelationContext(CompactRelationContext):
+    """Immutable RelationContext, safe to share across threads and edges."""
+    __slots__ = ()
+    _frozen = True
+
+def _key(value: Any) -> Any:
+    if isinstance(value, dict):
+        return ("d",) + tuple(sorted((k, _key(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return ("l",) + tuple(_key(v) for v in value)
+    return value
+
+_DEFAULT_RELATION = RelationContext()
+EMPTY_ENTITY_CONTEXT = FrozenEntityContext()
+DEFAULT_RELATION_CONTEXT = FrozenRelationContext()
+
+class CompactNode(_Slotted):
+    """
+    Slotted ContextNode: interned id, label and type, and an entity context stored only when
+    non-empty (`context` reads as the shared empty one otherwise).
+    """
+    __slots__ = ("entity_id", "label", "type", "_context")
+    _fields = ("entity_id", "label", "type", "context")
+    _frozen = False
+    _context_type = CompactEntityContext
+
+    def __init__(self, entity_id: str, label: str, type: str = "Entity", context=None):
+        object.__setattr__(self, "entity_id", sys.intern(entity_id))
+        object.__setattr__(self, "label", sys.intern(label))
+        object.__setattr__(self, "type", sys.intern(type))
+        object.__setattr__(self, "_context", self._adopt(context))
+
+    @classmethod
+    def _adopt(cls, context) -> Optional[CompactEntityContext]:
+        if context is None:
+            return None
+        if type(context) is not cls._context_type:
+            context = cls._context_type(context.attributes, context.metadata, context.external_links,
+                                        context.multimodal_context)
+        return None if context.is_empty() else context
+
+    @property
+    def context(self):
+        return self._context if self._context is not None else EMPTY_ENTITY_CONTEXT
+
+    @context.setter
+    def context(self, value):
+        self._context = self._adopt(value)
+
+    # Identity is the entity id, as for ContextNode
+    def __eq__(self, other):
+        if not isinstance(other, (ContextNode, CompactNode)):
+            return False
+        return self.entity_id == other.entity_id
+
+    def __hash__(self):
+        return hash(self.entity_id)
+
+    @classmethod
+    def from_node(cls, node) -> "CompactNode":
+        if type(node) is cls:
+            return node
+        return cls(node.entity_id, node.label, node.type, node.context)
+
+    def to_node(self) -> ContextNode:
+        ctx = self.context
+        return ContextNode(self.entity_id, self.label, self.type, EntityContext(
+            dict(ctx.attributes), dict(ctx.metadata), list(ctx.external_links), list(ctx.multimodal_context)))
+
+class FrozenNode(CompactNode):
+    """Immutable CompactNode, safe to share across threads."""
+    __slots__ = ()
+    _frozen = True
+    _context_type = FrozenEntityContext
+
+class ContextPool:
+    """
+    Deduplicates frozen relation contexts: equal contexts come back as one shared instance
+    (a graph with a few thousand distinct contexts over millions of edges stores only those).
+    """
+
+    def __init__(self):
+        self._contexts: Dict[tuple, FrozenRelationContext] = {}
+
+    def __len__(self):
+        return len(self._contexts)
+
+    def share(self, context: FrozenRelationContext) -> FrozenRelationContext:
+        key = context.key()
+        if key is None:
+            return context
+        return self._contexts.setdefault(key, context)
+
+class CompactEdge(_Slotted):
+    """
+    Slotted ContextEdge: interned head/relation/tail (so edges share the node id strings) and a
+    relation context stored only when it differs from the default one.
+    """
+    __slots__ = ("head", "relation", "tail", "_context")
+    _fields = ("head", "relation", "tail", "context")
+    _frozen = False
+    _context_type = CompactRelationContext
+
+    def __init__(self, head: str, relation: str, tail: str, context=None, pool: Optional[ContextPool] = None):
+        object.__setattr__(self, "head", sys.intern(head))
+        object.__setattr__(self, "relation", sys.intern(relation))
+        object.__setattr__(self, "tail", sys.intern(tail))
+        object.__setattr__(self, "_context", self._adopt(context, pool))
+
+    @classmethod
+    def _adopt(cls, context, pool: Optional[ContextPool] = None) -> Optional[CompactRelationContext]:
+        if context is None:
+            return None
+        if type(context) is not cls._context_type:
+            context = cls._context_type(*(getattr(context, name) for name in CompactRelationContext._fields))
+        if context.is_default():
+            return None
+        return pool.share(context) if pool is not None and cls._frozen else context
+
+    @property
+    def context(self):
+        return self._context if self._context is not None else DEFAULT_RELATION_CONTEXT
+
+    @context.setter
+    def context(self, value):
+        self._context = self._adopt(value)
+
+    @classmethod
+    def from_edge(cls, edge, pool: Optional[ContextPool] = None) -> "CompactEdge":
+        if type(edge) is cls and pool is None:
+            return edge
+        return cls(edge.head, edge.relation, edge.tail, edge.context, pool)
+
+    def to_edge(self) -> ContextEdge:
+        ctx = self.context
+        return ContextEdge(self.head, self.relation, self.tail, RelationContext(
+            dict(ctx.temporal) if ctx.temporal is not None else None, ctx.geographic,
+            dict(ctx.quantitative) if ctx.quantitative is not None else None, list(ctx.provenance),
+            ctx.confidence, dict(ctx.details), ctx.valid_from, ctx.valid_to))
+
+class FrozenEdge(CompactEdge):
+    """Immutable CompactEdge, safe to share across threads; hashable by (head, relation, tail)."""
+    __slots__ = ()
+    _frozen = True
+    _context_type = FrozenRelationContext
+
+    def __hash__(self):
+        return hash((self.head, self.relation, self.tail))
@@ -1,20 +1,142 @@
 from neo4j import GraphDatabase
-import json
-from typing import List, Dict, Any, Optional
-from models import ContextNode, ContextEdge, EntityContext, RelationContext, ChunkNode, CommunityNode
+from neo4j.exceptions import AuthError, ClientError, ServiceUnavailable, SessionExpired
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from models import (ContextNode, ContextEdge, ChunkNode, CommunityNode, triplet_id, edge_from_properties,
+                    entity_properties, chunk_properties, community_properties, triplet_properties)
+from graph_provider import TripletInput, batched, neighborhood_rows, run_batches
+from projection import FULL, Fields, Projection, chunk_record, cypher_map, entity_record, triplet_record
+from temporal import TimeWindow
+from embeddings import Embedder, HashingEmbedder, VectorIndex
+from label_index import TOKEN_PATTERN
+from instrumentation import count
+
+# LIMIT needs an integer; stands in for "no per-hop cap"
+UNLIMITED = 2 ** 62
+LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
 
 class Neo4jContextGraph:
     """Enhanced Context Graph powered by Neo4j and ToG-3 concepts."""
 
-    def __init__(self, uri, user, password):
+    LABEL_INDEX = "entity_label_fulltext"
+    persistent = True
+    CHUNK_VECTOR_INDEX = "chunk_embedding"
+
+    def __init__(self, uri, user, password, batch_size: int = 1000, max_retries: int = 3, retry_backoff: float = 0.2,
+                 embedder: Optional[Embedder] = None, chunk_index_path: Optional[str] = None):
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.embedder = embedder or HashingEmbedder()
+        # Local chunk vectors, used when the server has no vector index. Without a saved index they are
+        # re-embedded from the stored chunks on the first search (see rebuild_chunk_index).
+        self._chunk_index_synced = bool(chunk_index_path and VectorIndex.exists(chunk_index_path))
+        if self._chunk_index_synced:
+            self.chunk_index = VectorIndex.load(chunk_index_path)
+        else:
+            self.chunk_index = VectorIndex(self.embedder.dim)
+        self._chunk_index_lock = threading.Lock()
+        # Bumped on every write through this provider so read-side caches can tell they are stale
+        self.generation = 0
+        # Queries/transactions sent to the server (one per attempt), for load reports
+        self.round_trips = 0
+        self._round_trip_lock = threading.Lock()
+        # Request-scoped sessions are per thread, so concurrent callers never share one.
+        self._local = threading.local()
+        # Whether the server has an online chunk vector index; None until the first search asks
+        self.vector_index_supported: Optional[bool] = None
 
     def close(self):
         self.driver.close()
 
+    @contextmanager
+    def session_scope(self):
+        """
+        Reuses a single session for every query issued by this thread until the scope exits
+        (e.g. one whole MACER reasoning run). Nested scopes share the outer session.
+        """
+        if getattr(self._local, "session", None) is not None:
+            yield self._local.session
+            return
+        session = self.driver.session()
+        self._local.session = session
+        try:
+            yield session
+        finally:
+            self._local.session = None
+            session.close()
+
+    @contextmanager
+    def _session(self):
+        """Yields the request-scoped session if one is open, otherwise a short-lived one."""
+        scoped = getattr(self._local, "session", None)
+        if scoped is not None:
+            yield scoped
+        else:
+            with self.driver.session() as session:
+                yield session
+
+    def _count_round_trip(self):
+        with self._round_trip_lock:
+            self.round_trips += 1
+        count("backend_round_trips_total", backend="neo4j")
+
     def query(self, cypher, parameters=None):
-        with self.driver.session() as session:
-            return session.run(cypher, parameters).data()
+        """Runs an auto-commit query and materializes all records."""
+        self._count_round_trip()
+        with self._session() as session:
+            records = session.run(cypher, parameters).data()
+        count("cypher_rows_total", len(records))
+        return records
+
+    def query_iter(self, cypher, parameters=None) -> Iterator[Dict[str, Any]]:
+        """Streams records lazily instead of materializing the whole result."""
+        self._count_round_trip()
+        with self._session() as session:
+            result = session.run(cypher, parameters)
+            for record in result:
+                count("cypher_rows_total")
+                yield record.data()
+
+    def _execute(self, cypher: str, parameters: Optional[Dict[str, Any]], write: bool) -> List[Dict[str, Any]]:
+        """
+        Runs a managed transaction routed to a reader or writer. The driver already retries
+        transient errors inside the transaction function; connection loss is retried here with backoff.
+        """
+        work = lambda tx: tx.run(cypher, parameters).data()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._count_round_trip()
+                with self._session() as session:
+                    records = session.execute_write(work) if write else session.execute_read(work)
+                count("cypher_rows_total", len(records))
+                return records
+            except (ServiceUnavailable, SessionExpired):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.retry_backoff * (2 ** attempt))
+
+    def execute_read(self, cypher: str, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self._execute(cypher, parameters, write=False)
+
+    def execute_write(self, cypher: str, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        return self._execute(cypher, parameters, write=True)
+
+    def _has_vector_index(self) -> bool:
+        try:
+            rows = self.query("SHOW INDEXES YIELD name, type, state WHERE name = $name AND type = 'VECTOR' "
+                              "RETURN state", {"name": self.CHUNK_VECTOR_INDEX})
+        except ClientError as e:
+            # A bad password or a missing privilege is not an answer about the index
+            if isinstance(e, AuthError) or (e.code or "").startswith("Neo.ClientError.Security."):
+                raise
+            # Servers without vector support may not know the VECTOR index type either
+            return False
+        return any(row['state'] == 'ONLINE' for row in rows)
 
     def initialize_schema(self):
         """Creates indexes and constraints."""
@@ -23,123 +145,452 @@ class Neo4jContextGraph:
             "CREATE CONSTRAINT IF NOT EXISTS FOR (c:Chunk) REQUIRE c.id IS UNIQUE",
             "CREATE CONSTRAINT IF NOT EXISTS FOR (m:Community) REQUIRE m.id IS UNIQUE",
             "CREATE INDEX IF NOT EXISTS FOR (e:Entity) ON (e.label)",
+            "CREATE INDEX IF NOT EXISTS FOR (m:Community) ON (m.level)",
+            # Range indexes on the normalized triplet validity interval (YYYYMMDD day codes)
+            "CREATE INDEX IF NOT EXISTS FOR (tr:Triplet) ON (tr.valid_from)",
+            "CREATE INDEX IF NOT EXISTS FOR (tr:Triplet) ON (tr.valid_to)",
+            # Range indexes cannot serve CONTAINS/token matches; label search goes through Lucene
+            f"CREATE FULLTEXT INDEX {self.LABEL_INDEX} IF NOT EXISTS FOR (e:Entity) ON EACH [e.label] "
+            "OPTIONS {indexConfig: {`fulltext.analyzer`: 'english'}}",
         ]
-        with self.driver.session() as session:
+        with self._session() as session:
             for q in queries:
                 session.run(q)
+            # Vector indexes need Neo4j 5.11+; older servers fall back to the local chunk index
+            try:
+                session.run(
+                    f"CREATE VECTOR INDEX {self.CHUNK_VECTOR_INDEX} IF NOT EXISTS FOR (c:Chunk) ON (c.embedding) "
+                    f"OPTIONS {{indexConfig: {{`vector.dimensions`: {self.embedder.dim}, "
+                    "`vector.similarity_function`: 'cosine'}}"
+                ).consume()
+                self.vector_index_supported = True
+            except ClientError:
+                self.vector_index_supported = False
 
-    def add_entity(self, node: ContextNode):
+    def _write_batches(self, cypher: str, rows: Iterable[Dict[str, Any]], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Writes rows through an UNWIND statement, one explicit transaction per batch.
+        Returns per-batch throughput stats (see `graph_provider.run_batches`).
+        """
+        def write(batch: List[Dict[str, Any]]):
+            self._count_round_trip()
+            session.execute_write(lambda tx: tx.run(cypher, rows=batch).consume())
+            # Providers are shared across server workers; an unlocked += can lose a bump
+            with self._round_trip_lock:
+                self.generation += 1
+
+        with self._session() as session:
+            return run_batches(rows, batch_size or self.batch_size, write)
+
+    def add_entities_bulk(self, nodes: Iterable[ContextNode], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
         cypher = """
-        MERGE (e:Entity {id: $id})
-        SET e.label = $label,
-            e.attributes = $attributes,
-            e.metadata = $metadata,
-            e.external_links = $links
-        """
-        params = {
-            "id": node.entity_id,
-            "label": node.label,
-            "attributes": json.dumps(node.context.attributes),
-            "metadata": json.dumps(node.context.metadata),
-            "links": node.context.external_links
-        }
-        self.query(cypher, params)
+        UNWIND $rows AS row
+        MERGE (e:Entity {id: row.id})
+        SET e.label = row.label,
+            e.attributes = row.attributes,
+            e.metadata = row.metadata,
+            e.external_links = row.external_links
+        """
+        rows = (entity_properties(node) for node in nodes)
+        return self._write_batches(cypher, rows, batch_size)
 
-    def add_chunk(self, chunk: ChunkNode):
+    def add_chunks_bulk(self, chunks: Iterable[ChunkNode], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        cypher = """
+        UNWIND $rows AS row
+        MERGE (c:Chunk {id: row.id})
+        SET c.content = row.content,
+            c.metadata = row.metadata,
+            c.embedding = row.embedding
+        """
+        size = batch_size or self.batch_size
+
+        def rows():
+            # Embed a batch at a time so the vectors never outgrow one write batch
+            for batch in batched(chunks, size):
+                vectors = self.embedder.embed([chunk.content for chunk in batch])
+                # The local index only serves searches when the server has none, and an unsynced one
+                # is rebuilt from the stored chunks before its first search anyway
+                if self.vector_index_supported is not True and self._chunk_index_synced:
+                    self.chunk_index.add_many([chunk.chunk_id for chunk in batch], vectors)
+                for chunk, vector in zip(batch, vectors):
+                    yield dict(chunk_properties(chunk), embedding=vector.tolist())
+
+        return self._write_batches(cypher, rows(), size)
+
+    def add_communities_bulk(self, communities: Iterable[CommunityNode], batch_size: Optional[int] = None,
+                             replace_members: bool = False) -> List[Dict[str, Any]]:
+        """
+        Upserts Community nodes and their PART_OF links in UNWIND batches. With `replace_members`
+        the PART_OF links of entities no longer listed are deleted in the same statement.
+        """
+        prune = """
+        WITH m, row
+        OPTIONAL MATCH (old:Entity)-[p:PART_OF]->(m)
+        WHERE NOT old.id IN row.entities
+        DELETE p
+        WITH DISTINCT m, row
+        """ if replace_members else """
+        WITH m, row
+        """
         cypher = """
-        MERGE (c:Chunk {id: $id})
-        SET c.content = $content,
-            c.metadata = $metadata
-        """
-        params = {
-            "id": chunk.chunk_id,
-            "content": chunk.content,
-            "metadata": json.dumps(chunk.metadata)
+        UNWIND $rows AS row
+        MERGE (m:Community {id: row.id})
+        SET m.label = row.label,
+            m.summary = row.summary,
+            m.level = row.level
+        """ + prune + """
+        UNWIND row.entities AS entity_id
+        MATCH (e:Entity {id: entity_id})
+        MERGE (e)-[:PART_OF]->(m)
+        """
+        rows = (dict(community_properties(community), entities=list(community.entities))
+                for community in communities)
+        return self._write_batches(cypher, rows, batch_size)
+
+    def delete_communities(self, community_ids: Iterable[str], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        cypher = """
+        UNWIND $rows AS id
+        MATCH (m:Community {id: id})
+        DETACH DELETE m
+        """
+        return self._write_batches(cypher, community_ids, batch_size)
+
+    @staticmethod
+    def _triplet_row(edge: ContextEdge, chunk_ids: Optional[List[str]]) -> Dict[str, Any]:
+        return {
+            "head_id": edge.head,
+            "tail_id": edge.tail,
+            "tid": triplet_id(edge),
+            # Explicit nulls so `SET tr += props` drops bounds a re-written triplet no longer has
+            "props": {"valid_from": None, "valid_to": None, **triplet_properties(edge)},
+            "chunk_ids": list(chunk_ids or [])
         }
-        self.query(cypher, params)
 
-    def add_community(self, community: CommunityNode):
+    def add_triplets_bulk(self, triplets: Iterable[TripletInput], batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Adds reified Triplet nodes with their Relation Context (rc) in UNWIND batches.
+        Items are either a ContextEdge or an (edge, chunk_ids) pair linking EVIDENCE_IN chunks.
+        """
         cypher = """
-        MERGE (m:Community {id: $id})
-        SET m.label = $label,
-            m.summary = $summary
-        """
-        self.query(cypher, {"id": community.community_id, "label": community.label, "summary": community.summary})
-        
-        # Link entities to community
-        for entity_id in community.entities:
-            self.query("""
-            MATCH (e:Entity {id: $entity_id}), (m:Community {id: $community_id})
-            MERGE (e)-[:PART_OF]->(m)
-            """, {"entity_id": entity_id, "community_id": community.community_id})
+        UNWIND $rows AS row
+        MATCH (h:Entity {id: row.head_id})
+        MATCH (t:Entity {id: row.tail_id})
+        MERGE (tr:Triplet {id: row.tid})
+        SET tr += row.props
+        MERGE (h)-[:HAS_SUBJECT_OF]->(tr)
+        MERGE (tr)-[:HAS_OBJECT_OF]->(t)
+        WITH tr, row
+        UNWIND row.chunk_ids AS cid
+        MATCH (c:Chunk {id: cid})
+        MERGE (tr)-[:EVIDENCE_IN]->(c)
+        """
+        rows = (self._triplet_row(*item) if isinstance(item, tuple) else self._triplet_row(item, None)
+                for item in triplets)
+        return self._write_batches(cypher, rows, batch_size)
+
+    def add_entity(self, node: ContextNode):
+        self.add_entities_bulk([node])
+
+    def add_chunk(self, chunk: ChunkNode):
+        self.add_chunks_bulk([chunk])
+
+    def add_community(self, community: CommunityNode):
+        self.add_communities_bulk([community])
 
     def add_triplet_with_context(self, edge: ContextEdge, chunk_ids: List[str] = None):
         """
         Adds a reified Triplet node with rich Relation Context (rc).
         Follows the (h, r, t, rc) quadruple structure.
         """
-        triplet_id = f"{edge.head}_{edge.relation}_{edge.tail}"
-        
-        # Flatten Relation Context for Neo4j properties
-        rc_props = {
-            "id": triplet_id,
-            "relation": edge.relation,
-            "confidence": edge.context.confidence,
-            "geographic": edge.context.geographic,
-            "provenance": json.dumps(edge.context.provenance)
-        }
-        
-        if edge.context.temporal:
-            for k, v in edge.context.temporal.items():
-                rc_props[f"temporal_{k}"] = v
-        
-        if edge.context.details:
-            for k, v in edge.context.details.items():
-                rc_props[f"prop_{k}"] = v
+        self.add_triplets_bulk([(edge, chunk_ids)])
 
+    @staticmethod
+    def _lucene_query(text: str) -> str:
+        """OR of the escaped query tokens; the index analyzer drops stop words."""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        return " OR ".join(LUCENE_SPECIAL.sub(r"\\\1", t) for t in tokens)
+
+    def find_entities_by_label(self, label: str, limit: int = 10) -> List[str]:
+        """Ids of entities whose label matches `label`, ranked by full-text score."""
+        lucene = self._lucene_query(label)
+        if not lucene:
+            return []
         cypher = """
-        MATCH (h:Entity {id: $head_id})
-        MATCH (t:Entity {id: $tail_id})
-        MERGE (tr:Triplet {id: $tid})
-        SET tr += $props
-        MERGE (h)-[:HAS_SUBJECT_OF]->(tr)
-        MERGE (tr)-[:HAS_OBJECT_OF]->(t)
+        CALL db.index.fulltext.queryNodes($index, $q) YIELD node, score
+        RETURN node.id as id, score
+        ORDER BY score DESC
+        LIMIT $limit
         """
-        self.query(cypher, {
-            "head_id": edge.head,
-            "tail_id": edge.tail,
-            "tid": triplet_id,
-            "props": rc_props
-        })
-
-        if chunk_ids:
-            for cid in chunk_ids:
-                self.query("""
-                    MATCH (tr:Triplet {id: $tid}), (c:Chunk {id: $cid})
-                    MERGE (tr)-[:EVIDENCE_IN]->(c)
-                """, {"tid": triplet_id, "cid": cid})
-
-    def get_relation_context(self, triplet_id: str) -> Dict[str, Any]:
+        results = self.execute_read(cypher, {"index": self.LABEL_INDEX, "q": lucene, "limit": limit})
+        return [res['id'] for res in results]
+
+    def get_entity(self, entity_id: str, fields: Fields = None) -> Dict[str, Any]:
+        cypher = f"MATCH (e:Entity {{id: $id}}) RETURN {cypher_map('e', fields)} AS e"
+        result = self.execute_read(cypher, {"id": entity_id})
+        return entity_record(result[0]['e']) if result else {}
+
+    def get_entities(self, entity_ids: List[str], fields: Fields = None) -> List[Dict[str, Any]]:
+        cypher = f"MATCH (e:Entity) WHERE e.id IN $ids RETURN {cypher_map('e', fields)} AS e"
+        return [entity_record(row['e']) for row in self.execute_read(cypher, {"ids": list(entity_ids)})]
+
+    def iter_entity_edges(self) -> Iterator[Tuple[str, str, str]]:
+        """Streams every Entity-Triplet-Entity hop as (head id, relation, tail id)."""
+        cypher = """
+        MATCH (h:Entity)-[:HAS_SUBJECT_OF]->(tr:Triplet)-[:HAS_OBJECT_OF]->(t:Entity)
+        RETURN h.id AS head, tr.relation AS relation, t.id AS tail
+        """
+        for row in self.query_iter(cypher):
+            yield row['head'], row['relation'], row['tail']
+
+    def iter_communities(self) -> Iterator[Tuple[str, int, List[str]]]:
+        """Streams every Community as (id, level, member entity ids)."""
+        cypher = """
+        MATCH (m:Community)
+        OPTIONAL MATCH (e:Entity)-[:PART_OF]->(m)
+        RETURN m.id AS id, coalesce(m.level, 0) AS level, collect(e.id) AS entities
+        """
+        for row in self.query_iter(cypher):
+            yield row['id'], row['level'], row['entities']
+
+    def get_relation_context(self, tid: str) -> Dict[str, Any]:
         """Fetches the RC (Relation Context) for a quadruple."""
-        cypher = "MATCH (tr:Triplet {id: $tid}) RETURN tr"
-        result = self.query(cypher, {"tid": triplet_id})
-        return result[0]['tr'] if result else {}
+        cypher = "MATCH (tr:Triplet {id: $tid}) RETURN properties(tr) AS tr"
+        result = self.execute_read(cypher, {"tid": tid})
+        return triplet_record(result[0]['tr']) if result else {}
+
+    def get_communities_for(self, entity_ids: List[str]) -> List[Dict[str, Any]]:
+        cypher = """
+        MATCH (e:Entity)-[:PART_OF]->(m:Community)
+        WHERE e.id IN $ids
+        RETURN DISTINCT m.id as id, m.label as label, m.summary as summary, m.level as level
+        """
+        return self.execute_read(cypher, {"ids": entity_ids})
+
+    def get_triplet_chunks(self, tid: str) -> List[Dict[str, Any]]:
+        cypher = """
+        MATCH (tr:Triplet {id: $tid})-[:EVIDENCE_IN]->(c:Chunk)
+        RETURN c.id as id, c.content as content, c.metadata as metadata
+        """
+        return [chunk_record(row) for row in self.execute_read(cypher, {"tid": tid})]
+
+    def get_fewshot_triples(self, relation: str, limit: int = 3) -> List[Dict[str, Any]]:
+        cypher = """
+        MATCH (h:Entity)-[:HAS_SUBJECT_OF]->(tr:Triplet {relation: $rel})-[:HAS_OBJECT_OF]->(t:Entity)
+        RETURN h.label as head, tr.relation as relation, t.label as tail
+        LIMIT $limit
+        """
+        return self.execute_read(cypher, {"rel": relation, "limit": limit})
+
+    def expand_entities(self, entity_ids: List[str], fanout: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        One Entity-Triplet-Entity hop in either direction for many entities in one round trip,
+        at most `fanout` hops per entity. Never walks Chunk or Community nodes.
+        """
+        cypher = """
+        UNWIND $ids AS id
+        MATCH (e:Entity {id: id})
+        CALL {
+            WITH e
+            MATCH (e)-[:HAS_SUBJECT_OF]->(tr:Triplet)-[:HAS_OBJECT_OF]->(t:Entity)
+            RETURN tr, e AS h, t
+            LIMIT $fanout
+            UNION
+            WITH e
+            MATCH (h:Entity)-[:HAS_SUBJECT_OF]->(tr:Triplet)-[:HAS_OBJECT_OF]->(e)
+            RETURN tr, h, e AS t
+            LIMIT $fanout
+        }
+        WITH id, collect({tid: tr.id, head: h.id, relation: tr.relation, tail: t.id,
+                          head_label: h.label, tail_label: t.label}) AS hops
+        RETURN id, hops[..$fanout] AS hops
+        """
+        results = self.execute_read(cypher, {"ids": list(entity_ids), "fanout": fanout})
+        expansions = {eid: [] for eid in entity_ids}
+        expansions.update({r['id']: r['hops'] for r in results})
+        return expansions
 
     def search_chunks_vector(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
-        Stub for Neo4j Vector Index search.
-        In a real system, this uses db.index.vector.queryNodes.
+        Dense chunk retrieval: rows of {'c': chunk properties, 'score': cosine}, best first.
+        Uses the Neo4j vector index when available, otherwise the local chunk index (rebuilt from the
+        stored chunks on first use unless it was loaded from `chunk_index_path`).
+        """
+        if self.vector_index_supported is None:
+            self.vector_index_supported = self._has_vector_index()
+        vector = self.embedder.embed([query])[0]
+        if self.vector_index_supported:
+            cypher = """
+            CALL db.index.vector.queryNodes($index, $limit, $vector) YIELD node, score
+            RETURN node {.id, .content, .metadata} as c, score
+            """
+            rows = self.execute_read(cypher, {"index": self.CHUNK_VECTOR_INDEX, "limit": limit, "vector": vector.tolist()})
+            # The cosine index scores (1 + cos) / 2; map back to cosine so both paths rank and filter alike
+            hits = [(row, 2 * row['score'] - 1) for row in rows]
+            return [{"c": chunk_record(row['c']), "score": score} for row, score in hits if score > 0]
+
+        if not self._chunk_index_synced:
+            with self._chunk_index_lock:
+                if not self._chunk_index_synced:
+                    self.rebuild_chunk_index()
+        hits = [(cid, score) for cid, score in self.chunk_index.search(vector, limit) if score > 0]
+        if not hits:
+            return []
+        cypher = "MATCH (c:Chunk) WHERE c.id IN $ids RETURN c {.id, .content, .metadata} as c"
+        chunks = {row['c']['id']: row['c'] for row in self.execute_read(cypher, {"ids": [cid for cid, _ in hits]})}
+        return [{"c": chunk_record(chunks[cid]), "score": score} for cid, score in hits if cid in chunks]
+
+    def rebuild_chunk_index(self, batch_size: Optional[int] = None):
+        """Re-embeds every stored chunk into the local index (e.g. after loading data from another process)."""
+        # Built aside and swapped in, so concurrent searches never see a half-filled index
+        index = VectorIndex(self.embedder.dim)
+        rows = self.query_iter("MATCH (c:Chunk) RETURN c.id as id, c.content as content")
+        for batch in batched(rows, batch_size or self.batch_size):
+            index.add_many([r['id'] for r in batch], self.embedder.embed([r['content'] for r in batch]))
+        self.chunk_index = index
+        self._chunk_index_synced = True
+
+    @staticmethod
+    def _window_bounds(var: str, window: TimeWindow) -> Tuple[List[str], Dict[str, Any]]:
+        """Cypher conditions (and parameters) that `var`'s validity interval reaches into `window`; undated passes."""
+        bounds, params = [], {}
+        if window.end is not None:
+            bounds.append(f"({var}.valid_from IS NULL OR {var}.valid_from < $window_end)")
+            params["window_end"] = window.end
+        if window.start is not None:
+            bounds.append(f"({var}.valid_to IS NULL OR {var}.valid_to > $window_start)")
+            params["window_start"] = window.start
+        return bounds, params
+
+    def find_triplets_in_window(self, window: TimeWindow, limit: int = 100) -> List[str]:
+        """
+        Ids of dated triplets valid at some point of `window`, earliest first. Each branch of the
+        UNION is a seek on one of the valid_from/valid_to range indexes.
+        """
+        params: Dict[str, Any] = {"limit": limit}
+        starts = ["tr.valid_from IS NOT NULL"]
+        open_start = ["tr.valid_from IS NULL", "tr.valid_to IS NOT NULL"]
+        if window.end is not None:
+            starts = ["tr.valid_from < $window_end"]
+            params["window_end"] = window.end
+        if window.start is not None:
+            starts.append("(tr.valid_to IS NULL OR tr.valid_to > $window_start)")
+            open_start[1] = "tr.valid_to > $window_start"
+            params["window_start"] = window.start
+        cypher = f"""
+        CALL {{
+            MATCH (tr:Triplet) WHERE {" AND ".join(starts)}
+            RETURN tr
+            UNION
+            MATCH (tr:Triplet) WHERE {" AND ".join(open_start)}
+            RETURN tr
+        }}
+        RETURN tr.id AS id
+        ORDER BY tr.valid_from
+        LIMIT $limit
+        """
+        return [row['id'] for row in self.execute_read(cypher, params)]
+
+    def backfill_validity(self, batch_size: Optional[int] = None) -> int:
+        """
+        Sets valid_from/valid_to on Triplet nodes written before they were stored, derived from their
+        temporal_* properties; without them time windows treat those triplets as undated. Returns the
+        number of triplets updated. Safe to rerun: triplets already carrying a bound are skipped.
+        """
+        cypher = """
+        UNWIND $rows AS row
+        MATCH (tr:Triplet {id: row.id})
+        SET tr.valid_from = row.valid_from, tr.valid_to = row.valid_to
         """
-        # Fallback to keyword search for prototype
-        cypher = "MATCH (c:Chunk) WHERE c.content CONTAINS $query RETURN c LIMIT $limit"
-        return self.query(cypher, {"query": query, "limit": limit})
+        rows = self.query_iter("MATCH (tr:Triplet) WHERE tr.valid_from IS NULL AND tr.valid_to IS NULL "
+                               "RETURN properties(tr) AS tr")
+        updated = 0
+
+        def bounded():
+            nonlocal updated
+            for row in rows:
+                props = row['tr']
+                start, end = edge_from_properties("", "", props).context.interval
+                if start is not None or end is not None:
+                    updated += 1
+                    yield {"id": props['id'], "valid_from": start, "valid_to": end}
+
+        self._write_batches(cypher, bounded(), batch_size)
+        return updated
 
-    def get_neighbors(self, entity_id: str) -> List[Dict[str, Any]]:
+    def get_neighbors(self, entity_id: str, window: Optional[TimeWindow] = None) -> List[Dict[str, Any]]:
         """Retrieves neighbors and their contexts (ToG-3 style traversal)."""
+        return neighborhood_rows(self.get_neighborhoods([entity_id], k=1, window=window))
+
+    def get_neighborhoods(self, entity_ids: List[str], k: int = 1, per_hop_limit: Optional[int] = None,
+                          projection: Projection = FULL, window: Optional[TimeWindow] = None) -> Dict[str, Any]:
+        """
+        True k-hop expansion of many seeds in one round trip, following outgoing
+        HAS_SUBJECT_OF/HAS_OBJECT_OF hops with at most `per_hop_limit` triplets per entity per hop.
+        Every entity is expanded at most once, so triplets come back deduplicated; chunk and
+        community attachments are aggregated separately instead of per row. Rows carry only the
+        `projection` fields of each head, triplet and tail. A time `window` is applied inside the
+        per-entity MATCH, ahead of the per-hop LIMIT, so out-of-window triplets never leave the server.
+        """
+        where, window_params = "", {}
+        if window is not None:
+            bounds, window_params = self._window_bounds("tr", window)
+            if not window.include_undated:
+                bounds.insert(0, "(tr.valid_from IS NOT NULL OR tr.valid_to IS NOT NULL)")
+            where = "WHERE " + " AND ".join(bounds) if bounds else ""
+        hop_block = """
+        CALL {{
+            WITH frontier
+            UNWIND frontier AS e
+            CALL {{
+                WITH e
+                MATCH (e)-[:HAS_SUBJECT_OF]->(tr:Triplet)-[:HAS_OBJECT_OF]->(t:Entity)
+                {where}
+                RETURN tr, t
+                LIMIT $per_hop_limit
+            }}
+            RETURN collect({{e: e, tr: tr, tail: t, hop: {hop}}}) AS hop_rows, collect(DISTINCT t) AS reached
+        }}
+        WITH [n IN reached WHERE NOT n.id IN seen] AS frontier,
+             seen + [n IN reached WHERE NOT n.id IN seen | n.id] AS seen,
+             rows + hop_rows AS rows
+        """
+        # Nodes stay whole while walking (the frontier and attachments MATCH on them); only the projection is returned
+        projected = (f"[row IN rows | {{e: {cypher_map('row.e', projection.head)}, "
+                     f"tr: {cypher_map('row.tr', projection.triplet)}, "
+                     f"tail: {cypher_map('row.tail', projection.tail)}, hop: row.hop}}]")
         cypher = """
-        MATCH (e:Entity {id: $id})-[r1:HAS_SUBJECT_OF]->(tr:Triplet)-[r2:HAS_OBJECT_OF]->(tail:Entity)
-        OPTIONAL MATCH (tr)-[:EVIDENCE_IN]->(c:Chunk)
-        OPTIONAL MATCH (e)-[:PART_OF]->(m:Community)
-        RETURN e, tr, tail, collect(c) as chunks, collect(m) as communities
+        UNWIND $ids AS sid
+        MATCH (s:Entity {id: sid})
+        WITH collect(DISTINCT s) AS frontier
+        WITH frontier, [n IN frontier | n.id] AS seen, [] AS rows
+        """ + "".join(hop_block.format(hop=hop, where=where) for hop in range(1, k + 1)) + """
+        CALL {
+            WITH rows
+            UNWIND rows AS row
+            WITH row.tr AS tr
+            MATCH (tr)-[:EVIDENCE_IN]->(c:Chunk)
+            RETURN collect({tid: tr.id, chunk: c {.id, .content, .metadata}}) AS chunk_links
+        }
+        CALL {
+            WITH rows
+            UNWIND rows AS row
+            WITH DISTINCT row.e AS e
+            MATCH (e)-[:PART_OF]->(m:Community)
+            RETURN collect({eid: e.id, community: m {.id, .label, .summary, .level}}) AS community_links
+        }
+        RETURN """ + projected + """ AS rows, chunk_links, community_links
         """
-        return self.query(cypher, {"id": entity_id})
+        limit = per_hop_limit if per_hop_limit is not None else UNLIMITED
+        result = self.execute_read(cypher, {"ids": list(entity_ids), "per_hop_limit": limit, **window_params})
+        if not result:
+            return {"triplets": [], "chunks": {}, "communities": {}}
+        record = result[0]
+        chunks: Dict[str, List[Dict[str, Any]]] = {}
+        for link in record['chunk_links']:
+            chunks.setdefault(link['tid'], []).append(chunk_record(link['chunk']))
+        communities: Dict[str, List[Dict[str, Any]]] = {}
+        for link in record['community_links']:
+            communities.setdefault(link['eid'], []).append(link['community'])
+        rows = [{"e": entity_record(row['e']), "tr": triplet_record(row['tr']), "tail": entity_record(row['tail']),
+                 "hop": row['hop']} for row in record['rows']]
+        return {"triplets": rows, "chunks": chunks, "communities": communities}
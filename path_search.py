@@ -0,0 +1,121 @@
+from typing import List, Dict, Any, Iterable, Set, Tuple
+from graph_provider import GraphProvider
+
+# A hop is one Entity-Triplet-Entity step: {"tid", "head", "relation", "tail", "head_label", "tail_label"}
+Hop = Dict[str, Any]
+
+
+class _Frontier:
+    """One side of the bidirectional search: BFS depths plus shortest-path parents per entity."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.depth = 0
+        self.depth_of: Dict[str, int] = {root: 0}
+        self.parents: Dict[str, List[Tuple[str, Hop]]] = {root: []}
+        self.frontier: Set[str] = {root}
+
+    def advance(self, expansions: Dict[str, List[Hop]]):
+        reached = set()
+        for node in self.frontier:
+            for hop in expansions.get(node, []):
+                other = hop['tail'] if hop['head'] == node else hop['head']
+                if other == node:
+                    continue
+                if other not in self.depth_of:
+                    self.depth_of[other] = self.depth + 1
+                    self.parents[other] = []
+                    reached.add(other)
+                if self.depth_of[other] == self.depth + 1:
+                    self.parents[other].append((node, hop))
+        self.frontier = reached
+        self.depth += 1
+
+    def chains(self, node: str, limit: int) -> List[List[Hop]]:
+        """Up to `limit` shortest hop sequences from the root to `node`."""
+        if node == self.root:
+            return [[]]
+        chains = []
+        for prev, hop in self.parents[node]:
+            for chain in self.chains(prev, limit):
+                chains.append(chain + [hop])
+                if len(chains) >= limit:
+                    return chains
+        return chains
+
+
+class PathFinder:
+    """
+    Bounded bidirectional BFS over Entity-Triplet-Entity hops (Chunk and Community nodes are never walked).
+    Each BFS level is a single batched `expand_entities` call capped at `fanout` hops per entity, and the
+    side with the smaller frontier is expanded first. Search stops at `max_hops` or `max_paths` paths.
+    Works against any GraphProvider.
+    """
+
+    def __init__(self, provider: GraphProvider, max_hops: int = 3, fanout: int = 50, max_paths: int = 5):
+        self.provider = provider
+        self.max_hops = max_hops
+        self.fanout = fanout
+        self.max_paths = max_paths
+
+    def find(self, head_id: str, tail_id: str) -> List[List[Hop]]:
+        return self.find_many(head_id, [tail_id])[tail_id]
+
+    def find_many(self, head_id: str, tail_ids: Iterable[str]) -> Dict[str, List[List[Hop]]]:
+        """Paths from one head to many tails; backward frontiers of all tails are expanded together."""
+        tail_ids = list(dict.fromkeys(tail_ids))
+        found: Dict[str, Dict[Tuple[str, ...], List[Hop]]] = {t: {} for t in tail_ids}
+        forward = _Frontier(head_id)
+        backward = {t: _Frontier(t) for t in tail_ids if t != head_id}
+        active = set(backward)
+        backward_depth = 0
+
+        while active and forward.depth + backward_depth < self.max_hops:
+            back_nodes = set().union(*(backward[t].frontier for t in active))
+            if forward.frontier and (len(forward.frontier) <= len(back_nodes) or not back_nodes):
+                forward.advance(self.provider.expand_entities(list(forward.frontier), self.fanout))
+            elif back_nodes:
+                expansions = self.provider.expand_entities(list(back_nodes), self.fanout)
+                for t in active:
+                    backward[t].advance(expansions)
+                backward_depth += 1
+            else:
+                break
+            for t in list(active):
+                self._collect(forward, backward[t], found[t])
+                if len(found[t]) >= self.max_paths:
+                    active.discard(t)
+
+        return {t: sorted(paths.values(), key=len)[:self.max_paths] for t, paths in found.items()}
+
+    def _collect(self, forward: _Frontier, backward: _Frontier, found: Dict[Tuple[str, ...], List[Hop]]):
+        meets = [n for n in backward.depth_of if n in forward.depth_of]
+        meets.sort(key=lambda n: forward.depth_of[n] + backward.depth_of[n])
+        for node in meets:
+            if forward.depth_of[node] + backward.depth_of[node] > self.max_hops:
+                break
+            for head_part in forward.chains(node, self.max_paths):
+                for tail_part in backward.chains(node, self.max_paths):
+                    path = head_part + tail_part[::-1]
+                    key = tuple(hop['tid'] for hop in path)
+                    if key in found or not self._is_simple(forward.root, path):
+                        continue
+                    found[key] = path
+                    if len(found) >= self.max_paths:
+                        return
+
+    @staticmethod
+    def _is_simple(start: str, path: List[Hop]) -> bool:
+        seen = {start}
+        node = start
+        for hop in path:
+            node = hop['tail'] if hop['head'] == node else hop['head']
+            if node in seen:
+                return False
+            seen.add(node)
+        return True
+
+
+def format_path(path: List[Hop]) -> str:
+    """Renders a path as its sequence of (h, r, t) triples, e.g. "(A, WON, B) -> (B, AWARDED_BY, C)"."""
+    return " -> ".join(f"({hop['head_label']}, {hop['relation']}, {hop['tail_label']})" for hop in path)
@@ -0,0 +1,115 @@
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Dict, Any, Iterator, Optional, Tuple
+from models import EntityContext, RelationContext, entity_from_properties, edge_from_properties
+
+# Property keys the models helpers store as JSON text (see entity_properties, chunk_properties, triplet_properties)
+JSON_FIELDS = frozenset({"attributes", "metadata", "provenance"})
+
+# Field projections: the property keys a read needs from one node. None keeps every property,
+# which Triplets need for their open-ended temporal_*/prop_* keys.
+Fields = Optional[Tuple[str, ...]]
+
+ENTITY_REF: Fields = ("id", "label")
+ENTITY_DESCRIBED: Fields = ("id", "label", "metadata")
+ENTITY_CONTEXT: Fields = ("id", "label", "attributes", "metadata", "external_links")
+TRIPLET_CONTEXT: Fields = None
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Fields a neighborhood read returns for each role of its (e, tr, tail) rows."""
+    head: Fields = ENTITY_CONTEXT
+    triplet: Fields = TRIPLET_CONTEXT
+    tail: Fields = ENTITY_CONTEXT
+
+
+# Everything, as before projections existed
+FULL = Projection()
+# MACER expansion: heads are only grouped and named; tails are ranked by their description
+REASONING = Projection(head=ENTITY_REF, tail=ENTITY_DESCRIBED)
+
+
+def cypher_map(expr: str, fields: Fields) -> str:
+    """Cypher map of the node `expr` limited to `fields`, e.g. "{id: e.id, label: e.label}"."""
+    if fields is None:
+        return f"properties({expr})"
+    return "{" + ", ".join(f"{name}: {expr}.{name}" for name in fields) + "}"
+
+
+def select(props: Dict[str, Any], fields: Fields) -> Dict[str, Any]:
+    """The in-memory equivalent of `cypher_map`: keeps only the projected keys."""
+    if fields is None:
+        return props
+    return {name: props[name] for name in fields if name in props}
+
+
+class Record(Mapping):
+    """
+    Read-only view of a node's property map whose JSON fields are decoded on first access.
+    Compares equal to other records (and decoded dicts) with the same fields.
+    """
+    __slots__ = ("raw", "_decoded")
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw = raw
+        self._decoded: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.raw[key]
+        if key not in JSON_FIELDS or not isinstance(value, str):
+            return value
+        if key not in self._decoded:
+            self._decoded[key] = json.loads(value)
+        return self._decoded[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.raw)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.raw!r})"
+
+
+class EntityRecord(Record):
+    """Entity properties; `context` is the decoded EntityContext."""
+    __slots__ = ("_context",)
+
+    @property
+    def context(self) -> EntityContext:
+        if not hasattr(self, "_context"):
+            self._context = entity_from_properties(dict(self.raw, id=self.raw.get("id"))).context
+        return self._context
+
+
+class TripletRecord(Record):
+    """Triplet properties; `context` folds the flattened temporal_*/prop_* keys back into a RelationContext."""
+    __slots__ = ("_context",)
+
+    @property
+    def context(self) -> RelationContext:
+        if not hasattr(self, "_context"):
+            self._context = edge_from_properties("", "", dict(self.raw, relation=self.raw.get("relation"))).context
+        return self._context
+
+
+def entity_record(props: Dict[str, Any], fields: Fields = None) -> EntityRecord:
+    return props if isinstance(props, EntityRecord) else EntityRecord(select(props, fields))
+
+
+def triplet_record(props: Dict[str, Any], fields: Fields = None) -> TripletRecord:
+    return props if isinstance(props, TripletRecord) else TripletRecord(select(props, fields))
+
+
+def chunk_record(props: Dict[str, Any]) -> Record:
+    return props if isinstance(props, Record) else Record(props)
+
+
+def jsonable(value: Any) -> Any:
+    """`json.dumps(default=...)` hook: records serialize as their decoded fields."""
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
@@ -1,7 +1,21 @@
+import re
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Tuple
 from llm_util import LLMInterface
 from retriever import Neo4jRetriever
 
+@dataclass
+class RankingContext:
+    """Everything the score phase needs, fetched up front by LLMRanker.prepare."""
+    query: str
+    head_id: str
+    relation: str
+    candidates: List[Dict[str, Any]]
+    head_context: str = ""
+    fewshot: str = ""
+    neighbor_triples: str = ""
+    reasoning_paths: Dict[str, str] = field(default_factory=dict)
+
 class LLMRanker:
     """
     Discriminative Filter (Stage 2 of CGR3) enhanced with CATS logic.
@@ -9,11 +23,28 @@ class LLMRanker:
     1. Semantic compatibility (Head/Tail descriptions).
     2. Type-aware reasoning (Entity types vs Relation constraints).
     3. Subgraph reasoning (Neighboring facts and paths).
+
+    Two strategies are available:
+    - "pointwise": two Y/N prompts per candidate (TAR + SR), i.e. 2N LLM calls.
+    - "listwise": Appendix A.3 re-ranking over sliding windows of `window_size` candidates
+      moved back-to-front by `step`, i.e. about N/step calls.
+    LLM calls issued per mode are accumulated in `call_counts`.
     """
+
+    MODES = ("pointwise", "listwise")
     
-    def __init__(self, llm: LLMInterface, retriever: Neo4jRetriever):
+    def __init__(self, llm: LLMInterface, retriever: Neo4jRetriever, mode: str = "pointwise",
+                 window_size: int = 10, step: int = 5):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown ranking mode '{mode}', expected one of {self.MODES}")
+        if window_size <= 0 or step <= 0:
+            raise ValueError(f"window_size and step must be positive, got {window_size} and {step}")
         self.llm = llm
         self.retriever = retriever
+        self.mode = mode
+        self.window_size = window_size
+        self.step = min(step, window_size)
+        self.call_counts = {m: 0 for m in self.MODES}
 
     def rerank(self, query: str, head_id: str, candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -22,32 +53,57 @@ class LLMRanker:
         """
         if not candidates:
             return []
-            
-        head_node = self.retriever.fetch_entity_context(head_id)
-        head_context = head_node.get('metadata', {}).get('description', '')
-        
+        return self.score(self.prepare(query, head_id, candidates))
+
+    def prepare(self, query: str, head_id: str, candidates: List[Dict[str, Any]]) -> RankingContext:
+        """
+        Prepare phase: every graph read the chosen mode needs, done once per call.
+        Few-shot triples depend only on the relation (and are cached per process by the retriever);
+        reasoning paths for all candidates come back from one batched query.
+        """
         # We assume the query can be parsed into a relation. 
         # Simplified: if "WON" is in query, we assume relation is WON.
         relation = "WON" if "WON" in query.upper() else "RELATED_TO"
-        
-        scored_candidates = []
-        for cand in candidates:
-            tail_id = cand['id']
-            tail_name = cand['name']
-            tail_desc = cand['description']
-            
+        ctx = RankingContext(query=query, head_id=head_id, relation=relation, candidates=list(candidates))
+        if self.mode == "listwise":
+            ctx.head_context = self._head_context(head_id)
+        else:
+            ctx.fewshot = self.retriever.fetch_fewshot_triples(relation)
+            ctx.neighbor_triples = self.retriever.fetch_fewshot_triples(relation, limit=5) # Neighbors proxy
+            ctx.reasoning_paths = self.retriever.fetch_reasoning_paths_many(head_id, [c['id'] for c in candidates])
+        return ctx
+
+    def score(self, ctx: RankingContext) -> List[Dict[str, Any]]:
+        """Score phase: LLM calls only, driven purely by the prefetched RankingContext."""
+        if self.mode == "listwise":
+            return self._score_listwise(ctx)
+        return self._score_pointwise(ctx)
+
+    def _head_context(self, head_id: str) -> str:
+        head_node = self.retriever.fetch_entity_context(head_id, fields=("id", "metadata"))
+        return head_node.context.metadata.get('description', '') if head_node else ''
+
+    def _score_pointwise(self, ctx: RankingContext) -> List[Dict[str, Any]]:
+        # Build both CATS prompts for every candidate, then score them all concurrently
+        prompts = []
+        for cand in ctx.candidates:
+            test_triple = f"({ctx.head_id}, {ctx.relation}, {cand['name']})"
+
             # 1. Type-Aware Reasoning (TAR)
-            fewshot = self.retriever.fetch_fewshot_triples(relation)
-            test_triple = f"({head_id}, {relation}, {tail_name})"
-            type_prompt = self.llm.build_type_reasoning_prompt(test_triple, fewshot)
-            type_score = 1.0 if self.llm.generate(type_prompt) == "Y" else 0.5
-            
+            prompts.append(self.llm.build_type_reasoning_prompt(test_triple, ctx.fewshot))
+
             # 2. Subgraph Reasoning (SR)
-            neighbor_triples = self.retriever.fetch_fewshot_triples(relation, limit=5) # Neighbors proxy
-            reasoning_paths = self.retriever.fetch_reasoning_paths(head_id, tail_id)
-            subgraph_prompt = self.llm.build_subgraph_reasoning_prompt(test_triple, neighbor_triples, reasoning_paths)
-            subgraph_score = 1.0 if self.llm.generate(subgraph_prompt) == "Y" else 0.5
-            
+            reasoning_paths = ctx.reasoning_paths.get(cand['id'], "")
+            prompts.append(self.llm.build_subgraph_reasoning_prompt(test_triple, ctx.neighbor_triples, reasoning_paths))
+
+        answers = self.llm.generate_many(prompts)
+        self.call_counts["pointwise"] += len(prompts)
+
+        scored_candidates = []
+        for i, cand in enumerate(ctx.candidates):
+            type_score = 1.0 if answers[2 * i] == "Y" else 0.5
+            subgraph_score = 1.0 if answers[2 * i + 1] == "Y" else 0.5
+
             # Aggregate Score (Simplified)
             total_score = type_score + subgraph_score
             scored_candidates.append((total_score, cand))
@@ -55,3 +111,38 @@ class LLMRanker:
         # Sort by total score descending
         scored_candidates.sort(key=lambda x: x[0], reverse=True)
         return [c[1] for c in scored_candidates]
+
+    @staticmethod
+    def parse_ranking(response: str, n: int) -> List[int]:
+        """
+        Parses a listwise answer such as "The final order: [3, 1, 2]" (or "[3] > [1] > [2]")
+        into 0-based positions. Out-of-range and repeated numbers are ignored, and candidates
+        the model left out keep their relative order at the end.
+        """
+        marker = re.search(r"final order\s*:", response, re.IGNORECASE)
+        body = response[marker.end():] if marker else response
+        order = []
+        for token in re.findall(r"\d+", body):
+            pos = int(token) - 1
+            if 0 <= pos < n and pos not in order:
+                order.append(pos)
+        return order + [pos for pos in range(n) if pos not in order]
+
+    def _score_listwise(self, ctx: RankingContext) -> List[Dict[str, Any]]:
+        ranked = list(ctx.candidates)
+        # Slide from the tail to the head so strong candidates bubble up through overlapping windows
+        end = len(ranked)
+        while True:
+            start = max(0, end - self.window_size)
+            window = ranked[start:end]
+            if len(window) > 1:
+                prompt = self.llm.build_ranking_prompt(ctx.query, ctx.head_context, window)
+                # Each window depends on the previous one, so it is a batch of one: still dispatched
+                # through agenerate, so the timeout and retry policy apply
+                response = self.llm.generate_many([prompt])[0]
+                self.call_counts["listwise"] += 1
+                ranked[start:end] = [window[pos] for pos in self.parse_ranking(response, len(window))]
+            if start == 0:
+                break
+            end -= self.step
+        return ranked
@@ -1,9 +1,92 @@
-from typing import List, Dict, Any, Tuple, Optional
-from neo4j_provider import Neo4jContextGraph
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Tuple, Optional, Callable, Iterator, AsyncIterator, Union
+from graph_provider import GraphProvider
 from retriever import Neo4jRetriever
 from ranker import LLMRanker
 from llm_util import LLMInterface
 from macer_agents import ToG3Constructor, ToG3Reflector, ToG3Responser
+from subgraph_cache import SubgraphCache
+from context_store import ContextStore
+from projection import entity_record
+from temporal import TimeWindow
+from instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReasoningEvent:
+    """Base class of the events yielded by `MACERReasoner.reason_stream`."""
+    iteration: int
+
+
+@dataclass
+class EntitiesLinked(ReasoningEvent):
+    query: str
+    entity_ids: List[str]
+
+
+@dataclass
+class CandidatesRanked(ReasoningEvent):
+    head_id: str
+    ranked: List[Dict[str, Any]]
+    selected: Optional[Dict[str, Any]]
+
+
+@dataclass
+class ReflectionVerdict(ReasoningEvent):
+    sufficient: bool
+    evolution_query: Optional[str]
+
+
+@dataclass
+class QueryEvolved(ReasoningEvent):
+    query: str
+
+
+@dataclass
+class AnswerToken(ReasoningEvent):
+    text: str
+
+
+@dataclass
+class FinalAnswer(ReasoningEvent):
+    """Always the last event. `stopped` is "deadline" or "cancelled" when the run was cut short."""
+    query: str
+    answer: Optional[str]
+    context: List[Dict[str, Any]] = field(default_factory=list)
+    iteration_stats: List[Dict[str, int]] = field(default_factory=list)
+    stopped: Optional[str] = None
+
+    def result(self) -> Dict[str, Any]:
+        """The dictionary returned by `MACERReasoner.reason`."""
+        return {
+            "query": self.query,
+            "answer": self.answer,
+            "final_context": self.context,
+            "iterations": self.iteration,
+            "iteration_stats": self.iteration_stats,
+            "stopped": self.stopped
+        }
+
+
+class _Stop(Exception):
+    """Raised at a checkpoint once the run is cancelled or past its deadline."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+_DONE = object()
+
+# A TimeWindow, "auto" (the years the query mentions), or None for no temporal filter
+TimeWindowSpec = Union[TimeWindow, str, None]
+
 
 class MACERReasoner:
     """
@@ -11,79 +94,202 @@ class MACERReasoner:
     Integrates CGR3 Retrieve-Rank-Reason with ToG-3 iteration.
     """
     
-    def __init__(self, provider: Neo4jContextGraph, llm: LLMInterface, max_iterations: int = 3):
+    def __init__(self, provider: GraphProvider, llm: LLMInterface, max_iterations: int = 3, ranking_mode: str = "pointwise",
+                 context_token_budget: Optional[int] = 1024, time_window: TimeWindowSpec = None):
         self.provider = provider
         self.retriever = Neo4jRetriever(provider)
         self.llm = llm
         self.constructor = ToG3Constructor(provider, self.retriever)
-        self.ranker = LLMRanker(llm, self.retriever)
+        self.ranker = LLMRanker(llm, self.retriever, mode=ranking_mode)
         self.reflector = ToG3Reflector(llm)
-        self.responser = ToG3Responser(llm)
+        self.responser = ToG3Responser(llm, token_budget=context_token_budget)
         self.max_iterations = max_iterations
+        self.time_window = time_window
+
+    def _window(self, query: str, time_window: TimeWindowSpec) -> Optional[TimeWindow]:
+        spec = time_window if time_window is not None else self.time_window
+        if spec == "auto":
+            return TimeWindow.from_query(query)
+        return spec
 
-    def reason(self, query: str) -> Dict[str, Any]:
+    def reason(self, query: str, deadline: Optional[float] = None,
+               time_window: TimeWindowSpec = None) -> Dict[str, Any]:
         """The official ToG-3 MACER reasoning loop."""
+        for event in self.reason_stream(query, deadline=deadline, time_window=time_window):
+            if isinstance(event, FinalAnswer):
+                return event.result()
+
+    def reason_stream(self, query: str, deadline: Optional[float] = None, cancel: Optional[threading.Event] = None,
+                      time_window: TimeWindowSpec = None) -> Iterator[ReasoningEvent]:
+        """
+        Runs the MACER loop as a generator of ReasoningEvents, ending with a FinalAnswer.
+        `deadline` is a wall-clock budget in seconds; once it passes, or `cancel` is set, the loop
+        stops at the next checkpoint and the FinalAnswer carries the best answer gathered so far.
+        `time_window` (default: the reasoner's) limits subgraph expansion to triplets valid in it.
+        Closing the generator abandons the run without a FinalAnswer.
+        """
+        should_stop = cancel.is_set if cancel is not None else (lambda: False)
+        window = self._window(query, time_window)
+        # One session serves every retriever/ranker round trip of this run.
+        with self.provider.session_scope():
+            yield from self._reason(query, deadline, should_stop, window)
+
+    async def areason_stream(self, query: str, deadline: Optional[float] = None,
+                             cancel: Optional[threading.Event] = None,
+                             time_window: TimeWindowSpec = None) -> AsyncIterator[ReasoningEvent]:
+        """
+        Async variant of `reason_stream`; the loop runs on a worker thread. Leaving the `async for`
+        early (break, task cancellation) stops the worker at its next checkpoint.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        abandoned = threading.Event()
+        should_stop = lambda: abandoned.is_set() or (cancel is not None and cancel.is_set())
+        window = self._window(query, time_window)
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                pass  # the consumer's loop is gone; nobody is listening anymore
+
+        def produce():
+            try:
+                with self.provider.session_scope():
+                    for event in self._reason(query, deadline, should_stop, window):
+                        put(event)
+            except BaseException as exc:
+                put(exc)
+            finally:
+                put(_DONE)
+
+        loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            abandoned.set()
+
+    def _reason(self, query: str, deadline: Optional[float], should_stop: Callable[[], bool],
+                window: Optional[TimeWindow] = None) -> Iterator[ReasoningEvent]:
+        expires = time.monotonic() + deadline if deadline is not None else None
+
+        def checkpoint():
+            if should_stop():
+                raise _Stop("cancelled")
+            if expires is not None and time.monotonic() >= expires:
+                raise _Stop("deadline")
+
         current_query = query
-        all_gathered_context = []
+        # Gathered facts, deduplicated by triplet id and indexed for reflection and answer packing
+        store = ContextStore()
         iteration = 0
         final_answer = None
-        
-        while iteration < self.max_iterations:
-            print(f"--- MACER Iteration {iteration+1} for Query: '{current_query}' ---")
-            
-            # 1. Retrieval (Dual Pathway)
-            head_ids = self.retriever.retrieve_entities_by_label(current_query)
-            if not head_ids:
-                # Fallback to search chunks if no entities found
-                relevant_chunks = self.retriever.search_chunks(current_query)
-                # (Simplified: just log for prototype)
-            
-            iteration_context = []
-            for head_id in head_ids:
-                # Stage 1: Retrieval (Structural Neighborhood)
-                candidates = self.constructor.evolve_subgraph(current_query, [head_id])
-                
-                # Format candidates for ranker (id, name, description)
-                formatted_candidates = []
-                for cand in candidates:
-                    tail = cand.get('tail', {})
-                    formatted_candidates.append({
-                        "id": tail.get('id'),
-                        "name": tail.get('label'),
-                        "description": tail.get('metadata', 'No context')
-                    })
-                
-                # Stage 2: CATS-Enhanced Ranking
-                ranked_candidates = self.ranker.rerank(current_query, head_id, formatted_candidates)
-                
-                # Add top ranked candidates to total context
-                if ranked_candidates:
-                    # Map back to original detailed candidate objects
-                    top_id = ranked_candidates[0]['id']
-                    top_detailed = next((c for c in candidates if c['tail'].get('id') == top_id), None)
-                    if top_detailed:
-                        iteration_context.append(top_detailed)
-
-            all_gathered_context.extend(iteration_context)
-            
-            # 2. Reflection (Sufficiency Gate & Evolution Query)
-            is_sufficient, evolution_query = self.reflector.reflect(query, all_gathered_context)
-            
-            if is_sufficient:
-                print("Reflector: Context is sufficient. Generating final answer.")
-                final_answer = self.responser.generate_final_answer(query, all_gathered_context)
-                break
-            else:
-                print(f"Reflector: Context insufficient. Evolving query to: '{evolution_query}'")
-                current_query = evolution_query
-                iteration += 1
-
-        if not final_answer and all_gathered_context:
-            final_answer = self.responser.generate_final_answer(query, all_gathered_context)
+        cache = SubgraphCache()
+        # Tails gathered in the previous iteration join the next frontier, so evidence grows hop by hop
+        reached_ids: List[str] = []
+        answer_tokens: List[str] = []
 
-        return {
-            "query": query,
-            "answer": final_answer,
-            "final_context": all_gathered_context,
-            "iterations": iteration + 1
-        }
+        with span("macer.reason", query=query) as root:
+            try:
+                while iteration < self.max_iterations:
+                    with span("macer.iteration", iteration=iteration + 1):
+                        checkpoint()
+                        logger.info("MACER iteration %d for query %r", iteration + 1, current_query)
+                        cache.start_iteration()
+
+                        # 1. Retrieval (Dual Pathway)
+                        with span("macer.link"):
+                            head_ids = self.retriever.retrieve_entities_by_label(current_query)
+                        yield EntitiesLinked(iteration + 1, current_query, head_ids)
+                        if not head_ids:
+                            # Fallback to search chunks if no entities found
+                            relevant_chunks = self.retriever.search_chunks(current_query)
+                            # (Simplified: just log for prototype)
+
+                        # Stage 1: Retrieval (Structural Neighborhood), new frontier only
+                        frontier = list(dict.fromkeys(head_ids + reached_ids))
+                        with span("macer.evolve_subgraph", frontier=len(frontier)):
+                            candidates = (self.constructor.evolve_subgraph(current_query, frontier, cache, window)
+                                          if frontier else [])
+                        candidates_by_head: Dict[str, List[Dict[str, Any]]] = {}
+                        for cand in cache.unranked(candidates):
+                            candidates_by_head.setdefault(cand['e']['id'], []).append(cand)
+
+                        iteration_context = []
+                        for head_id, head_candidates in candidates_by_head.items():
+                            checkpoint()
+                            # Format candidates for ranker (id, name, description)
+                            formatted_candidates = []
+                            for cand in head_candidates:
+                                tail = entity_record(cand.get('tail', {}))
+                                formatted_candidates.append({
+                                    "id": tail.get('id'),
+                                    "name": tail.get('label'),
+                                    "description": tail.context.metadata.get('description') or 'No context'
+                                })
+
+                            # Stage 2: CATS-Enhanced Ranking
+                            with span("macer.rerank", head_id=head_id, candidates=len(formatted_candidates)):
+                                ranked_candidates = self.ranker.rerank(current_query, head_id, formatted_candidates)
+
+                            # Add top ranked candidates to total context
+                            top_detailed = None
+                            if ranked_candidates:
+                                # Map back to original detailed candidate objects
+                                top_id = ranked_candidates[0]['id']
+                                top_detailed = next((c for c in head_candidates if c['tail'].get('id') == top_id), None)
+                                if top_detailed:
+                                    iteration_context.append(top_detailed)
+                                    store.add(top_detailed)
+                            yield CandidatesRanked(iteration + 1, head_id, ranked_candidates, top_detailed)
+
+                        reached_ids = [c['tail']['id'] for c in iteration_context]
+                        stats = cache.current
+                        logger.info("Subgraph cache: %d neighborhoods fetched, %d backend calls saved",
+                                    stats['neighborhood_fetches'], stats['backend_calls_saved'])
+
+                        # 2. Reflection (Sufficiency Gate & Evolution Query)
+                        with span("macer.reflect"):
+                            is_sufficient, evolution_query = self.reflector.reflect(query, store)
+                        yield ReflectionVerdict(iteration + 1, is_sufficient, evolution_query)
+
+                        if is_sufficient:
+                            logger.info("Reflector: context is sufficient, generating final answer")
+                            break
+                        else:
+                            logger.info("Reflector: context insufficient, evolving query to %r", evolution_query)
+                            current_query = evolution_query
+                            iteration += 1
+                            # Only announce an evolved query that another iteration will run
+                            if iteration < self.max_iterations:
+                                yield QueryEvolved(iteration + 1, current_query)
+
+                if len(store):
+                    checkpoint()
+                    with span("macer.answer", facts=len(store)):
+                        for token in self.responser.stream_final_answer(query, store):
+                            # Between tokens only: once the last token is out the answer is complete
+                            if answer_tokens:
+                                checkpoint()
+                            answer_tokens.append(token)
+                            yield AnswerToken(iteration + 1, token)
+                    final_answer = "".join(answer_tokens)
+            except _Stop as stop:
+                # Best answer so far: the partial synthesis if it had started, else the gathered facts
+                if answer_tokens:
+                    final_answer = "".join(answer_tokens)
+                else:
+                    final_answer = self.responser.best_effort_answer(store)
+                root.set(iterations=iteration + 1, stopped=stop.reason)
+                yield FinalAnswer(iteration + 1, query, final_answer, store.rows(),
+                                  cache.iteration_stats, stopped=stop.reason)
+                return
+
+            root.set(iterations=iteration + 1)
+            yield FinalAnswer(iteration + 1, query, final_answer, store.rows(), cache.iteration_stats)
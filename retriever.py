@@ -1,67 +1,89 @@
-from typing import List, Dict, Any
+import threading
+import weakref
+from typing import List, Dict, Any, Optional, Tuple
 from models import ContextNode, ContextEdge, EntityContext, RelationContext, ChunkNode, CommunityNode
-from neo4j_provider import Neo4jContextGraph
+from graph_provider import GraphProvider, neighborhood_rows
+from projection import ENTITY_CONTEXT, FULL, REASONING, Fields, Projection
+from temporal import TimeWindow
+from path_search import PathFinder, format_path
+from instrumentation import count
+
+# Process-wide few-shot cache: provider -> {(relation, limit): (provider generation, formatted triples)}.
+# Entries written before the provider's latest write are treated as stale.
+_FEWSHOT_CACHE: "weakref.WeakKeyDictionary[Any, Dict[Tuple[str, int], Tuple[int, str]]]" = weakref.WeakKeyDictionary()
+_FEWSHOT_LOCK = threading.Lock()
 
 class Neo4jRetriever:
-    """Retriever that fetches multi-level context from Neo4j."""
+    """Retriever that fetches multi-level context from a GraphProvider (Neo4j or in-memory)."""
     
-    def __init__(self, provider: Neo4jContextGraph):
+    def __init__(self, provider: GraphProvider, path_fanout: int = 50, max_paths: int = 5):
         self.provider = provider
+        self.path_fanout = path_fanout
+        self.max_paths = max_paths
 
-    def retrieve_entities_by_label(self, label_substring: str) -> List[str]:
-        """Search Neo4j for entities matching a label."""
-        cypher = "MATCH (e:Entity) WHERE e.label CONTAINS $label RETURN e.id as id"
-        results = self.provider.query(cypher, {"label": label_substring})
-        return [res['id'] for res in results]
+    def retrieve_entities_by_label(self, label_substring: str, limit: int = 10) -> List[str]:
+        """Search the graph for entities matching a label, best match first."""
+        return self.provider.find_entities_by_label(label_substring, limit)
 
-    def fetch_entity_context(self, entity_id: str) -> Dict[str, Any]:
-        """Fetches the EC (Entity Context) including attributes and metadata."""
-        cypher = "MATCH (e:Entity {id: $id}) RETURN e"
-        result = self.provider.query(cypher, {"id": entity_id})
-        return result[0]['e'] if result else {}
+    def fetch_entity_context(self, entity_id: str, fields: Fields = ENTITY_CONTEXT) -> Dict[str, Any]:
+        """Fetches the EC (Entity Context) including attributes and metadata; `.context` decodes it."""
+        return self.provider.get_entity(entity_id, fields)
 
     def fetch_community_context(self, entity_ids: List[str]) -> List[Dict[str, Any]]:
         """Fetches community summaries for a set of entities."""
-        cypher = """
-        MATCH (e:Entity)-[:PART_OF]->(m:Community)
-        WHERE e.id IN $ids
-        RETURN DISTINCT m.id as id, m.label as label, m.summary as summary
-        """
-        return self.provider.query(cypher, {"ids": entity_ids})
+        return self.provider.get_communities_for(entity_ids)
 
     def fetch_chunk_context(self, triplet_id: str) -> List[Dict[str, Any]]:
         """Fetches raw text chunks supporting a specific triplet."""
-        cypher = """
-        MATCH (tr:Triplet {id: $tid})-[:EVIDENCE_IN]->(c:Chunk)
-        RETURN c.id as id, c.content as content, c.metadata as metadata
-        """
-        return self.provider.query(cypher, {"tid": triplet_id})
+        return self.provider.get_triplet_chunks(triplet_id)
 
     def fetch_fewshot_triples(self, relation: str, limit: int = 3) -> str:
-        """Fetches sample triples for a relation to serve as Type-Aware context."""
-        cypher = """
-        MATCH (h:Entity)-[:HAS_SUBJECT_OF]->(tr:Triplet {relation: $rel})-[:HAS_OBJECT_OF]->(t:Entity)
-        RETURN h.label as head, tr.relation as relation, t.label as tail
-        LIMIT $limit
         """
-        results = self.provider.query(cypher, {"rel": relation, "limit": limit})
-        return "\n".join([f"({r['head']}, {r['relation']}, {r['tail']})" for r in results])
+        Fetches sample triples for a relation to serve as Type-Aware context.
+        Cached per process and invalidated by any write through the same provider.
+        """
+        generation = self.provider.generation
+        with _FEWSHOT_LOCK:
+            cached = _FEWSHOT_CACHE.setdefault(self.provider, {}).get((relation, limit))
+        if cached is not None and cached[0] == generation:
+            count("fewshot_cache_lookups_total", result="hit")
+            return cached[1]
+        count("fewshot_cache_lookups_total", result="miss")
+        results = self.provider.get_fewshot_triples(relation, limit)
+        formatted = "\n".join([f"({r['head']}, {r['relation']}, {r['tail']})" for r in results])
+        with _FEWSHOT_LOCK:
+            _FEWSHOT_CACHE[self.provider][(relation, limit)] = (generation, formatted)
+        return formatted
 
     def fetch_reasoning_paths(self, head_id: str, tail_id: str, max_hops: int = 3) -> str:
         """Official CATS Subgraph Reasoning: search for paths between head and tail."""
-        cypher = """
-        MATCH p = (h:Entity {id: $head_id})-[*1..3]-(t:Entity {id: $tail_id})
-        RETURN p
-        LIMIT 5
+        return self.fetch_reasoning_paths_many(head_id, [tail_id], max_hops)[tail_id]
+
+    def fetch_reasoning_paths_many(self, head_id: str, tail_ids: List[str], max_hops: int = 3) -> Dict[str, str]:
         """
-        # In a real system, we format the path as a sequence of triples
-        results = self.provider.query(cypher, {"head_id": head_id, "tail_id": tail_id})
-        return f"Found {len(results)} paths between entities."
+        Reasoning paths from one head to every candidate tail, each formatted as a sequence of
+        (h, r, t) triples per line. All tails share one bounded bidirectional search.
+        """
+        finder = PathFinder(self.provider, max_hops=max_hops, fanout=self.path_fanout, max_paths=self.max_paths)
+        formatted = {}
+        for tail_id, paths in finder.find_many(head_id, tail_ids).items():
+            formatted[tail_id] = "\n".join(format_path(p) for p in paths) if paths else "No reasoning paths found."
+        return formatted
 
-    def search_chunks(self, query: str) -> List[Dict[str, Any]]:
-        """Dual Pathway: Textual Context Retrieval."""
-        return self.provider.search_chunks_vector(query)
+    def search_chunks(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Dual Pathway: Textual Context Retrieval. Returns scored chunks, best first."""
+        return self.provider.search_chunks_vector(query, limit)
 
-    def get_k_hop_neighborhood(self, entity_id: str, k: int = 1) -> List[Dict[str, Any]]:
+    def get_k_hop_neighborhood(self, entity_id: str, k: int = 1, window: Optional[TimeWindow] = None) -> List[Dict[str, Any]]:
         """Pathway A: Structural Retrieval (Simplified KGE proxy)."""
-        return self.provider.get_neighbors(entity_id)
+        return neighborhood_rows(self.provider.get_neighborhoods([entity_id], k=k, projection=FULL, window=window))
+
+    def get_neighborhoods(self, entity_ids: List[str], k: int = 1, per_hop_limit: Optional[int] = None,
+                          projection: Projection = REASONING, window: Optional[TimeWindow] = None) -> Dict[str, Any]:
+        """
+        Batched k-hop neighborhoods of many seeds: deduplicated triplets plus separate chunk/community maps.
+        By default rows carry what the MACER loop reads: head id/label, the full Relation Context,
+        and tail id/label/metadata for ranking. `window` keeps triplets valid within it (backend-side).
+        """
+        return self.provider.get_neighborhoods(entity_ids, k=k, per_hop_limit=per_hop_limit,
+                                               projection=projection, window=window)
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from graph_provider import GraphProvider
+from projection import jsonable
+from llm_util import LLMInterface
+from reasoner import MACERReasoner
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceOverloaded(Exception):
+    """Raised when the wait queue is full; the HTTP layer answers 503."""
+
+
+class LatencyWindow:
+    """Latencies of the most recent `size` requests, with nearest-rank percentiles."""
+
+    def __init__(self, size: int = 1024):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentiles(self, points=(50, 95, 99)) -> Dict[str, Optional[float]]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {f"p{p}": None for p in points}
+        return {f"p{p}": ordered[max(0, math.ceil(p * len(ordered) / 100) - 1)] for p in points}
+
+
+class QueryService:
+    """
+    Long-lived query executor sharing one provider (and its driver) and one LLM client.
+    MACER runs execute on a bounded worker pool; identical in-flight queries are coalesced into
+    a single execution whose result every caller receives. At most `max_queue` executions may
+    wait for a worker before new ones are rejected with ServiceOverloaded.
+    """
+
+    def __init__(self, provider: GraphProvider, llm: LLMInterface, workers: int = 8, max_queue: int = 256,
+                 max_iterations: int = 3, ranking_mode: str = "pointwise"):
+        self.provider = provider
+        self.llm = llm
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_iterations = max_iterations
+        self.ranking_mode = ranking_mode
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="macer")
+        self._inflight: Dict[Tuple[str, Optional[float]], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.errors = 0
+        self.latency = LatencyWindow()
+
+    async def reason(self, query: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Result of `MACERReasoner.reason` for `query`, sharing any identical execution already in flight."""
+        self.requests += 1
+        started = time.perf_counter()
+        key = (query.strip(), deadline)
+        future = self._inflight.get(key)
+        if future is None:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise ServiceOverloaded(f"{self.waiting} queries already waiting for a worker")
+            self.executions += 1
+            with self._lock:
+                self.waiting += 1
+            future = asyncio.get_running_loop().run_in_executor(self._pool, self._run, key[0], deadline)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        try:
+            # Shielded: a caller going away must not cancel the run other callers share
+            return await asyncio.shield(future)
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.latency.record(time.perf_counter() - started)
+
+    def _run(self, query: str, deadline: Optional[float]) -> Dict[str, Any]:
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        try:
+            reasoner = MACERReasoner(self.provider, self.llm, max_iterations=self.max_iterations,
+                                     ranking_mode=self.ranking_mode)
+            return reasoner.reason(query, deadline=deadline)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "workers": self.workers,
+            "requests": self.requests,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "latency_seconds": self.latency.percentiles()
+        }
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+class QueryServer:
+    """
+    Minimal HTTP/1.1 JSON front end for a QueryService (one request per connection).
+      POST /query  {"query": "...", "deadline": seconds?}  -> reasoning result
+      GET  /stats                                          -> QueryService.stats()
+      GET  /health                                         -> {"status": "ok"}
+    Bodies above `max_body_bytes` are refused with 413, and a client that has not sent its whole
+    request within `read_timeout` seconds gets 408, so no connection can pin a handler.
+    """
+
+    def __init__(self, service: QueryService, host: str = "127.0.0.1", port: int = 8080,
+                 max_body_bytes: int = 1 << 20, read_timeout: float = 10.0):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.max_body_bytes = max_body_bytes
+        self.read_timeout = read_timeout
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 picks a free port; report the one actually bound
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        logger.info("Serving MACER queries on http://%s:%d", self.host, self.port)
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            status, payload = await self._dispatch(reader)
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        body = json.dumps(payload, default=jsonable).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        """(method, path, body) of one request; malformed framing raises ValueError, an oversized body _BodyTooLarge."""
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise ValueError("malformed request line")
+        method, path = request_line[0], request_line[1].split("?", 1)[0]
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ValueError("malformed Content-Length")
+        if length > self.max_body_bytes:
+            raise _BodyTooLarge(f"body of {length} bytes exceeds the {self.max_body_bytes} byte limit")
+        return method, path, await reader.readexactly(length)
+
+    async def _dispatch(self, reader: asyncio.StreamReader) -> Tuple[int, Any]:
+        try:
+            method, path, body = await asyncio.wait_for(self._read_request(reader), self.read_timeout)
+        except asyncio.TimeoutError:
+            return 408, {"error": f"request not received within {self.read_timeout}s"}
+        except _BodyTooLarge as e:
+            return 413, {"error": str(e)}
+        except asyncio.IncompleteReadError:
+            return 400, {"error": "body shorter than its Content-Length"}
+        except (asyncio.LimitOverrunError, ValueError) as e:
+            # StreamReader.readline reports an over-long line as ValueError
+            return 400, {"error": str(e) or "malformed request"}
+
+        if path == "/health" and method == "GET":
+            return 200, {"status": "ok"}
+        if path == "/stats" and method == "GET":
+            return 200, self.service.stats()
+        if path == "/query" and method == "POST":
+            try:
+                request = json.loads(body or b"{}")
+                query = request["query"]
+            except (ValueError, KeyError, TypeError):
+                return 400, {"error": "expected a JSON body with a 'query' field"}
+            if not isinstance(query, str):
+                return 400, {"error": "'query' must be a string"}
+            deadline = request.get("deadline")
+            if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))
+                                         or not math.isfinite(deadline)):
+                return 400, {"error": "'deadline' must be a number of seconds"}
+            try:
+                return 200, await self.service.reason(query, deadline=deadline)
+            except ServiceOverloaded as e:
+                return 503, {"error": str(e)}
+        return 404, {"error": f"no route for {method} {path}"}
+
+
+class _BodyTooLarge(Exception):
+    """Declared Content-Length above QueryServer.max_body_bytes; answered with 413."""
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 408: "Request Timeout", 413: "Payload Too Large",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def serve(service: QueryService, host: str = "127.0.0.1", port: int = 8080, **options):
+    """Blocking entry point used by `main.py serve`; `options` go to QueryServer (body limit, read timeout)."""
+    server = QueryServer(service, host, port, **options)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,499 @@
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import MutableMapping
+from dataclasses import asdict, fields
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+import numpy as np
+
+from embeddings import Embedder, HashingEmbedder, VectorIndex
+from graph import ContextGraph
+from graph_provider import TripletInput, batched
+from label_index import LabelIndex
+from models import (ContextNode, ContextEdge, EntityContext, RelationContext, ChunkNode, CommunityNode, triplet_id,
+                    entity_from_properties, chunk_from_properties, edge_from_properties)
+
+FORMAT_VERSION = 1
+_RELATION_DEFAULTS = [(f.name, getattr(RelationContext(), f.name)) for f in fields(RelationContext)]
+
+
+def _encode_entity(node: ContextNode) -> bytes:
+    ctx = node.context
+    return json.dumps([node.type, ctx.attributes, ctx.metadata, ctx.external_links, ctx.multimodal_context],
+                      separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _encode_relation(context: RelationContext) -> bytes:
+    # Default-valued fields are left out, so most blobs are a few bytes
+    values = {}
+    for name, default in _RELATION_DEFAULTS:
+        value = getattr(context, name)
+        if value != default:
+            values[name] = value
+    return json.dumps(values, separators=(",", ":"), default=str).encode("utf-8") if values else b""
+
+
+class _TableBuilder:
+    """Accumulates variable-length byte strings into one data buffer plus an offsets column."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("q", [0])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def append(self, item: bytes) -> int:
+        self.data += item
+        self.offsets.append(len(self.data))
+        return len(self.offsets) - 2
+
+    def save(self, path: str, name: str, sort: bool = False):
+        np.save(os.path.join(path, f"{name}.data.npy"), np.frombuffer(bytes(self.data), dtype=np.uint8))
+        offsets = np.frombuffer(self.offsets, dtype=np.int64)
+        np.save(os.path.join(path, f"{name}.offsets.npy"), offsets)
+        if sort:
+            # Byte-wise order of the strings, for binary-search lookup without building a dict at load
+            items = [bytes(self.data[offsets[i]:offsets[i + 1]]) for i in range(len(self))]
+            order = np.array(sorted(range(len(items)), key=items.__getitem__), dtype=np.int32)
+            np.save(os.path.join(path, f"{name}.order.npy"), order)
+
+
+class _Interner:
+    """String -> dense id while writing; the strings go to a table in first-seen order."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.table = _TableBuilder()
+
+    def __call__(self, text: str) -> int:
+        idx = self.ids.get(text)
+        if idx is None:
+            idx = self.ids[text] = self.table.append(text.encode("utf-8"))
+        return idx
+
+
+def write_snapshot(path: str, entities: Iterable[ContextNode], chunks: Iterable[ChunkNode],
+                   triplets: Iterable[TripletInput], communities: Iterable[CommunityNode],
+                   chunk_index: Optional[VectorIndex] = None, embedder: Optional[Embedder] = None,
+                   batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Writes a columnar snapshot directory. Inputs are consumed in order (entities, chunks, triplets,
+    communities), so each can be a stream; triplets whose endpoints were not written are skipped, like
+    the bulk writers. Chunk vectors come from `chunk_index` when given, otherwise from `embedder`.
+    Triplet ids are assumed unique. Returns the manifest.
+    """
+    os.makedirs(path, exist_ok=True)
+    embedder = embedder or HashingEmbedder()
+    entity_ids, labels, relations, chunk_ids = _Interner(), _Interner(), _Interner(), _Interner()
+    entity_blobs, edge_blobs, chunk_blobs = _TableBuilder(), _TableBuilder(), _TableBuilder()
+    label_column = array("i")
+
+    for node in entities:
+        if node.entity_id in entity_ids.ids:
+            continue
+        entity_ids(node.entity_id)
+        label_column.append(labels(node.label))
+        entity_blobs.append(_encode_entity(node))
+
+    vectors = VectorIndex(embedder.dim if chunk_index is None else chunk_index.dim)
+    for batch in batched(chunks, batch_size):
+        batch = [c for c in batch if c.chunk_id not in chunk_ids.ids]
+        for chunk in batch:
+            chunk_ids(chunk.chunk_id)
+            chunk_blobs.append(json.dumps([chunk.content, chunk.metadata], separators=(",", ":"),
+                                          default=str).encode("utf-8"))
+        if chunk_index is not None:
+            rows = [chunk_index._positions[c.chunk_id] for c in batch]
+            vectors.add_many([c.chunk_id for c in batch], chunk_index.vectors[rows])
+        elif batch:
+            vectors.add_many([c.chunk_id for c in batch], embedder.embed([c.content for c in batch]))
+
+    heads, rels, tails = array("i"), array("i"), array("i")
+    evidence_ptr, evidence = array("q", [0]), array("i")
+    for item in triplets:
+        edge, cids = item if isinstance(item, tuple) else (item, None)
+        h, t = entity_ids.ids.get(edge.head), entity_ids.ids.get(edge.tail)
+        if h is None or t is None:
+            continue
+        heads.append(h)
+        rels.append(relations(edge.relation))
+        tails.append(t)
+        edge_blobs.append(_encode_relation(edge.context))
+        for cid in dict.fromkeys(cids or []):
+            if cid in chunk_ids.ids:
+                evidence.append(chunk_ids.ids[cid])
+        evidence_ptr.append(len(evidence))
+
+    # PART_OF links only to written entities, so loading can rebuild memberships without lookups
+    community_blobs = [dict(asdict(c), entities=[eid for eid in dict.fromkeys(c.entities) if eid in entity_ids.ids])
+                       for c in communities]
+
+    def column(name: str, values, dtype):
+        np.save(os.path.join(path, f"{name}.npy"), np.frombuffer(values, dtype=dtype) if len(values) else
+                np.zeros(0, dtype=dtype))
+
+    head_col, tail_col = np.frombuffer(heads, dtype=np.int32), np.frombuffer(tails, dtype=np.int32)
+    n_entities = len(entity_ids.table)
+    for name, col in (("out", head_col), ("in", tail_col)):
+        # CSR over edge positions: the edges of entity i are order[indptr[i]:indptr[i + 1]]
+        np.save(os.path.join(path, f"{name}_order.npy"), np.argsort(col, kind="stable").astype(np.int32))
+        indptr = np.zeros(n_entities + 1, dtype=np.int64)
+        np.cumsum(np.bincount(col, minlength=n_entities), out=indptr[1:])
+        np.save(os.path.join(path, f"{name}_indptr.npy"), indptr)
+    column("edge_head", heads, np.int32)
+    column("edge_relation", rels, np.int32)
+    column("edge_tail", tails, np.int32)
+    column("entity_label", label_column, np.int32)
+    column("evidence_indptr", evidence_ptr, np.int64)
+    column("evidence", evidence, np.int32)
+    entity_ids.table.save(path, "entity_ids", sort=True)
+    chunk_ids.table.save(path, "chunk_ids", sort=True)
+    labels.table.save(path, "labels")
+    relations.table.save(path, "relations")
+    entity_blobs.save(path, "entity_context")
+    edge_blobs.save(path, "edge_context")
+    chunk_blobs.save(path, "chunk_content")
+    vectors.save(os.path.join(path, "chunk_vectors"))
+    with open(os.path.join(path, "communities.json"), "w") as f:
+        json.dump(community_blobs, f, default=str)
+
+    manifest = {"version": FORMAT_VERSION, "entities": n_entities, "edges": len(heads),
+                "relations": len(relations.table), "labels": len(labels.table), "chunks": len(chunk_ids.table),
+                "communities": len(community_blobs), "embedding_dim": vectors.dim,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    with open(os.path.join(path, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def save_snapshot(graph: ContextGraph, path: str) -> Dict[str, Any]:
+    """Writes an in-memory graph (entities, chunks with their vectors, triplets, communities) as a snapshot."""
+    return write_snapshot(
+        path, graph.nodes.values(), graph.chunks.values(),
+        ((edge, graph.evidence.get(tid)) for tid, edge in graph.triplets.items()),
+        graph.communities.values(), chunk_index=graph.chunk_index, embedder=graph.embedder,
+        batch_size=graph.batch_size)
+
+
+def export_neo4j(provider, path: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """Streams a Neo4jContextGraph's entities, chunks, triplets and communities into a snapshot."""
+    entities = (entity_from_properties(row["e"]) for row in provider.query_iter("MATCH (e:Entity) RETURN e"))
+    chunks = (chunk_from_properties(row["c"]) for row in provider.query_iter(
+        "MATCH (c:Chunk) RETURN c {.id, .content, .metadata} AS c"))
+    triplets = ((edge_from_properties(row["head"], row["tail"], row["tr"]), row["chunk_ids"])
+                for row in provider.query_iter("""
+        MATCH (h:Entity)-[:HAS_SUBJECT_OF]->(tr:Triplet)-[:HAS_OBJECT_OF]->(t:Entity)
+        RETURN h.id AS head, t.id AS tail, tr, [(tr)-[:EVIDENCE_IN]->(c:Chunk) | c.id] AS chunk_ids
+        """))
+    communities = (CommunityNode(row["id"], row["label"] or "", row["summary"] or "", row["entities"],
+                                 level=row["level"] or 0)
+                   for row in provider.query_iter("""
+        MATCH (m:Community)
+        RETURN m.id AS id, m.label AS label, m.summary AS summary, m.level AS level,
+               [(e:Entity)-[:PART_OF]->(m) | e.id] AS entities
+        """))
+    return write_snapshot(path, entities, chunks, triplets, communities, embedder=provider.embedder,
+                          batch_size=batch_size or provider.batch_size)
+
+
+class StringTable:
+    """Read side of a string column: memory-mapped UTF-8 data and offsets, decoded on access."""
+
+    def __init__(self, path: str, name: str, mmap: bool = True):
+        mode = "r" if mmap else None
+        self.data = np.load(os.path.join(path, f"{name}.data.npy"), mmap_mode=mode)
+        self.offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode=mode)
+        order_path = os.path.join(path, f"{name}.order.npy")
+        self.order = np.load(order_path, mmap_mode=mode) if os.path.exists(order_path) else None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i: int) -> str:
+        return self.raw(i).decode("utf-8")
+
+    def strings(self) -> List[str]:
+        """Every string, decoded in one pass over the data."""
+        data, offsets = self.data.tobytes(), self.offsets.tolist()
+        return [data[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+
+    def find(self, text: str) -> Optional[int]:
+        """Index of `text` by binary search over the stored order, or None."""
+        key = text.encode("utf-8")
+        lo, hi = 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(int(self.order[mid])) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.order) and self.raw(int(self.order[lo])) == key:
+            return int(self.order[lo])
+        return None
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot directory. Every column is memory-mapped, so opening costs no
+    parsing and worker processes share the pages. Nodes, edges and chunks are decoded on access
+    (edges once, then cached, so all adjacency views share one ContextEdge per triplet). Full scans
+    decode without caching, so the cache only ever holds the edges point reads have touched.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        if self.manifest["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.manifest['version']}")
+        mode = "r" if mmap else None
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+        self.path = path
+        self.entity_ids = StringTable(path, "entity_ids", mmap)
+        self.chunk_ids = StringTable(path, "chunk_ids", mmap)
+        self.labels = StringTable(path, "labels", mmap)
+        relations = StringTable(path, "relations", mmap)
+        self.relations = [relations[i] for i in range(len(relations))]
+        self.entity_context = StringTable(path, "entity_context", mmap)
+        self.edge_context = StringTable(path, "edge_context", mmap)
+        self.chunk_content = StringTable(path, "chunk_content", mmap)
+        self.entity_label = load("entity_label")
+        self.edge_head, self.edge_relation, self.edge_tail = load("edge_head"), load("edge_relation"), load("edge_tail")
+        self.out_order, self.out_indptr = load("out_order"), load("out_indptr")
+        self.in_order, self.in_indptr = load("in_order"), load("in_indptr")
+        self.evidence_indptr, self.evidence = load("evidence_indptr"), load("evidence")
+        self.chunk_vectors = VectorIndex.load(os.path.join(path, "chunk_vectors"), mmap=mmap)
+        self._edges: Dict[int, ContextEdge] = {}
+
+    @property
+    def n_entities(self) -> int:
+        return self.manifest["entities"]
+
+    @property
+    def n_edges(self) -> int:
+        return self.manifest["edges"]
+
+    def node(self, i: int) -> ContextNode:
+        node_type, attributes, metadata, links, multimodal = json.loads(self.entity_context.raw(i))
+        return ContextNode(self.entity_ids[i], self.labels[int(self.entity_label[i])], node_type,
+                           EntityContext(attributes, metadata, links, multimodal))
+
+    def edge(self, pos: int, cache: bool = True) -> ContextEdge:
+        edge = self._edges.get(pos)
+        if edge is None:
+            blob = self.edge_context.raw(pos)
+            context = RelationContext(**json.loads(blob)) if blob else RelationContext()
+            edge = ContextEdge(self.entity_ids[int(self.edge_head[pos])], self.relations[int(self.edge_relation[pos])],
+                               self.entity_ids[int(self.edge_tail[pos])], context)
+            if cache:
+                self._edges[pos] = edge
+        return edge
+
+    def triplet_id(self, pos: int) -> str:
+        """Triplet id of an edge position, from the columns alone (no Relation Context is decoded)."""
+        return (f"{self.entity_ids[int(self.edge_head[pos])]}_{self.relations[int(self.edge_relation[pos])]}_"
+                f"{self.entity_ids[int(self.edge_tail[pos])]}")
+
+    def out_positions(self, i: int) -> np.ndarray:
+        return self.out_order[self.out_indptr[i]:self.out_indptr[i + 1]]
+
+    def in_positions(self, i: int) -> np.ndarray:
+        return self.in_order[self.in_indptr[i]:self.in_indptr[i + 1]]
+
+    def find_triplet(self, tid: str) -> Optional[int]:
+        """Edge position of a triplet id. Ids may contain '_', so every split point is tried as the head."""
+        start = 0
+        while True:
+            cut = tid.find("_", start)
+            if cut < 0:
+                return None
+            head = self.entity_ids.find(tid[:cut])
+            if head is not None:
+                for pos in self.out_positions(head).tolist():
+                    if self.triplet_id(pos) == tid:
+                        return pos
+            start = cut + 1
+
+    def chunk(self, i: int) -> ChunkNode:
+        content, metadata = json.loads(self.chunk_content.raw(i))
+        return ChunkNode(self.chunk_ids[i], content, metadata)
+
+    def evidence_of(self, pos: int) -> List[str]:
+        return [self.chunk_ids[c] for c in self.evidence[self.evidence_indptr[pos]:self.evidence_indptr[pos + 1]].tolist()]
+
+    def communities(self) -> List[CommunityNode]:
+        with open(os.path.join(self.path, "communities.json")) as f:
+            return [CommunityNode(**c) for c in json.load(f)]
+
+
+class _Overlay(MutableMapping, ABC):
+    """
+    Mapping over snapshot records plus in-process writes. Records are materialized on first
+    access and kept, so later reads and in-place mutations (e.g. appending to an adjacency list)
+    see the same object; new keys live only in memory.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self._loaded: Dict[str, Any] = {}
+        self._added: Dict[str, None] = {}
+
+    @abstractmethod
+    def _find(self, key: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def _load(self, i: int) -> Any:
+        ...
+
+    @abstractmethod
+    def _key(self, i: int) -> str:
+        ...
+
+    @abstractmethod
+    def _size(self) -> int:
+        ...
+
+    def __getitem__(self, key: str):
+        value = self._loaded.get(key)
+        if value is None:
+            i = self._find(key) if key not in self._added else None
+            if i is None:
+                raise KeyError(key)
+            value = self._loaded[key] = self._load(i)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._loaded or key in self._added or self._find(key) is not None
+
+    def __setitem__(self, key: str, value):
+        if key not in self._loaded and self._find(key) is None:
+            self._added[key] = None
+        self._loaded[key] = value
+
+    def __delitem__(self, key: str):
+        raise TypeError("Snapshot-backed graphs do not support deletion")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._size()):
+            yield self._key(i)
+        yield from list(self._added)
+
+    def __len__(self) -> int:
+        return self._size() + len(self._added)
+
+    def added(self) -> List[str]:
+        """Keys written in this process on top of the snapshot."""
+        return list(self._added)
+
+
+class _Nodes(_Overlay):
+    def _find(self, key): return self.snapshot.entity_ids.find(key)
+    def _load(self, i): return self.snapshot.node(i)
+    def _key(self, i): return self.snapshot.entity_ids[i]
+    def _size(self): return self.snapshot.n_entities
+
+
+class _Adjacency(_Overlay):
+    """Entity id -> outgoing (or incoming) ContextEdges."""
+
+    def __init__(self, snapshot: Snapshot, incoming: bool):
+        super().__init__(snapshot)
+        self.positions = snapshot.in_positions if incoming else snapshot.out_positions
+
+    def _find(self, key): return self.snapshot.entity_ids.find(key)
+    def _load(self, i): return [self.snapshot.edge(pos) for pos in self.positions(i).tolist()]
+    def _key(self, i): return self.snapshot.entity_ids[i]
+    def _size(self): return self.snapshot.n_entities
+
+
+class _Triplets(_Overlay):
+    def _find(self, key): return self.snapshot.find_triplet(key)
+    def _load(self, i): return self.snapshot.edge(i)
+    def _key(self, i): return self.snapshot.triplet_id(i)
+    def _size(self): return self.snapshot.n_edges
+
+    def values(self):
+        # Straight over edge positions, decoding without caching; replaced triplets come from the loaded map
+        for pos in range(self._size()):
+            replaced = self._loaded.get(self.snapshot.triplet_id(pos)) if self._loaded else None
+            yield replaced if replaced is not None else self.snapshot.edge(pos, cache=False)
+        for key in list(self._added):
+            yield self._loaded[key]
+
+    def items(self):
+        for edge in self.values():
+            yield triplet_id(edge), edge
+
+
+class _Evidence(_Overlay):
+    def _find(self, key): return self.snapshot.find_triplet(key)
+    def _load(self, i): return self.snapshot.evidence_of(i)
+    def _key(self, i): return self.snapshot.triplet_id(i)
+    def _size(self): return self.snapshot.n_edges
+
+
+class _Chunks(_Overlay):
+    def _find(self, key): return self.snapshot.chunk_ids.find(key)
+    def _load(self, i): return self.snapshot.chunk(i)
+    def _key(self, i): return self.snapshot.chunk_ids[i]
+    def _size(self): return self.snapshot.manifest["chunks"]
+
+
+class _LazyLabelIndex:
+    """LabelIndex over the snapshot's labels, built on first use rather than at load."""
+
+    def __init__(self, snapshot: Snapshot):
+        self._snapshot = snapshot
+        self._index: Optional[LabelIndex] = None
+
+    def _built(self) -> LabelIndex:
+        if self._index is None:
+            index = LabelIndex()
+            snapshot = self._snapshot
+            for i in range(snapshot.n_entities):
+                index.add(snapshot.entity_ids[i], snapshot.labels[int(snapshot.entity_label[i])])
+            self._index = index
+        return self._index
+
+    def __len__(self):
+        return len(self._built())
+
+    def __getattr__(self, name):
+        return getattr(self._built(), name)
+
+
+def load_snapshot(path: str, batch_size: int = 1000, embedder: Optional[Embedder] = None,
+                  mmap: bool = True) -> ContextGraph:
+    """
+    Opens a snapshot as a ContextGraph without replaying writes: columns stay memory-mapped and
+    entities, edges and chunks are decoded when first touched. The graph remains writable; new data
+    lives in memory on top of the (read-only) snapshot. Communities are small and loaded eagerly.
+    """
+    snapshot = Snapshot(path, mmap)
+    embedder = embedder or HashingEmbedder(snapshot.manifest["embedding_dim"])
+    if embedder.dim != snapshot.manifest["embedding_dim"]:
+        raise ValueError(f"Snapshot chunk vectors have dimension {snapshot.manifest['embedding_dim']}, "
+                         f"embedder has {embedder.dim}")
+    graph = ContextGraph(batch_size=batch_size, embedder=embedder)
+    graph.snapshot = snapshot
+    graph.nodes = _Nodes(snapshot)
+    graph.edges = _Adjacency(snapshot, incoming=False)
+    graph._in_edges = _Adjacency(snapshot, incoming=True)
+    graph.triplets = _Triplets(snapshot)
+    graph.evidence = _Evidence(snapshot)
+    graph.chunks = _Chunks(snapshot)
+    graph.chunk_index = snapshot.chunk_vectors
+    graph.label_index = _LazyLabelIndex(snapshot)
+    for community in snapshot.communities():
+        graph.communities[community.community_id] = community
+        graph.members[community.community_id] = list(community.entities)
+        for entity_id in community.entities:
+            graph.memberships.setdefault(entity_id, []).append(community.community_id)
+    return graph
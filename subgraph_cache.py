@@ -0,0 +1,78 @@
+from typing import List, Dict, Any, Iterable, Set
+from instrumentation import count
+
+
+class SubgraphCache:
+    """
+    Request-scoped memory for one MACER reasoning run.
+    Remembers which entities were already expanded (and their neighborhoods), which triplets were
+    already gathered, and which candidates were already ranked, so each iteration only expands the
+    new frontier. Per-iteration counters record how many backend calls the cache saved.
+    """
+
+    def __init__(self):
+        self.neighborhoods: Dict[str, List[Dict[str, Any]]] = {}
+        self.triplet_ids: Set[str] = set()
+        self.ranked_triplet_ids: Set[str] = set()
+        self.iteration_stats: List[Dict[str, int]] = []
+
+    def start_iteration(self):
+        self.iteration_stats.append({
+            "iteration": len(self.iteration_stats) + 1,
+            "neighborhood_fetches": 0,
+            "neighborhood_cache_hits": 0,
+            "label_searches_avoided": 0,
+            "duplicate_triplets_dropped": 0,
+            "ranked_candidates_skipped": 0,
+            "backend_calls_saved": 0
+        })
+
+    @property
+    def current(self) -> Dict[str, int]:
+        if not self.iteration_stats:
+            self.start_iteration()
+        return self.iteration_stats[-1]
+
+    def count(self, key: str, n: int = 1):
+        self.current[key] += n
+        count(f"subgraph_{key}_total", n)
+        if key in ("neighborhood_cache_hits", "label_searches_avoided"):
+            self.current["backend_calls_saved"] += n
+
+    def frontier(self, entity_ids: Iterable[str]) -> List[str]:
+        """Entities not expanded yet in this run; the rest are counted as cache hits."""
+        frontier = []
+        for eid in dict.fromkeys(entity_ids):
+            if eid in self.neighborhoods:
+                self.count("neighborhood_cache_hits")
+            else:
+                frontier.append(eid)
+        return frontier
+
+    def store_neighborhood(self, entity_id: str, rows: List[Dict[str, Any]]):
+        self.neighborhoods[entity_id] = rows
+        self.count("neighborhood_fetches")
+
+    def new_triplets(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drops rows whose triplet id was already gathered in this run."""
+        fresh = []
+        for row in rows:
+            tid = row['tr']['id']
+            if tid in self.triplet_ids:
+                self.count("duplicate_triplets_dropped")
+                continue
+            self.triplet_ids.add(tid)
+            fresh.append(row)
+        return fresh
+
+    def unranked(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rows whose candidate was not ranked earlier in this run; marks them as ranked."""
+        fresh = []
+        for row in rows:
+            tid = row['tr']['id']
+            if tid in self.ranked_triplet_ids:
+                self.count("ranked_candidates_skipped")
+                continue
+            self.ranked_triplet_ids.add(tid)
+            fresh.append(row)
+        return fresh
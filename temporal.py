@@ -0,0 +1,228 @@
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Hashable, Optional, Tuple
+
+import numpy as np
+
+# Validity intervals are half-open [start, end) day codes, YYYYMMDD as int (1921-11-09 -> 19211109),
+# so they sort chronologically, compare cheaply and read at a glance in Neo4j. None is unbounded.
+Interval = Tuple[Optional[int], Optional[int]]
+
+# temporal keys read as the start or end of the interval; any other value only widens it
+START_KEYS = ("valid_from", "start", "from", "begin", "since")
+END_KEYS = ("valid_to", "end", "to", "until")
+
+_ISO = re.compile(r"^\s*(-?\d{1,4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?(?:[T ].*)?\s*$")
+# A four-digit number only reads as a year with year context around it, so "top 1500 results" or
+# "error 1404" never narrow a query: after a time preposition, next to a month name, or in a range
+_YEAR = r"(1\d{3}|20\d{2})"
+_MONTH = (r"(?:january|february|march|april|may|june|july|august|september|october|november|december|"
+          r"jan|feb|mar|apr|jun|jul|aug|sept|sep|oct|nov|dec)\.?")
+_YEAR_CONTEXTS = [
+    re.compile(rf"\b(?:in|during|since|before|after|until|till|by|from|around|circa|between|year)\s+{_YEAR}\b",
+               re.IGNORECASE),
+    re.compile(rf"\b{_MONTH}\s+(?:\d{{1,2}}(?:st|nd|rd|th)?,?\s+)?{_YEAR}\b", re.IGNORECASE),
+    re.compile(rf"\b\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH}\s+{_YEAR}\b", re.IGNORECASE),
+    re.compile(rf"\b{_YEAR}\s*(?:-|\u2013|\u2014|\.\.|to|until)\s*{_YEAR}\b", re.IGNORECASE),
+    re.compile(rf"\bbetween\s+{_YEAR}\s+and\s+{_YEAR}\b", re.IGNORECASE),
+]
+_NEVER, _ALWAYS = -(10 ** 12), 10 ** 12
+
+
+def _code(day: date) -> int:
+    return day.year * 10000 + day.month * 100 + day.day
+
+
+def time_span(value: Any) -> Optional[Tuple[int, int]]:
+    """
+    The [start, end) day codes a time value covers: a year (1921, "1921") covers the year, "1921-11"
+    the month, a date ("1921-11-09", date/datetime objects) the day. Ints of more than four digits
+    are already day codes and are taken as an exact bound. Anything else ("now") is None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return _code(value), _code(value + timedelta(days=1))
+    if isinstance(value, int):
+        if abs(value) > 9999:
+            return value, value
+        return value * 10000 + 101, (value + 1) * 10000 + 101
+    if not isinstance(value, str):
+        return None
+    match = _ISO.match(value)
+    if not match:
+        return None
+    year, month, day = (int(g) if g else None for g in match.groups())
+    if month is None:
+        return time_span(year)
+    try:
+        if day is None:
+            first = date(year, month, 1)
+            following = date(year + month // 12, month % 12 + 1, 1)
+            return _code(first), _code(following)
+        return time_span(date(year, month, day))
+    except ValueError:
+        return None
+
+
+def interval_of(temporal: Optional[Dict[str, Any]], valid_from: Any = None, valid_to: Any = None) -> Interval:
+    """
+    Normalized validity of a Relation Context. Start/end keys of `temporal` bound the interval;
+    other temporal values ({"year": 1921, "announced": 1922}) span from the earliest to the latest.
+    Explicit `valid_from`/`valid_to` override their side. (None, None) means undated.
+    """
+    start = end = None
+    spans, bounded = [], False
+    for key, value in (temporal or {}).items():
+        covered = time_span(value)
+        if covered is None:
+            continue
+        if key in START_KEYS:
+            start, bounded = covered[0], True
+        elif key in END_KEYS:
+            end, bounded = covered[1], True
+        else:
+            spans.append(covered)
+    if spans and not bounded:
+        start, end = min(s for s, _ in spans), max(e for _, e in spans)
+    explicit_start, explicit_end = time_span(valid_from), time_span(valid_to)
+    if explicit_start is not None:
+        start = explicit_start[0]
+    if explicit_end is not None:
+        end = explicit_end[1]
+    return start, end
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    """
+    A query-time filter on triplet validity: keeps triplets whose interval overlaps [start, end)
+    (day codes, None unbounded) and, with `include_undated`, triplets that carry no time at all.
+    """
+    start: Optional[int] = None
+    end: Optional[int] = None
+    include_undated: bool = True
+
+    @classmethod
+    def parse(cls, text: str, include_undated: bool = True) -> "TimeWindow":
+        """"1921", "1921-11", "1921..1925", "1921-03..", "..1930" (ends inclusive of the named period)."""
+        first, sep, last = text.partition("..")
+        spans = [time_span(part.strip()) if part.strip() else None for part in (first, last if sep else first)]
+        for part, covered in zip((first, last), spans):
+            if part.strip() and covered is None:
+                raise ValueError(f"Unrecognized time: {part!r}")
+        return cls(spans[0][0] if spans[0] else None, spans[1][1] if spans[1] else None, include_undated)
+
+    @classmethod
+    def from_query(cls, query: str, include_undated: bool = True) -> Optional["TimeWindow"]:
+        """
+        The years a question mentions ("Einstein in 1921", "November 1921", "1921-1925"), or None if
+        it names none. Bare numbers without year context are not years.
+        """
+        years = [int(year) for pattern in _YEAR_CONTEXTS for match in pattern.findall(query)
+                 for year in ((match,) if isinstance(match, str) else match)]
+        if not years:
+            return None
+        return cls(time_span(min(years))[0], time_span(max(years))[1], include_undated)
+
+    def overlaps(self, interval: Interval) -> bool:
+        start, end = interval
+        if start is None and end is None:
+            return self.include_undated
+        return ((self.end is None or start is None or start < self.end) and
+                (self.start is None or end is None or end > self.start))
+
+
+class IntervalIndex:
+    """
+    Interval tree over keyed [start, end) intervals: the intervals sorted by start under a binary
+    tree whose nodes hold the maximum end below them. Only the prefix starting before the window
+    ends can overlap it, and subtrees whose maximum end falls before the window starts are skipped,
+    so a query visits O(log n + matches) nodes. The tree is rebuilt lazily (vectorized); inserts
+    since the last build sit in a buffer that queries scan directly, and replaced or removed keys
+    are checked against the current `intervals`.
+    """
+
+    def __init__(self, rebuild_threshold: int = 1024):
+        self.intervals: Dict[Hashable, Interval] = {}
+        self.rebuild_threshold = rebuild_threshold
+        self._keys: List[Hashable] = []
+        self._starts = np.empty(0, dtype=np.int64)
+        self._ends = np.empty(0, dtype=np.int64)
+        self._max_end = np.full(2, _NEVER, dtype=np.int64)
+        self._leaves = 1
+        self._pending: List[Hashable] = []
+        self._stale = 0
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def add(self, key: Hashable, interval: Interval):
+        """Indexes (or re-indexes) `key`; undated intervals are not stored."""
+        self.discard(key)
+        if interval == (None, None):
+            return
+        self.intervals[key] = interval
+        self._pending.append(key)
+
+    def discard(self, key: Hashable):
+        if self.intervals.pop(key, None) is not None:
+            self._stale += 1
+
+    def _rebuild(self):
+        keys = list(self.intervals)
+        bounds = np.array([_bounds(self.intervals[k]) for k in keys], dtype=np.int64).reshape(-1, 2)
+        order = np.argsort(bounds[:, 0], kind="stable")
+        self._keys = [keys[i] for i in order.tolist()]
+        self._starts, self._ends = bounds[order, 0], bounds[order, 1]
+        # Heap layout: leaves at [leaves, 2 * leaves), node i covers children 2i and 2i + 1
+        self._leaves = 1 << max(0, (len(keys) - 1).bit_length())
+        tree = np.full(2 * self._leaves, _NEVER, dtype=np.int64)
+        tree[self._leaves:self._leaves + len(keys)] = self._ends
+        level = self._leaves
+        while level > 1:
+            tree[level // 2:level] = np.maximum(tree[level:2 * level:2], tree[level + 1:2 * level:2])
+            level //= 2
+        self._max_end = tree
+        self._pending, self._stale = [], 0
+
+    def overlapping(self, start: Optional[int], end: Optional[int]) -> List[Hashable]:
+        """Keys whose interval overlaps [start, end) (None unbounded)."""
+        if len(self._pending) + self._stale > max(self.rebuild_threshold, len(self._keys) // 4):
+            self._rebuild()
+        lo_bound = _NEVER if start is None else start
+        hi_bound = _ALWAYS if end is None else end
+        prefix = int(np.searchsorted(self._starts, hi_bound, side="left"))
+        found = []
+        # (node, first leaf it covers, leaves it covers); right children are pushed first so hits come out in order
+        stack = [(1, 0, self._leaves)] if prefix else []
+        while stack:
+            node, first, width = stack.pop()
+            if first >= prefix or self._max_end[node] <= lo_bound:
+                continue
+            if width == 1:
+                key = self._keys[first]
+                # Skip keys removed or re-indexed with another interval since the build
+                if _bounds(self.intervals.get(key, (_ALWAYS, _NEVER))) == (self._starts[first], self._ends[first]):
+                    found.append(key)
+                continue
+            half = width // 2
+            stack.append((2 * node + 1, first + half, half))
+            stack.append((2 * node, first, half))
+        seen = set(found)
+        for key in self._pending:
+            interval = self.intervals.get(key)
+            if interval is not None and key not in seen:
+                key_start, key_end = _bounds(interval)
+                if key_start < hi_bound and key_end > lo_bound:
+                    seen.add(key)
+                    found.append(key)
+        return found
+
+
+def _bounds(interval: Interval) -> Tuple[int, int]:
+    return (_NEVER if interval[0] is None else interval[0], _ALWAYS if interval[1] is None else interval[1])
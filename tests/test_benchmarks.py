@@ -0,0 +1,84 @@
+import json
+import time
+from collections import Counter
+from graph import ContextGraph
+from benchmarks.synthetic import SyntheticGraphSpec, edge_stream, chunks, load
+from benchmarks.suite import run_suite
+from benchmarks.model_memory import run_benchmark as run_model_memory
+from benchmarks.fake_llm_server import FakeLLMServer, latency_sampler
+from benchmarks.load_test import run_load, synthetic_workload
+from llm_util import HTTPLLMInterface
+
+
+def test_synthetic_graph_is_deterministic_and_skewed():
+    spec = SyntheticGraphSpec(edges=5000, seed=3)
+    edges = list(edge_stream(spec))
+    assert edges == list(edge_stream(SyntheticGraphSpec(edges=5000, seed=3)))
+    assert edges != list(edge_stream(SyntheticGraphSpec(edges=5000, seed=4)))
+
+    degree = Counter(h for h, _, _ in edges) + Counter(t for _, _, t in edges)
+    top = sum(d for _, d in degree.most_common(spec.entities // 100))
+    # Scale-free: the top 1% of entities hold far more than 1% of the edge endpoints
+    assert top > 0.08 * 2 * len(edges)
+    assert len(list(chunks(spec))) == spec.chunks
+
+
+def test_load_links_every_layer():
+    spec = SyntheticGraphSpec(edges=400, community_size=10)
+    graph = ContextGraph()
+    stats = load(graph, spec, batch_size=100)
+    assert len(graph.nodes) == spec.entities and len(graph.chunks) == spec.chunks
+    assert len(graph.communities) == spec.communities
+    assert sum(b["rows"] for b in stats["triplets"]) == spec.edges
+    assert all(graph.evidence[tid] for tid in graph.triplets)
+
+
+def test_suite_report_is_json():
+    report = run_suite(ContextGraph(), SyntheticGraphSpec(edges=500), samples=20)
+    assert set(report["scenarios"]) == {"ingestion", "label_lookup", "neighborhood", "path_search",
+                                        "chunk_search", "macer"}
+    assert report["scenarios"]["macer"]["llm_calls_per_query"] > 0
+    json.dumps(report)
+
+
+def test_http_llm_against_fake_server():
+    server = FakeLLMServer(latency=latency_sampler("constant", 0.05)).start_in_thread()
+    try:
+        llm = HTTPLLMInterface(server.url, max_in_flight=10)
+        prompts = [f"Please return 'Y' if ... {i}" for i in range(10)]
+        started = time.perf_counter()
+        assert llm.generate_many(prompts) == ["Y"] * 10
+        # Served concurrently: ten 50ms completions in well under 10 x 50ms
+        assert time.perf_counter() - started < 0.4
+        assert llm.calls == 10 and server.completions == 10
+    finally:
+        server.stop()
+
+
+def test_load_driver_reports_per_query_costs():
+    spec = SyntheticGraphSpec(edges=400)
+    graph = ContextGraph()
+    load(graph, spec)
+    server = FakeLLMServer().start_in_thread()
+    try:
+        llm = HTTPLLMInterface(server.url)
+        report = run_load(graph, llm, synthetic_workload(spec, 6), 6, concurrency=3)
+    finally:
+        server.stop()
+    assert report["completed"] == 6 and report["errors"] == 0
+    assert report["llm_calls_per_query"] == llm.calls / 6 > 0
+    # At least one label search and one neighborhood fetch per query
+    assert report["round_trips_per_query"] >= 2
+    assert report["latency"]["p99_ms"] >= report["latency"]["p50_ms"]
+
+
+def test_model_memory_report():
+    spec = SyntheticGraphSpec(edges=400)
+    report = run_model_memory(spec, repeats=1)
+    assert set(report["graph"]) == {"dataclass", "compact", "frozen"}
+    assert report["objects"]["compact"]["bytes_per_edge"] < report["objects"]["dataclass"]["bytes_per_edge"]
+    assert report["graph"]["frozen"]["bytes_per_edge"] < report["graph"]["dataclass"]["bytes_per_edge"]
+    # Each variant is measured in its own process, so what ran before it does not matter
+    alone = run_model_memory(spec, variants=["frozen"], repeats=1)
+    assert alone["graph"]["frozen"]["bytes_per_node"] == report["graph"]["frozen"]["bytes_per_node"]
+    json.dumps(report)
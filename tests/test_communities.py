@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from communities import Adjacency, CommunityDetector, cluster
+from graph import ContextGraph
+from llm_util import FakeLLMInterface
+from models import ContextNode, ContextEdge, CommunityNode
+
+
+def _cliques(sizes):
+    """Disjoint cliques joined in a chain by one BRIDGE edge each; node ids are N0, N1, ..."""
+    cg = ContextGraph()
+    start = 0
+    for size in sizes:
+        ids = [f"N{i}" for i in range(start, start + size)]
+        for eid in ids:
+            cg.add_node(ContextNode(eid, f"Node {eid[1:]}"))
+        for a in range(len(ids)):
+            for b in range(a + 1, len(ids)):
+                cg.add_triplet_with_context(ContextEdge(ids[a], "LINKS", ids[b]))
+        if start:
+            cg.add_triplet_with_context(ContextEdge(f"N{start - 1}", "BRIDGE", ids[0]))
+        start += size
+    return cg
+
+
+@pytest.mark.parametrize("method", ["louvain", "label_propagation"])
+def test_cluster_finds_cliques(method):
+    heads = np.array([0, 0, 1, 3, 3, 4, 2], dtype=np.int32)
+    tails = np.array([1, 2, 2, 4, 5, 5, 3], dtype=np.int32)
+    levels = cluster(Adjacency.from_pairs(6, heads, tails), method, levels=1)
+    assert len(levels) == 1
+    assert len(set(levels[0][:3])) == 1 and len(set(levels[0][3:])) == 1
+    assert levels[0][0] != levels[0][3]
+
+
+def test_detect_writes_hierarchical_communities():
+    cg = _cliques([5, 5, 5, 5])
+    detector = CommunityDetector(cg, levels=2)
+    stats = detector.detect()
+    assert stats["level_0_communities"] == 4
+    assert detector.write() == {"communities": len(cg.communities), "changed": len(cg.communities),
+                                "removed": 0, "unchanged": 0}
+    level0 = [m for m in cg.communities.values() if m.level == 0]
+    assert sorted(len(m.entities) for m in level0) == [5, 5, 5, 5]
+    assert {c["level"] for c in cg.get_communities_for(["N0"])} == {m.level for m in cg.communities.values()}
+    assert "Node" in level0[0].label and "LINKS" in level0[0].summary
+
+
+def test_update_reclusters_locally_and_resummarizes_changed_only():
+    cg = _cliques([5, 5, 5])
+    llm = FakeLLMInterface(responder=lambda prompt: "A tight cluster.")
+    detector = CommunityDetector(cg, llm=llm, levels=1)
+    detector.detect()
+    detector.write()
+    assert llm.calls == 3
+    before = detector.communities()
+
+    # A new entity wired densely into the last clique joins it; the other two communities are untouched
+    cg.add_node(ContextNode("X", "Newcomer"))
+    edges = [ContextEdge("X", "LINKS", f"N{i}") for i in range(10, 15)]
+    cg.add_triplets_bulk(edges)
+    detector.update(edges)
+    assert detector.write() == {"communities": 3, "changed": 1, "removed": 0, "unchanged": 2}
+    assert llm.calls == 4
+    after = detector.communities()
+    grown = next(cid for cid, (_, members) in after.items() if "X" in members)
+    assert grown in before and after[grown][1] == before[grown][1] | {"X"}
+    assert cg.communities[grown].summary == "A tight cluster."
+    assert set(cg.members[grown]) == after[grown][1]
+
+
+def test_replace_members_and_delete_communities():
+    cg = _cliques([3])
+    cg.add_community(CommunityNode("M", "Group", "All three", ["N0", "N1", "N2"]))
+    cg.add_communities_bulk([CommunityNode("M", "Group", "Two", ["N0", "N1"])], replace_members=True)
+    assert cg.memberships["N2"] == [] and cg.members["M"] == ["N0", "N1"]
+    cg.delete_communities(["M"])
+    assert "M" not in cg.communities and cg.get_communities_for(["N0", "N1"]) == []
+
+
+def test_fresh_detector_resumes_from_written_communities():
+    cg = _cliques([5, 5, 5, 5])
+    llm = FakeLLMInterface(responder=lambda prompt: "A tight cluster.")
+    first = CommunityDetector(cg, llm=llm, levels=1)
+    first.detect()
+    first.write()
+    assert llm.calls == 4
+
+    # A new process keeps the ids and summaries of unchanged communities
+    rerun = CommunityDetector(cg, llm=llm, levels=1)
+    rerun.detect()
+    assert rerun.write() == {"communities": 4, "changed": 0, "removed": 0, "unchanged": 4}
+    assert llm.calls == 4 and set(rerun.communities()) == set(first.communities())
+
+    # Merging the cliques pairwise leaves two communities; the stale ones are deleted
+    cg.add_triplets_bulk(ContextEdge(f"N{a}", "LINKS", f"N{b}") for lo in (0, 10)
+                         for a in range(lo, lo + 5) for b in range(lo + 5, lo + 10))
+    cg.add_community(CommunityNode("M", "Curated", "Not ours", ["N0"]))
+    merged = CommunityDetector(cg, llm=llm, levels=1)
+    merged.detect()
+    assert merged.write()["removed"] == 2
+    assert all(len(cg.memberships[f"N{i}"]) == 1 for i in range(1, 20))
+    assert len(cg.memberships["N0"]) == 2 and "M" in cg.memberships["N0"]
@@ -0,0 +1,66 @@
+import pickle
+import threading
+import pytest
+from graph import ContextGraph
+from models import (ContextNode, ContextEdge, EntityContext, RelationContext, CompactNode, CompactEdge, FrozenNode,
+                    FrozenEdge, DEFAULT_RELATION_CONTEXT, EMPTY_ENTITY_CONTEXT, EMPTY_DICT)
+from snapshot import load_snapshot, save_snapshot
+
+
+def test_compact_models_match_the_dataclasses():
+    node = ContextNode("Q937", "Albert Einstein", context=EntityContext(metadata={"description": "Physicist"}))
+    edge = ContextEdge("Q937", "WON", "Q38104", RelationContext(temporal={"year": 1921}, provenance=["Nobel"]))
+    for compact_node, compact_edge in ((CompactNode.from_node(node), CompactEdge.from_edge(edge)),
+                                       (FrozenNode.from_node(node), FrozenEdge.from_edge(edge))):
+        assert compact_node == node and compact_node.to_node() == node
+        assert compact_node.context.metadata == {"description": "Physicist"}
+        assert compact_edge == edge and compact_edge.to_edge() == edge
+        assert compact_edge.context.interval == (19210101, 19220101)
+        assert pickle.loads(pickle.dumps(compact_edge)) == compact_edge
+
+    # Empty contexts are not stored; every instance reads the same shared one
+    bare, plain = CompactNode("Q1", "Ulm"), CompactEdge("Q937", "BORN_IN", "Q1", RelationContext())
+    assert bare._context is None and bare.context is EMPTY_ENTITY_CONTEXT
+    assert plain._context is None and plain.context is DEFAULT_RELATION_CONTEXT
+    assert CompactEdge.from_edge(edge).relation is CompactEdge("Q1", "".join(["W", "ON"]), "Q2").relation
+    assert CompactEdge.from_edge(edge).context.details is EMPTY_DICT
+    with pytest.raises(AttributeError):
+        bare.extra = 1
+
+
+def test_frozen_models_are_immutable():
+    edge = FrozenEdge("Q937", "WON", "Q38104", RelationContext(temporal={"year": 1921}, provenance=["Nobel"]))
+    with pytest.raises(AttributeError):
+        edge.relation = "LOST"
+    with pytest.raises(AttributeError):
+        edge.context.confidence = 0.1
+    with pytest.raises(TypeError):
+        edge.context.provenance.append("Wikipedia")
+    with pytest.raises(TypeError):
+        edge.context.temporal["year"] = 1922
+    assert hash(edge) == hash(FrozenEdge("Q937", "WON", "Q38104"))
+
+
+def test_frozen_graph_shares_contexts(tmp_path):
+    cg = ContextGraph(frozen=True)
+    for i in range(4):
+        cg.add_node(ContextNode(f"E{i}", f"Entity {i}"))
+    cg.add_triplets_bulk(ContextEdge("E0", "CITES", f"E{i}", RelationContext(provenance=["arXiv"]))
+                         for i in range(1, 4))
+    contexts = {id(edge.context) for edge in cg.triplets.values()}
+    assert len(contexts) == 1 and len(cg._contexts) == 1
+    assert all(isinstance(node, FrozenNode) for node in cg.nodes.values())
+
+    # Concurrent readers see the same objects with no copying or locking
+    seen = []
+    readers = [threading.Thread(target=lambda: seen.append(cg.get_neighborhoods(["E0"])["triplets"]))
+               for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    assert all(len(rows) == 3 for rows in seen)
+
+    save_snapshot(cg, str(tmp_path / "snap"))
+    loaded = load_snapshot(str(tmp_path / "snap"))
+    assert loaded.get_relation_context("E0_CITES_E1")["provenance"] == ["arXiv"]
@@ -1,9 +1,9 @@
 import pytest
-from models import ContextNode, ContextEdge, EntityContext, RelationContext
+from models import ContextNode, ContextEdge, EntityContext, RelationContext, ChunkNode, CommunityNode
 from graph import ContextGraph
-from retriever import MockRetriever
-from ranker import MockRanker
-from reasoner import ContextReasoner
+from retriever import Neo4jRetriever
+from llm_util import LLMInterface
+from reasoner import MACERReasoner
 
 @pytest.fixture
 def sample_graph():
@@ -27,16 +27,95 @@ def test_graph_add_edge(sample_graph):
     assert edges[0].context.temporal == {"time": "now"}
 
 def test_retriever_entities(sample_graph):
-    retriever = MockRetriever(sample_graph)
-    entities = retriever.retrieve_topic_entities("Tell me about Entity1")
-    assert len(entities) == 1
-    assert entities[0].entity_id == "E1"
+    retriever = Neo4jRetriever(sample_graph)
+    entities = retriever.retrieve_entities_by_label("Tell me about Entity1")
+    assert entities == ["E1"]
+
+def test_label_index_ranking_and_limit():
+    cg = ContextGraph()
+    cg.add_node(ContextNode("Q937", "Albert Einstein"))
+    cg.add_node(ContextNode("Q38104", "Nobel Prize in Physics"))
+    cg.add_node(ContextNode("Q1", "Einstein"))
+    cg.add_node(ContextNode("Q2", "Einsteinium"))
+
+    assert [n.entity_id for n in cg.search_by_label("EINSTEIN")] == ["Q1", "Q2", "Q937"]
+    assert [n.entity_id for n in cg.search_by_label("einstein", limit=1)] == ["Q1"]
+    assert cg.find_entities_by_label("Tell me about Albert Einstein in 1921.")[0] == "Q937"
+    assert cg.find_entities_by_label("in the") == []
+
+    # Relabelling keeps the index in step with add_node
+    cg.add_node(ContextNode("Q2", "Element 99"))
+    assert "Q2" not in cg.find_entities_by_label("einstein")
+
+def test_reified_triplet_with_chunks_and_communities(sample_graph):
+    sample_graph.add_chunk(ChunkNode("C1", "Entity1 relates to Entity2."))
+    sample_graph.add_triplet_with_context(ContextEdge("E1", "cites", "E2"), chunk_ids=["C1", "missing"])
+    sample_graph.add_community(CommunityNode("M1", "Cluster", "Entities one and two.", entities=["E1", "E2"]))
+
+    rows = sample_graph.get_neighbors("E1")
+    assert [r['tr']['relation'] for r in rows] == ["relates_to", "cites"]
+    assert rows[0]['tr']['temporal_time'] == "now"
+    assert [c['id'] for c in rows[1]['chunks']] == ["C1"]
+    assert rows[1]['communities'][0]['summary'] == "Entities one and two."
+    assert sample_graph.get_relation_context("E1_cites_E2")['relation'] == "cites"
+
+def test_triplet_with_missing_entity_is_skipped(sample_graph):
+    sample_graph.add_triplet_with_context(ContextEdge("E1", "knows", "E404"))
+    assert len(sample_graph.get_outgoing_edges("E1")) == 1
 
 def test_reasoner_one_hop(sample_graph):
-    retriever = MockRetriever(sample_graph)
-    ranker = MockRanker()
-    reasoner = ContextReasoner(retriever, ranker, max_hops=1)
-    results = reasoner.reason("Tell me about Entity1")
-    assert len(results) == 1
-    assert results[0]['data']['relation'] == "relates_to"
-    assert results[0]['hop'] == 1
+    reasoner = MACERReasoner(sample_graph, LLMInterface(), max_iterations=1)
+    results = reasoner.reason("Entity1")
+    assert len(results["final_context"]) == 1
+    assert results["final_context"][0]['tr']['relation'] == "relates_to"
+    assert results["iterations"] == 1
+
+def test_reasoner_expands_only_the_new_frontier():
+    cg = ContextGraph()
+    for eid, label in [("A", "Alpha"), ("B", "Beta"), ("C", "Gamma")]:
+        cg.add_node(ContextNode(eid, label))
+    cg.add_triplet_with_context(ContextEdge("A", "KNOWS", "B"))
+    cg.add_triplet_with_context(ContextEdge("B", "KNOWS", "C"))
+
+    fetched = []
+    neighborhoods = cg.get_neighborhoods
+    cg.get_neighborhoods = lambda ids, **kw: fetched.extend(ids) or neighborhoods(ids, **kw)
+
+    results = MACERReasoner(cg, LLMInterface(), max_iterations=3).reason("Alpha friends")
+
+    # Each entity is expanded once even though "Alpha" is re-linked on every iteration
+    assert fetched == ["A", "B", "C"]
+    assert [c['tr']['id'] for c in results["final_context"]] == ["A_KNOWS_B", "B_KNOWS_C"]
+    stats = results["iteration_stats"]
+    assert [s["neighborhood_fetches"] for s in stats] == [1, 1, 1]
+    assert [s["neighborhood_cache_hits"] for s in stats] == [0, 1, 1]
+    assert [s["backend_calls_saved"] for s in stats] == [1, 2, 2]
+
+
+def test_get_neighborhoods_batches_k_hops():
+    cg = ContextGraph()
+    for eid in ["A", "B", "C", "D", "E"]:
+        cg.add_node(ContextNode(eid, eid))
+    cg.add_chunk(ChunkNode("c1", "A knows B"))
+    cg.add_community(CommunityNode("m1", "Group", "A and B", ["A", "B"]))
+    cg.add_triplet_with_context(ContextEdge("A", "KNOWS", "B"), chunk_ids=["c1"])
+    cg.add_triplet_with_context(ContextEdge("A", "KNOWS", "E"))
+    cg.add_triplet_with_context(ContextEdge("B", "KNOWS", "C"))
+    cg.add_triplet_with_context(ContextEdge("C", "KNOWS", "D"))
+    cg.add_triplet_with_context(ContextEdge("E", "KNOWS", "A"))
+
+    one_hop = cg.get_neighborhoods(["A", "B"], k=1)
+    assert [r['tr']['id'] for r in one_hop["triplets"]] == ["A_KNOWS_B", "A_KNOWS_E", "B_KNOWS_C"]
+
+    two_hop = cg.get_neighborhoods(["A"], k=2)
+    # The E -> A back edge is returned once; A itself is not expanded again
+    assert [(r['tr']['id'], r['hop']) for r in two_hop["triplets"]] == [
+        ("A_KNOWS_B", 1), ("A_KNOWS_E", 1), ("B_KNOWS_C", 2), ("E_KNOWS_A", 2)]
+    assert [c['id'] for c in two_hop["chunks"]["A_KNOWS_B"]] == ["c1"]
+    assert set(two_hop["communities"]) == {"A", "B"}
+
+    capped = cg.get_neighborhoods(["A"], k=3, per_hop_limit=1)
+    assert [r['tr']['id'] for r in capped["triplets"]] == ["A_KNOWS_B", "B_KNOWS_C", "C_KNOWS_D"]
+
+    rows = Neo4jRetriever(cg).get_k_hop_neighborhood("A", k=2)
+    assert len(rows) == 4 and rows[0]['chunks'][0]['id'] == "c1"
@@ -0,0 +1,67 @@
+from context_store import ContextStore, estimate_tokens
+from graph import ContextGraph
+from llm_util import FakeLLMInterface
+from macer_agents import ToG3Reflector, ToG3Responser
+from models import ContextNode, ContextEdge
+from graph_provider import neighborhood_rows
+
+
+def _row(head, relation, tail, chunks=(), communities=()):
+    return {"e": {"id": head, "label": head}, "tr": {"id": f"{head}_{relation}_{tail}", "relation": relation},
+            "tail": {"id": tail, "label": tail}, "chunks": list(chunks), "communities": list(communities)}
+
+
+def test_add_deduplicates_by_triplet_id():
+    store = ContextStore()
+    assert store.add(_row("Einstein", "BORN_IN", "Ulm"))
+    assert not store.add(_row("Einstein", "BORN_IN", "Ulm"))
+    assert store.add(_row("Einstein", "WORKED_AT", "Bern"))
+    assert len(store) == 2
+    assert [r["tr"]["id"] for r in store.rows()] == ["Einstein_BORN_IN_Ulm", "Einstein_WORKED_AT_Bern"]
+
+
+def test_contains_rescans_only_new_entries():
+    store = ContextStore()
+    store.add(_row("Einstein", "BORN_IN", "Ulm"))
+    assert not store.contains("Patent Office")
+    assert store._phrases["patent office"] == [1, False]
+    store.add(_row("Einstein", "WORKED_AT", "Bern", chunks=[{"id": "c1", "content": "Clerk at the patent office"}]))
+    assert store.contains("Patent Office")
+    assert store._phrases["patent office"] == [2, True]
+
+
+def test_pack_orders_by_relevance_and_respects_budget():
+    store = ContextStore()
+    summary = {"id": "m1", "label": "Physics", "summary": "Relativity and quantum theory"}
+    store.add(_row("Bohr", "BORN_IN", "Copenhagen"))
+    store.add(_row("Einstein", "BORN_IN", "Ulm", chunks=[{"id": "c1", "content": "Einstein was born in Ulm"}],
+                   communities=[summary]))
+    store.add(_row("Einstein", "WORKED_AT", "Bern", communities=[summary]))
+
+    packed = store.pack("Where was Einstein born")
+    lines = packed.splitlines()
+    assert lines[0] == "- (Einstein, BORN_IN, Ulm)"
+    assert lines[1] == "  Evidence: Einstein was born in Ulm"
+    assert sum("Community Physics" in line for line in lines) == 1
+    assert lines[-1] == "- (Bohr, BORN_IN, Copenhagen)"
+
+    budget = estimate_tokens(lines[0]) + estimate_tokens(lines[1])
+    assert store.pack("Where was Einstein born", token_budget=budget).splitlines() == lines[:2]
+
+
+def test_agents_use_store():
+    cg = ContextGraph()
+    cg.add_node(ContextNode("E1", "Einstein"))
+    cg.add_node(ContextNode("U1", "Ulm"))
+    cg.add_triplet_with_context(ContextEdge("E1", "BORN_IN", "U1"))
+    store = ContextStore()
+    assert ToG3Reflector(None).reflect("Einstein", store)[0] is False
+    for row in neighborhood_rows(cg.get_neighborhoods(["E1"])):
+        store.add(row)
+    assert ToG3Reflector(None).reflect("Einstein", store) == (True, None)
+
+    prompts = []
+    responser = ToG3Responser(FakeLLMInterface(responder=lambda p: prompts.append(p) or "Ulm"), token_budget=64)
+    assert responser.generate_final_answer("Einstein", store) == "Ulm"
+    assert "- (Einstein, BORN_IN, Ulm)" in prompts[0]
+    assert ToG3Responser.best_effort_answer(store) == "Ulm"
@@ -0,0 +1,121 @@
+import json
+import pytest
+from graph import ContextGraph
+import ingest as ingest_module
+from ingest import ingest
+
+
+def _write_jsonl(path, records):
+    with open(path, "w") as f:
+        for record in records:
+            f.write((record if isinstance(record, str) else json.dumps(record)) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def files(tmp_path):
+    entities = _write_jsonl(tmp_path / "entities.jsonl", [
+        {"id": f"E{i}", "label": f"Entity {i}", "metadata": {"description": f"Number {i}"}} for i in range(10)
+    ] + ["not json", {"label": "No id"}])
+    chunks = tmp_path / "chunks.csv"
+    chunks.write_text('id,content,metadata\nC1,"Einstein won, in 1921.","{""source"": ""wiki""}"\n\nC2,,\n')
+    quadruples = tmp_path / "quadruples.csv"
+    quadruples.write_text("head,relation,tail,confidence,provenance,chunk_ids,temporal_year,prop_category\n"
+                          "E0,WON,E1,0.9,Nobel Foundation|Wikipedia,C1,1921,Physics\n"
+                          "E1,NEXT,E2,,,,,\n"
+                          "E2,NEXT,E3,2.0,,,,\n")
+    communities = _write_jsonl(tmp_path / "communities.jsonl", [
+        {"id": "M1", "label": "Prizes", "summary": "Prize facts", "entities": ["E0", "E1"], "level": 1}
+    ])
+    return {"entities": entities, "chunks": str(chunks), "quadruples": str(quadruples), "communities": communities}
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_ingest_parses_jsonl_and_csv(files, tmp_path, workers):
+    cg = ContextGraph()
+    report = ingest(cg, files, workers=workers, block_size=4, rejects_path=str(tmp_path / "rejects.jsonl"))
+    layers = report["layers"]
+    assert [(layers[l]["records"], layers[l]["rejected"]) for l in ("entities", "chunks", "quadruples", "communities")] \
+        == [(10, 2), (1, 1), (2, 1), (1, 0)]
+    assert set(layers["entities"]["rows_per_sec"]) == {"read", "parse", "write", "total"}
+
+    rc = cg.get_relation_context("E0_WON_E1")
+    assert rc["confidence"] == 0.9 and rc["provenance"] == ["Nobel Foundation", "Wikipedia"]
+    assert rc["temporal_year"] == 1921 and rc["prop_category"] == "Physics"
+    assert [c["id"] for c in cg.get_triplet_chunks("E0_WON_E1")] == ["C1"]
+    assert cg.chunks["C1"].metadata == {"source": "wiki"}
+    assert cg.get_communities_for(["E1"])[0]["level"] == 1
+
+    rejects = [json.loads(line) for line in open(tmp_path / "rejects.jsonl")]
+    assert [(r["layer"], r["record"]) for r in rejects] == [("entities", 10), ("entities", 11), ("chunks", 1),
+                                                             ("quadruples", 2)]
+
+
+class _Crash(Exception):
+    pass
+
+
+def test_ingest_resumes_from_checkpoint(tmp_path):
+    source = _write_jsonl(tmp_path / "entities.jsonl", [{"id": f"E{i}", "label": f"E {i}"} for i in range(25)])
+    checkpoint = str(tmp_path / "load.ckpt")
+    cg = ContextGraph()
+    # The graph object survives the simulated crash, standing in for a persistent backend
+    cg.persistent = True
+    written = []
+    add_entities_bulk = cg.add_entities_bulk
+
+    def crash_on_third(nodes, batch_size=None):
+        if len(written) == 2:
+            raise _Crash()
+        written.append([n.entity_id for n in nodes])
+        return add_entities_bulk(nodes, batch_size)
+
+    cg.add_entities_bulk = crash_on_third
+    with pytest.raises(_Crash):
+        ingest(cg, {"entities": source}, workers=0, block_size=5, batch_size=5, checkpoint_path=checkpoint)
+    assert json.load(open(checkpoint))["entities"]["records"] == 10
+
+    cg.add_entities_bulk = add_entities_bulk
+    report = ingest(cg, {"entities": source}, workers=0, block_size=5, batch_size=5, checkpoint_path=checkpoint)
+    assert report["layers"]["entities"]["resumed_from"] == 10
+    assert report["layers"]["entities"]["records"] == 15
+    assert len(cg.nodes) == 25
+
+    # A finished file is skipped on the next run
+    assert ingest(cg, {"entities": source}, workers=0, checkpoint_path=checkpoint)["layers"]["entities"]["skipped"]
+
+
+def test_final_partial_batch_checkpoints_the_end_of_the_file(tmp_path, monkeypatch):
+    source = _write_jsonl(tmp_path / "entities.jsonl", [{"id": f"E{i}", "label": f"E {i}"} for i in range(12)])
+    checkpoint = str(tmp_path / "load.ckpt")
+    cg = ContextGraph()
+    cg.persistent = True
+    update = ingest_module.Checkpoint.update
+
+    def crash_before_done(self, layer, entry):
+        if entry["done"]:
+            raise _Crash()
+        update(self, layer, entry)
+
+    monkeypatch.setattr(ingest_module.Checkpoint, "update", crash_before_done)
+    with pytest.raises(_Crash):
+        ingest(cg, {"entities": source}, workers=0, block_size=5, batch_size=10, checkpoint_path=checkpoint)
+    # The last two records went out in the final partial batch; the checkpoint covers them
+    entry = json.load(open(checkpoint))["entities"]
+    assert entry["records"] == 12 and entry["offset"] == (tmp_path / "entities.jsonl").stat().st_size
+
+
+def test_fractional_community_level_is_rejected(tmp_path):
+    source = _write_jsonl(tmp_path / "communities.jsonl", [{"id": "M1", "entities": [], "level": 1.5},
+                                                          {"id": "M2", "entities": [], "level": 2.0}])
+    cg = ContextGraph()
+    report = ingest(cg, {"communities": source}, workers=0, rejects_path=str(tmp_path / "rejects.jsonl"))
+    assert (report["layers"]["communities"]["records"], report["layers"]["communities"]["rejected"]) == (1, 1)
+    assert "integer" in json.loads(open(tmp_path / "rejects.jsonl").readline())["error"]
+    assert cg.communities["M2"].level == 2
+
+
+def test_checkpoint_needs_a_persistent_backend(tmp_path):
+    source = _write_jsonl(tmp_path / "entities.jsonl", [{"id": "E0", "label": "E 0"}])
+    with pytest.raises(ValueError, match="persistent"):
+        ingest(ContextGraph(), {"entities": source}, workers=0, checkpoint_path=str(tmp_path / "load.ckpt"))
@@ -0,0 +1,98 @@
+import json
+import pytest
+from models import ContextNode, ContextEdge
+from graph import ContextGraph
+from llm_util import FakeLLMInterface
+from llm_cache import CachedLLMInterface
+from reasoner import MACERReasoner
+from instrumentation import Instrumentation, JSONLinesExporter, PrometheusExporter, configure, instrumentation
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+        self.flushed = 0
+
+    def export_span(self, span):
+        self.spans.append(span)
+
+    def flush(self, instrumentation):
+        self.flushed += 1
+
+
+@pytest.fixture
+def enabled():
+    exporter = ListExporter()
+    instrumentation.reset()
+    configure(enabled=True, exporters=[exporter])
+    yield exporter
+    configure(enabled=False)
+    instrumentation.reset()
+
+
+def test_disabled_instrumentation_is_a_no_op():
+    inst = Instrumentation()
+    with inst.span("a") as outer, inst.span("b"):
+        outer.set(x=1)
+        inst.count("calls")
+    assert inst.span("a") is inst.span("b")
+    assert inst.counters == {} and inst.histograms == {}
+
+
+def test_spans_nest_and_export(tmp_path):
+    trace = tmp_path / "trace.jsonl"
+    inst = Instrumentation(enabled=True, exporters=[JSONLinesExporter(str(trace)), PrometheusExporter(str(tmp_path / "m.prom"))])
+    with inst.span("outer", query="q"):
+        with inst.span("inner"):
+            inst.count("rows", 3, backend="memory")
+        inst.count("rows", 2, backend="memory")
+    inst.flush()
+
+    inner, outer = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert inner["parent_id"] == outer["span_id"] and inner["trace_id"] == outer["trace_id"]
+    assert outer["parent_id"] is None and outer["attrs"] == {"query": "q"}
+    assert inst.counter("rows", backend="memory") == 5
+    text = (tmp_path / "m.prom").read_text()
+    assert 'macer_rows{backend="memory"} 5' in text
+    assert 'macer_stage_seconds_count{stage="inner"} 1' in text
+    assert 'macer_stage_seconds_bucket{stage="outer",le="+Inf"} 1' in text
+
+
+def test_reasoner_emits_stage_spans_and_counters(enabled):
+    cg = ContextGraph()
+    cg.add_node(ContextNode("A", "Alpha"))
+    cg.add_node(ContextNode("B", "Beta"))
+    cg.add_triplet_with_context(ContextEdge("A", "KNOWS", "B"))
+    llm = FakeLLMInterface(responder=lambda p: "Beta")
+
+    MACERReasoner(cg, llm).reason("Alpha")
+
+    names = [s["name"] for s in enabled.spans]
+    assert names == ["macer.link", "macer.evolve_subgraph", "macer.rerank", "macer.reflect", "macer.iteration",
+                     "macer.answer", "macer.reason"]
+    root = enabled.spans[-1]
+    assert all(s["trace_id"] == root["span_id"] for s in enabled.spans)
+    assert instrumentation.counter("llm_calls_total", backend="FakeLLMInterface") == llm.calls
+    assert instrumentation.counter("llm_prompt_chars_total", backend="FakeLLMInterface") == sum(map(len, llm.prompts))
+    assert instrumentation.counter("backend_round_trips_total", backend="memory") == cg.round_trips
+
+    # Single adds are one round trip each, as on Neo4j
+    before = cg.round_trips
+    cg.add_entity(ContextNode("C", "Gamma"))
+    assert cg.round_trips == before + 1 and "C" in cg.nodes
+
+
+def test_llm_calls_are_counted_once_and_cache_hits_are_not(enabled):
+    llm = FakeLLMInterface()
+    llm.generate("direct")
+    llm.generate_many(["a", "b"])
+    list(llm.stream("streamed"))
+    assert instrumentation.counter("llm_calls_total", backend="FakeLLMInterface") == llm.calls == 4
+
+    cached = CachedLLMInterface(llm)
+    cached.generate("direct")
+    cached.generate("direct")
+    cached.generate_many(["direct", "b"])
+    assert instrumentation.counter("llm_calls_total", backend="FakeLLMInterface") == llm.calls
+    assert instrumentation.counter("llm_calls_total", backend="CachedLLMInterface") == 0
+    assert instrumentation.counter("llm_cache_lookups_total", result="memory_hit") == 2
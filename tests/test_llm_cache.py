@@ -0,0 +1,54 @@
+from llm_util import LLMInterface
+from llm_cache import LLMCache, CachedLLMInterface
+
+
+class CountingLLM(LLMInterface):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def _generate(self, prompt: str) -> str:
+        self.calls += 1
+        return f"answer:{prompt}"
+
+
+def test_memory_tier_hits_and_model_params_in_key():
+    backend = CountingLLM()
+    llm = CachedLLMInterface(backend, LLMCache())
+    assert llm.generate("p1") == "answer:p1"
+    assert llm.generate("p1") == "answer:p1"
+    assert backend.calls == 1
+
+    other = CachedLLMInterface(CountingLLM(temperature=0.7), llm.cache)
+    other.generate("p1")
+    assert other.backend.calls == 1
+    stats = llm.cache.stats()
+    assert (stats["memory_hits"], stats["misses"]) == (1, 2)
+
+
+def test_lru_size_and_ttl_eviction(monkeypatch):
+    cache = LLMCache(max_entries=2)
+    for k in ("a", "b", "c"):
+        cache.put(k, k)
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+    now = [1000.0]
+    monkeypatch.setattr("llm_cache.time.time", lambda: now[0])
+    ttl_cache = LLMCache(ttl=10)
+    ttl_cache.put("k", "v")
+    now[0] += 11
+    assert ttl_cache.get("k") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    backend = CountingLLM()
+    first = CachedLLMInterface(backend, LLMCache(path=path))
+    first.generate("prompt")
+    first.cache.close()
+
+    second = CachedLLMInterface(backend, LLMCache(path=path))
+    assert second.generate("prompt") == "answer:prompt"
+    assert backend.calls == 1
+    assert second.cache.stats()["disk_hits"] == 1
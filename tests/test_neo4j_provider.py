@@ -0,0 +1,234 @@
+import pytest
+from neo4j.exceptions import AuthError, ClientError, ServiceUnavailable, SessionExpired
+import neo4j_provider
+from neo4j_provider import Neo4jContextGraph
+from models import ChunkNode, ContextEdge, ContextNode, RelationContext, entity_properties
+
+
+class FakeRecord:
+    def __init__(self, row):
+        self.row = row
+
+    def data(self):
+        return dict(self.row)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def data(self):
+        return [dict(row) for row in self.rows]
+
+    def consume(self):
+        return None
+
+    def __iter__(self):
+        return (FakeRecord(row) for row in self.rows)
+
+
+class FakeTx:
+    def __init__(self, session, mode):
+        self.session, self.mode = session, mode
+
+    def run(self, cypher, parameters=None, **kwargs):
+        return self.session.driver.respond(self.mode, cypher, dict(parameters or {}, **kwargs))
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+        self.closed = False
+
+    def run(self, cypher, parameters=None, **kwargs):
+        return self.driver.respond("auto", cypher, dict(parameters or {}, **kwargs))
+
+    def execute_read(self, work):
+        return work(FakeTx(self, "read"))
+
+    def execute_write(self, work):
+        return work(FakeTx(self, "write"))
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeDriver:
+    """Records every statement as (mode, cypher, parameters); `responder` supplies the rows."""
+
+    def __init__(self, responder=None):
+        self.responder = responder or (lambda mode, cypher, params: [])
+        self.sessions, self.calls = [], []
+
+    def session(self):
+        self.sessions.append(FakeSession(self))
+        return self.sessions[-1]
+
+    def respond(self, mode, cypher, params):
+        self.calls.append((mode, cypher, params))
+        result = self.responder(mode, cypher, params)
+        return result if isinstance(result, FakeResult) else FakeResult(result)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    def make(responder=None, **kwargs):
+        driver = FakeDriver(responder)
+        monkeypatch.setattr(neo4j_provider.GraphDatabase, "driver", lambda *args, **kw: driver)
+        kwargs.setdefault("retry_backoff", 0.0)
+        return Neo4jContextGraph("bolt://fake", "neo4j", "pass", **kwargs), driver
+    return make
+
+
+def test_construction_does_not_contact_the_server(fake_provider):
+    provider, driver = fake_provider()
+    assert driver.calls == [] and provider.vector_index_supported is None
+
+
+def test_vector_index_scores_are_mapped_back_to_cosine(fake_provider):
+    def responder(mode, cypher, params):
+        if cypher.startswith("SHOW INDEXES"):
+            return [{"state": "ONLINE"}]
+        if "queryNodes" in cypher:
+            # Index scores are (1 + cos) / 2: cos 0.8, 0.0 and -0.2
+            return [{"c": {"id": "C1", "content": "a", "metadata": "{}"}, "score": 0.9},
+                    {"c": {"id": "C2", "content": "b", "metadata": "{}"}, "score": 0.5},
+                    {"c": {"id": "C3", "content": "c", "metadata": "{}"}, "score": 0.4}]
+        return []
+
+    provider, _ = fake_provider(responder)
+    hits = provider.search_chunks_vector("photoelectric")
+    assert provider.vector_index_supported is True
+    assert [hit["c"]["id"] for hit in hits] == ["C1"] and hits[0]["score"] == pytest.approx(0.8)
+
+
+def test_chunk_writes_skip_the_unsearched_local_index(fake_provider):
+    provider, driver = fake_provider()
+    provider.add_chunks_bulk([ChunkNode("C1", "photoelectric effect")])
+    # Unsynced: the first local search rebuilds it from the stored chunks
+    assert len(provider.chunk_index) == 0 and driver.calls[-1][2]["rows"][0]["embedding"]
+
+    provider._chunk_index_synced = True
+    provider.add_chunks_bulk([ChunkNode("C2", "relativity")])
+    assert len(provider.chunk_index) == 1
+    provider.vector_index_supported = True
+    provider.add_chunks_bulk([ChunkNode("C3", "quanta")])
+    assert len(provider.chunk_index) == 1
+
+
+def test_auth_errors_are_not_cached_as_missing_vector_support(fake_provider):
+    def refuse(mode, cypher, params):
+        raise AuthError("The client is unauthorized due to authentication failure.")
+
+    provider, _ = fake_provider(refuse)
+    with pytest.raises(AuthError):
+        provider.search_chunks_vector("photoelectric")
+    assert provider.vector_index_supported is None
+
+    def unknown_type(mode, cypher, params):
+        if cypher.startswith("SHOW INDEXES"):
+            raise ClientError("Invalid input 'VECTOR'")
+        return []
+
+    provider, _ = fake_provider(unknown_type)
+    provider._chunk_index_synced = True
+    assert provider.search_chunks_vector("photoelectric") == []
+    assert provider.vector_index_supported is False
+
+
+def test_bulk_writes_are_unwound_in_batches(fake_provider):
+    provider, driver = fake_provider(batch_size=2)
+    nodes = [ContextNode(f"E{i}", f"Entity {i}") for i in range(5)]
+    stats = provider.add_entities_bulk(nodes)
+
+    writes = [call for call in driver.calls if call[0] == "write"]
+    assert [len(params["rows"]) for _, _, params in writes] == [2, 2, 1]
+    assert all("UNWIND $rows AS row" in cypher for _, cypher, _ in writes)
+    assert [row for _, _, params in writes for row in params["rows"]] == [entity_properties(n) for n in nodes]
+    assert [(s["batch"], s["rows"]) for s in stats] == [(0, 2), (1, 2), (2, 1)]
+    # One session for the whole load, one transaction (round trip) and generation bump per batch
+    assert len(driver.sessions) == 1 and driver.sessions[0].closed
+    assert provider.round_trips == 3 and provider.generation == 3
+
+    edge = ContextEdge("E0", "KNOWS", "E1", RelationContext(temporal={"year": 1921}))
+    stats = provider.add_triplets_bulk([(edge, ["C1"]), ContextEdge("E1", "KNOWS", "E2")], batch_size=10)
+    rows = driver.calls[-1][2]["rows"]
+    assert len(stats) == 1 and stats[0]["rows"] == 2
+    assert rows[0]["tid"] == "E0_KNOWS_E1" and rows[0]["chunk_ids"] == ["C1"] and rows[1]["chunk_ids"] == []
+    assert (rows[0]["props"]["valid_from"], rows[0]["props"]["valid_to"]) == (19210101, 19220101)
+    # Undated triplets send explicit nulls so a re-write clears stale bounds
+    assert rows[1]["props"]["valid_from"] is None and "valid_to" in rows[1]["props"]
+    assert provider.add_entities_bulk([]) == [] and provider.generation == 4
+
+
+def test_session_scope_reuses_one_session_per_thread(fake_provider):
+    provider, driver = fake_provider()
+    with provider.session_scope() as outer:
+        provider.query("RETURN 1")
+        provider.execute_read("RETURN 2")
+        with provider.session_scope() as inner:
+            provider.execute_write("RETURN 3")
+        assert inner is outer and not outer.closed
+    assert driver.sessions == [outer] and outer.closed
+
+    # Outside a scope every call gets a short-lived session of its own
+    provider.query("RETURN 1")
+    provider.execute_read("RETURN 2")
+    assert len(driver.sessions) == 3 and all(session.closed for session in driver.sessions)
+
+
+def test_reads_and_writes_route_to_their_transaction_functions(fake_provider):
+    provider, driver = fake_provider(lambda mode, cypher, params: [{"mode": mode}])
+    assert provider.execute_read("MATCH (n) RETURN n", {"x": 1}) == [{"mode": "read"}]
+    assert provider.execute_write("CREATE (n)") == [{"mode": "write"}]
+    assert provider.query("RETURN 1") == [{"mode": "auto"}]
+    assert driver.calls[0] == ("read", "MATCH (n) RETURN n", {"x": 1})
+
+
+def test_connection_loss_is_retried_with_backoff(fake_provider, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(neo4j_provider.time, "sleep", sleeps.append)
+    failures = [ServiceUnavailable("down"), SessionExpired("expired")]
+
+    def flaky(mode, cypher, params):
+        if failures:
+            raise failures.pop(0)
+        return [{"ok": True}]
+
+    provider, driver = fake_provider(flaky, max_retries=2, retry_backoff=0.1)
+    assert provider.execute_read("RETURN 1") == [{"ok": True}]
+    assert sleeps == [0.1, 0.2] and provider.round_trips == 3 and len(driver.calls) == 3
+
+    def down(mode, cypher, params):
+        raise ServiceUnavailable("down")
+
+    provider, driver = fake_provider(down, max_retries=2, retry_backoff=0.1)
+    sleeps.clear()
+    with pytest.raises(ServiceUnavailable):
+        provider.execute_write("CREATE (n)")
+    assert sleeps == [0.1, 0.2] and len(driver.calls) == 3
+
+
+def test_query_iter_streams_records(fake_provider):
+    pulled = []
+
+    def rows():
+        for i in range(1000):
+            pulled.append(i)
+            yield {"i": i}
+
+    provider, _ = fake_provider(lambda mode, cypher, params: FakeResult(rows()))
+    stream = provider.query_iter("MATCH (n) RETURN n")
+    assert pulled == []
+    assert [next(stream), next(stream)] == [{"i": 0}, {"i": 1}]
+    assert len(pulled) == 2
+    stream.close()
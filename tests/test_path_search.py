@@ -0,0 +1,52 @@
+import pytest
+from models import ContextNode, ContextEdge, ChunkNode, CommunityNode
+from graph import ContextGraph
+from path_search import PathFinder, format_path
+
+
+@pytest.fixture
+def chain_graph():
+    # A -WON-> B -AWARDED_BY-> C <-MEMBER_OF- D, plus a hub H linked to everything
+    cg = ContextGraph()
+    for eid in ["A", "B", "C", "D", "H"]:
+        cg.add_node(ContextNode(eid, f"Entity {eid}"))
+    cg.add_triplet_with_context(ContextEdge("A", "WON", "B"))
+    cg.add_triplet_with_context(ContextEdge("B", "AWARDED_BY", "C"))
+    cg.add_triplet_with_context(ContextEdge("D", "MEMBER_OF", "C"))
+    for i in range(200):
+        cg.add_node(ContextNode(f"L{i}", f"Leaf {i}"))
+        cg.add_triplet_with_context(ContextEdge("H", "LINKS", f"L{i}"))
+    # Chunks and communities shared by A and D must not create shortcuts
+    cg.add_chunk(ChunkNode("C1", "A and D"))
+    cg.add_community(CommunityNode("M1", "Both", "A and D", entities=["A", "D"]))
+    return cg
+
+
+def test_paths_are_triples_and_respect_direction(chain_graph):
+    paths = PathFinder(chain_graph, max_hops=3).find("A", "D")
+    assert len(paths) == 1
+    assert format_path(paths[0]) == "(Entity A, WON, Entity B) -> (Entity B, AWARDED_BY, Entity C) -> (Entity D, MEMBER_OF, Entity C)"
+
+
+def test_max_hops_is_honoured(chain_graph):
+    assert PathFinder(chain_graph, max_hops=2).find("A", "D") == []
+    assert len(PathFinder(chain_graph, max_hops=2).find("A", "C")[0]) == 2
+
+
+def test_fanout_and_path_limits(chain_graph):
+    for i in range(10):
+        chain_graph.add_node(ContextNode(f"M{i}", f"Middle {i}"))
+        chain_graph.add_triplet_with_context(ContextEdge("A", "KNOWS", f"M{i}"))
+        chain_graph.add_triplet_with_context(ContextEdge(f"M{i}", "KNOWS", "D"))
+    assert len(PathFinder(chain_graph, max_hops=2, max_paths=3).find("A", "D")) == 3
+
+    # The hub only exposes `fanout` hops, so leaves past the cap are unreachable
+    capped = PathFinder(chain_graph, max_hops=1, fanout=10)
+    assert capped.find("H", "L5") != []
+    assert capped.find("H", "L150") == []
+
+
+def test_find_many_shares_the_forward_search(chain_graph):
+    found = PathFinder(chain_graph, max_hops=3).find_many("A", ["B", "C", "D", "A"])
+    assert [len(found[t][0]) for t in ["B", "C", "D"]] == [1, 2, 3]
+    assert found["A"] == []
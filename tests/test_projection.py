@@ -0,0 +1,50 @@
+import json
+from graph import ContextGraph
+from models import ContextNode, ContextEdge, EntityContext, RelationContext, ChunkNode
+from projection import REASONING, Projection, cypher_map, jsonable
+from retriever import Neo4jRetriever
+
+
+def _graph():
+    cg = ContextGraph()
+    cg.add_chunk(ChunkNode("C1", "Einstein won the 1921 prize.", {"source": "wiki"}))
+    cg.add_node(ContextNode("Q937", "Albert Einstein", context=EntityContext(
+        attributes={"born": 1879}, metadata={"description": "Physicist"})))
+    cg.add_node(ContextNode("Q38104", "Nobel Prize in Physics", context=EntityContext(
+        metadata={"description": "Yearly award"})))
+    cg.add_triplet_with_context(ContextEdge("Q937", "WON", "Q38104", RelationContext(
+        temporal={"year": 1921}, provenance=["Nobel Foundation"], details={"category": "Physics"})), ["C1"])
+    return cg
+
+
+def test_records_decode_json_fields_lazily():
+    entity = _graph().get_entity("Q937")
+    assert entity._decoded == {}
+    assert entity["metadata"] == {"description": "Physicist"}
+    assert entity._decoded == {"metadata": {"description": "Physicist"}}
+    assert entity.context.attributes == {"born": 1879}
+    assert entity.raw["metadata"] == json.dumps({"description": "Physicist"})
+
+    rc = _graph().get_relation_context("Q937_WON_Q38104")
+    assert rc["provenance"] == ["Nobel Foundation"]
+    assert rc.context == RelationContext(temporal={"year": 1921}, provenance=["Nobel Foundation"],
+                                         details={"category": "Physics"})
+    assert json.loads(json.dumps({"tr": rc}, default=jsonable))["tr"]["provenance"] == ["Nobel Foundation"]
+
+
+def test_projection_limits_returned_fields():
+    cg = _graph()
+    assert dict(cg.get_entity("Q937", fields=("id", "label"))) == {"id": "Q937", "label": "Albert Einstein"}
+
+    row = Neo4jRetriever(cg).get_neighborhoods(["Q937"])["triplets"][0]
+    assert set(row["e"]) == set(REASONING.head) and set(row["tail"]) == set(REASONING.tail)
+    assert row["tail"].context.metadata == {"description": "Yearly award"}
+    assert row["tr"]["temporal_year"] == 1921
+
+    full = cg.get_neighborhoods(["Q937"], projection=Projection())["triplets"][0]
+    assert set(full["e"]) == {"id", "label", "attributes", "metadata", "external_links"}
+
+
+def test_cypher_map():
+    assert cypher_map("row.e", ("id", "label")) == "{id: row.e.id, label: row.e.label}"
+    assert cypher_map("tr", None) == "properties(tr)"
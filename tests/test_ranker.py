@@ -0,0 +1,130 @@
+import asyncio
+import time
+import pytest
+from models import ContextNode, ContextEdge
+from graph import ContextGraph
+from retriever import Neo4jRetriever
+from llm_util import FakeLLMInterface
+from ranker import LLMRanker
+
+
+@pytest.fixture
+def hub_graph():
+    cg = ContextGraph()
+    cg.add_node(ContextNode("H", "Hub"))
+    for i in range(20):
+        cg.add_node(ContextNode(f"T{i}", f"Tail {i}"))
+        cg.add_triplet_with_context(ContextEdge("H", "RELATED_TO", f"T{i}"))
+    return cg
+
+
+def candidates(n=20):
+    return [{"id": f"T{i}", "name": f"Tail {i}", "description": ""} for i in range(n)]
+
+
+def test_rerank_scores_candidates_concurrently(hub_graph):
+    llm = FakeLLMInterface(latency=0.05, max_in_flight=40,
+                           responder=lambda p: "Y" if "Tail 7)" in p else "N")
+    ranker = LLMRanker(llm, Neo4jRetriever(hub_graph))
+
+    started = time.perf_counter()
+    ranked = ranker.rerank("hub", "H", candidates())
+    elapsed = time.perf_counter() - started
+
+    assert llm.calls == 40
+    assert ranked[0]['id'] == "T7"
+    # 40 serial calls would take 2s; concurrent dispatch needs roughly one round trip
+    assert elapsed < 1.0
+
+
+def test_max_in_flight_bounds_concurrency():
+    llm = FakeLLMInterface(latency=0.05, max_in_flight=4)
+    started = time.perf_counter()
+    assert llm.generate_many([str(i) for i in range(8)]) == ["Y"] * 8
+    assert time.perf_counter() - started >= 0.1
+
+
+def test_timeouts_are_retried_with_backoff():
+    delays = iter([1.0, 0.0])
+    llm = FakeLLMInterface(latency=lambda: next(delays), timeout=0.05, max_retries=1, retry_backoff=0.01)
+    assert asyncio.run(llm.agenerate("p")) == "Y"
+
+    slow = FakeLLMInterface(latency=1.0, timeout=0.05, max_retries=0)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(slow.agenerate("p"))
+
+
+def test_parse_ranking_is_robust():
+    assert LLMRanker.parse_ranking("The final order: [3, 1, 2]", 3) == [2, 0, 1]
+    assert LLMRanker.parse_ranking("Sure! the FINAL ORDER: [2] > [9] > [2]", 3) == [1, 0, 2]
+    assert LLMRanker.parse_ranking("no idea", 2) == [0, 1]
+
+
+def listwise_responder(prompt):
+    # Rank the window by the tail number embedded in each candidate name, highest first
+    lines = [l for l in prompt.splitlines() if l.startswith("[")]
+    numbers = [int(l.split("Tail ")[1].split(":")[0]) for l in lines]
+    order = sorted(range(len(numbers)), key=lambda i: -numbers[i])
+    return "The final order: [" + ", ".join(str(i + 1) for i in order) + "]"
+
+
+def test_listwise_mode_uses_few_windowed_calls(hub_graph):
+    llm = FakeLLMInterface(responder=listwise_responder)
+    ranker = LLMRanker(llm, Neo4jRetriever(hub_graph), mode="listwise", window_size=10, step=5)
+    ranked = ranker.rerank("hub", "H", candidates())
+
+    # Windows [10, 20), [5, 15), [0, 10): the top-5 is exact after one back-to-front pass
+    assert [c['id'] for c in ranked[:5]] == ["T19", "T18", "T17", "T16", "T15"]
+    assert ranker.call_counts == {"pointwise": 0, "listwise": 3}
+
+    pointwise = LLMRanker(FakeLLMInterface(), Neo4jRetriever(hub_graph))
+    pointwise.rerank("hub", "H", candidates())
+    assert pointwise.call_counts == {"pointwise": 40, "listwise": 0}
+
+
+def test_listwise_windows_are_validated_and_retried(hub_graph):
+    for window_size, step in ((10, 0), (0, 5), (10, -1)):
+        with pytest.raises(ValueError):
+            LLMRanker(FakeLLMInterface(), Neo4jRetriever(hub_graph), mode="listwise",
+                      window_size=window_size, step=step)
+
+    # The first window times out once and is retried, like any other dispatched call
+    delays = iter([1.0] + [0.0] * 10)
+    llm = FakeLLMInterface(latency=lambda: next(delays), responder=listwise_responder, timeout=0.05,
+                           max_retries=1, retry_backoff=0.01)
+    ranker = LLMRanker(llm, Neo4jRetriever(hub_graph), mode="listwise", window_size=10, step=5)
+    ranked = ranker.rerank("hub", "H", candidates())
+    assert [c['id'] for c in ranked[:5]] == ["T19", "T18", "T17", "T16", "T15"]
+    assert ranker.call_counts["listwise"] == 3
+
+
+def test_prepare_hoists_fewshot_and_batches_paths(hub_graph, monkeypatch):
+    calls = {"fewshot": 0, "paths": 0}
+    fewshot, paths = hub_graph.get_fewshot_triples, hub_graph.expand_entities
+
+    def counting_fewshot(*args, **kwargs):
+        calls["fewshot"] += 1
+        return fewshot(*args, **kwargs)
+
+    def counting_paths(*args, **kwargs):
+        calls["paths"] += 1
+        return paths(*args, **kwargs)
+
+    monkeypatch.setattr(hub_graph, "get_fewshot_triples", counting_fewshot)
+    monkeypatch.setattr(hub_graph, "expand_entities", counting_paths)
+    ranker = LLMRanker(FakeLLMInterface(), Neo4jRetriever(hub_graph))
+
+    ctx = ranker.prepare("hub", "H", candidates())
+    # One batched expansion per BFS level (max_hops=3) serves all 20 candidates
+    assert calls == {"fewshot": 2, "paths": 3}
+    assert ctx.reasoning_paths["T3"] == "(Hub, RELATED_TO, Tail 3)"
+    assert len(ranker.score(ctx)) == 20
+
+    ranker.rerank("hub", "H", candidates())
+    assert calls == {"fewshot": 2, "paths": 6}
+
+    # Any write invalidates the cached few-shot block
+    hub_graph.add_node(ContextNode("T99", "Tail 99"))
+    hub_graph.add_triplet_with_context(ContextEdge("T99", "RELATED_TO", "H"))
+    ranker.rerank("hub", "H", candidates())
+    assert calls == {"fewshot": 4, "paths": 9}
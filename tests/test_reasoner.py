@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+import pytest
+from models import ContextNode, ContextEdge
+from graph import ContextGraph
+from llm_util import FakeLLMInterface
+from reasoner import (MACERReasoner, EntitiesLinked, CandidatesRanked, ReflectionVerdict, QueryEvolved,
+                      AnswerToken, FinalAnswer)
+
+
+@pytest.fixture
+def chain_graph():
+    cg = ContextGraph()
+    for eid, label in [("A", "Alpha"), ("B", "Beta"), ("C", "Gamma")]:
+        cg.add_node(ContextNode(eid, label))
+    cg.add_triplet_with_context(ContextEdge("A", "KNOWS", "B"))
+    cg.add_triplet_with_context(ContextEdge("B", "KNOWS", "C"))
+    return cg
+
+
+def test_reason_stream_yields_typed_events(chain_graph):
+    reasoner = MACERReasoner(chain_graph, FakeLLMInterface(responder=lambda p: "Beta"))
+    events = list(reasoner.reason_stream("Alpha"))
+
+    assert [type(e) for e in events] == [EntitiesLinked, CandidatesRanked, ReflectionVerdict, AnswerToken, FinalAnswer]
+    assert events[0].entity_ids == ["A"]
+    assert events[1].selected['tr']['id'] == "A_KNOWS_B"
+    assert events[2].sufficient
+    final = events[-1]
+    assert final.answer == "Beta" and final.stopped is None
+    assert final.result() == MACERReasoner(chain_graph, FakeLLMInterface(responder=lambda p: "Beta")).reason("Alpha")
+
+
+def test_reason_stream_reports_query_evolution(chain_graph):
+    events = list(MACERReasoner(chain_graph, FakeLLMInterface(), max_iterations=2).reason_stream("Nobody"))
+    evolved = [e for e in events if isinstance(e, QueryEvolved)]
+    # Only the evolution that iteration 2 runs; the one after the last iteration is not announced
+    assert [e.iteration for e in evolved] == [2]
+    assert isinstance(events[-1], FinalAnswer) and events[-1].answer is None
+
+
+def test_cancel_stops_before_the_next_llm_call(chain_graph):
+    llm = FakeLLMInterface()
+    cancel = threading.Event()
+    events = []
+    for event in MACERReasoner(chain_graph, llm).reason_stream("Alpha", cancel=cancel):
+        events.append(event)
+        if isinstance(event, EntitiesLinked):
+            cancel.set()
+
+    assert [type(e) for e in events] == [EntitiesLinked, FinalAnswer]
+    assert events[-1].stopped == "cancelled"
+    assert llm.calls == 0
+
+
+def test_deadline_returns_best_answer_so_far(chain_graph):
+    llm = FakeLLMInterface(latency=0.2, responder=lambda p: "Y")
+    final = list(MACERReasoner(chain_graph, llm).reason_stream("Alpha", deadline=0.1))[-1]
+
+    # Ranking ran past the budget, so the run ends without the synthesis call
+    assert final.stopped == "deadline"
+    assert final.answer == "Beta"
+    assert not any("Final Answer:" in p for p in llm.prompts)
+
+
+def test_deadline_passing_during_the_last_token_keeps_the_full_answer(chain_graph):
+    def slow_answer(prompt):
+        if "Final Answer:" in prompt:
+            time.sleep(0.3)
+        return "Beta"
+
+    final = list(MACERReasoner(chain_graph, FakeLLMInterface(responder=slow_answer)).reason_stream(
+        "Alpha", deadline=0.2))[-1]
+    assert final.stopped is None and final.answer == "Beta"
+
+
+def test_async_stream_and_early_exit(chain_graph):
+    reasoner = MACERReasoner(chain_graph, FakeLLMInterface(responder=lambda p: "Beta"))
+
+    async def collect():
+        return [event async for event in reasoner.areason_stream("Alpha")]
+
+    events = asyncio.run(collect())
+    assert isinstance(events[-1], FinalAnswer) and events[-1].answer == "Beta"
+
+    llm = FakeLLMInterface(latency=0.05)
+    slow = MACERReasoner(chain_graph, llm)
+
+    async def first_event():
+        async for event in slow.areason_stream("Alpha"):
+            return event
+
+    assert isinstance(asyncio.run(first_event()), EntitiesLinked)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import pytest
+from models import ContextNode, ContextEdge
+from graph import ContextGraph
+from llm_util import FakeLLMInterface
+from server import QueryService, QueryServer, LatencyWindow, ServiceOverloaded
+
+
+@pytest.fixture
+def graph():
+    cg = ContextGraph()
+    for eid, label in [("A", "Alpha"), ("B", "Beta"), ("C", "Gamma"), ("D", "Delta")]:
+        cg.add_node(ContextNode(eid, label))
+    cg.add_triplet_with_context(ContextEdge("A", "KNOWS", "B"))
+    cg.add_triplet_with_context(ContextEdge("C", "KNOWS", "D"))
+    return cg
+
+
+def test_identical_inflight_queries_are_coalesced(graph):
+    llm = FakeLLMInterface(latency=0.05, responder=lambda p: "Beta")
+    service = QueryService(graph, llm, workers=4)
+
+    async def burst():
+        return await asyncio.gather(*[service.reason(q) for q in ["Alpha"] * 5 + ["Gamma"]])
+
+    results = asyncio.run(burst())
+    service.close()
+
+    assert all(r is results[0] for r in results[:5])
+    assert results[0]["answer"] == "Beta"
+    stats = service.stats()
+    assert stats["executions"] == 2 and stats["coalesced"] == 4 and stats["requests"] == 6
+    assert stats["queue_depth"] == 0 and stats["running"] == 0
+    assert stats["latency_seconds"]["p50"] > 0
+
+
+def test_worker_pool_bounds_concurrency_and_sheds_load(graph):
+    service = QueryService(graph, FakeLLMInterface(latency=0.05), workers=1, max_queue=1)
+
+    async def burst():
+        return await asyncio.gather(service.reason("Alpha"), service.reason("Gamma"), service.reason("Delta"),
+                                    return_exceptions=True)
+
+    results = asyncio.run(burst())
+    service.close()
+
+    # One query runs, one waits, the third finds the queue full
+    assert isinstance(results[2], ServiceOverloaded)
+    assert service.stats()["rejected"] == 1 and service.stats()["executions"] == 2
+
+
+def test_latency_percentiles_use_nearest_rank():
+    window = LatencyWindow()
+    for ms in range(1, 101):
+        window.record(ms / 1000)
+    assert window.percentiles() == {"p50": 0.05, "p95": 0.095, "p99": 0.099}
+
+
+async def raw(port, data, close_write=True):
+    """Sends raw request bytes (optionally half-closing) and returns the response status."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    if close_write:
+        writer.write_eof()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def http(port, method, path, payload=None, content_length=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    length = len(body) if content_length is None else content_length
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {length}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    response = await reader.read()
+    writer.close()
+    return int(status_line.split()[1]), json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+
+def test_http_endpoints(graph):
+    service = QueryService(graph, FakeLLMInterface(responder=lambda p: "Beta"))
+
+    async def session():
+        server = QueryServer(service, port=0)
+        await server.start()
+        try:
+            return [await http(server.port, "POST", "/query", {"query": "Alpha"}),
+                    await http(server.port, "POST", "/query", {"nope": 1}),
+                    await http(server.port, "GET", "/stats"),
+                    await http(server.port, "GET", "/missing")]
+        finally:
+            await server.close()
+
+    (status, result), (bad, _), (_, stats), (missing, _) = asyncio.run(session())
+    service.close()
+    assert status == 200 and result["answer"] == "Beta"
+    assert result["final_context"][0]["tr"]["id"] == "A_KNOWS_B"
+    assert bad == 400 and missing == 404
+    assert stats["requests"] == 1
+
+
+def test_malformed_requests_are_rejected_with_400(graph):
+    service = QueryService(graph, FakeLLMInterface(responder=lambda p: "Beta"))
+
+    async def session():
+        server = QueryServer(service, port=0, max_body_bytes=1000, read_timeout=0.3)
+        await server.start()
+        try:
+            framing = [await raw(server.port, b"POST /query HTTP/1.1\r\nContent-Length: 10000000000\r\n\r\n"),
+                       await raw(server.port, b"POST /query HTTP/1.1\r\nContent-Length: 50\r\n\r\n{}"),
+                       await raw(server.port, b"POST /query HTTP/1.1\r\nX-Long: " + b"x" * 70000 + b"\r\n\r\n"),
+                       # Idle clients are answered once the read timeout passes
+                       await raw(server.port, b"POST /query HTTP/1.1\r\nContent-Length: 50\r\n\r\n{",
+                                 close_write=False),
+                       await raw(server.port, b"", close_write=False)]
+            return framing, [await http(server.port, "POST", "/query", {"query": "Alpha"}, content_length="ten"),
+                    await http(server.port, "POST", "/query", {"query": "Alpha"}, content_length=-1),
+                    await http(server.port, "POST", "/query", {"query": "Alpha", "deadline": "soon"}),
+                    await http(server.port, "POST", "/query", {"query": "Alpha", "deadline": [1]}),
+                    await http(server.port, "POST", "/query", {"query": "Alpha", "deadline": True}),
+                    await http(server.port, "POST", "/query", {"query": ["Alpha"]}),
+                    await http(server.port, "POST", "/query", {"query": "Alpha", "deadline": 5})]
+        finally:
+            await server.close()
+
+    framing, responses = asyncio.run(session())
+    service.close()
+    assert framing == [413, 400, 400, 408, 408]
+    assert [status for status, _ in responses] == [400] * 6 + [200]
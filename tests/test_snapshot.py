@@ -0,0 +1,72 @@
+import pytest
+from graph import ContextGraph
+from models import ContextNode, ContextEdge, EntityContext, RelationContext, ChunkNode, CommunityNode
+from snapshot import Snapshot, load_snapshot, save_snapshot
+
+
+@pytest.fixture
+def graph():
+    cg = ContextGraph()
+    cg.add_chunk(ChunkNode("C1", "Einstein won the Nobel Prize in Physics.", {"source": "wiki"}))
+    cg.add_node(ContextNode("Q_937", "Albert Einstein", context=EntityContext(metadata={"description": "Physicist"})))
+    cg.add_node(ContextNode("Q38104", "Nobel Prize in Physics"))
+    cg.add_node(ContextNode("Q_1", "Ulm"))
+    cg.add_triplet_with_context(ContextEdge("Q_937", "WON", "Q38104", RelationContext(
+        temporal={"year": 1921}, provenance=["Nobel Foundation"], details={"category": "Physics"})), ["C1"])
+    cg.add_triplet_with_context(ContextEdge("Q_937", "BORN_IN", "Q_1"))
+    cg.add_community(CommunityNode("M1", "Physics", "Physics prizes", ["Q_937", "Q38104"], level=1))
+    return cg
+
+
+def test_snapshot_round_trip(graph, tmp_path):
+    manifest = save_snapshot(graph, str(tmp_path))
+    assert (manifest["entities"], manifest["edges"], manifest["chunks"]) == (3, 2, 1)
+    loaded = load_snapshot(str(tmp_path))
+
+    assert loaded.get_neighborhoods(["Q_937"], k=2) == graph.get_neighborhoods(["Q_937"], k=2)
+    assert loaded.get_relation_context("Q_937_WON_Q38104") == graph.get_relation_context("Q_937_WON_Q38104")
+    assert loaded.get_entity("Q_937") == graph.get_entity("Q_937")
+    assert loaded.get_incoming_edges("Q_1") == graph.get_incoming_edges("Q_1")
+    assert loaded.find_entities_by_label("einstein") == ["Q_937"]
+    assert loaded.search_chunks_vector("Nobel Prize", 1) == graph.search_chunks_vector("Nobel Prize", 1)
+    assert loaded.get_communities_for(["Q38104"]) == graph.get_communities_for(["Q38104"])
+    assert sorted(loaded.iter_entity_edges()) == sorted(graph.iter_entity_edges())
+
+
+def test_snapshot_is_memory_mapped_and_lazy(graph, tmp_path):
+    save_snapshot(graph, str(tmp_path))
+    snapshot = Snapshot(str(tmp_path))
+    assert not snapshot.edge_head.flags.writeable
+    assert snapshot.entity_ids.find("Q_937") is not None and snapshot.entity_ids.find("Q_9") is None
+    assert snapshot.find_triplet("Q_937_BORN_IN_Q_1") is not None
+
+    loaded = load_snapshot(str(tmp_path))
+    assert loaded.snapshot._edges == {}
+    loaded.get_neighbors("Q38104")
+    assert loaded.snapshot._edges == {}
+    loaded.get_neighbors("Q_937")
+    assert len(loaded.snapshot._edges) == 2
+
+    # Full scans and id lookups decode without growing the cache
+    fresh = load_snapshot(str(tmp_path))
+    assert len(list(fresh.triplets.values())) == len(graph.triplets) and "Q_937_BORN_IN_Q_1" in fresh.triplets
+    assert fresh.snapshot._edges == {}
+
+
+def test_snapshot_graph_accepts_writes(graph, tmp_path):
+    save_snapshot(graph, str(tmp_path))
+    loaded = load_snapshot(str(tmp_path))
+    loaded.add_node(ContextNode("Q2", "Hermann Einstein"))
+    loaded.add_triplet_with_context(ContextEdge("Q2", "PARENT_OF", "Q_937"))
+    loaded.add_triplet_with_context(ContextEdge("Q_937", "BORN_IN", "Q_1", RelationContext(confidence=0.5)))
+
+    assert len(loaded.nodes) == 4 and len(loaded.triplets) == 3
+    assert loaded.get_relation_context("Q_937_BORN_IN_Q_1")["confidence"] == 0.5
+    assert [e.head for e in loaded.get_incoming_edges("Q_937")] == ["Q2"]
+    assert set(loaded.find_entities_by_label("einstein")) == {"Q_937", "Q2"}
+
+    # Re-saving a snapshot-backed graph keeps the in-memory changes
+    save_snapshot(loaded, str(tmp_path / "again"))
+    again = load_snapshot(str(tmp_path / "again"))
+    assert again.get_relation_context("Q_937_BORN_IN_Q_1")["confidence"] == 0.5
+    assert len(again.triplets) == 3
@@ -0,0 +1,110 @@
+import random
+import pytest
+from graph import ContextGraph
+from llm_util import FakeLLMInterface
+from models import ContextNode, ContextEdge, RelationContext, triplet_properties, edge_from_properties
+from reasoner import MACERReasoner
+from temporal import IntervalIndex, TimeWindow, interval_of, time_span
+
+
+def test_intervals_are_normalized_day_codes():
+    assert time_span(1921) == (19210101, 19220101)
+    assert time_span("1921-12") == (19211201, 19220101)
+    assert time_span("1921-11-09T10:00:00") == (19211109, 19211110)
+    assert time_span("now") is None
+    assert interval_of({"year": 1921, "announced": 1922}) == (19210101, 19230101)
+    assert interval_of({"start": "2010", "end": "2012"}) == (20100101, 20130101)
+    assert interval_of({"since": 1990}) == (19900101, None)
+    assert interval_of({"time": "now"}) == (None, None)
+    assert interval_of({"year": 1921}, valid_from="1921-06-01") == (19210601, 19220101)
+    assert TimeWindow.parse("1921..1925") == TimeWindow(19210101, 19260101)
+    assert TimeWindow.parse("..1930").start is None
+    assert TimeWindow.from_query("What did Einstein win in 1921?") == TimeWindow(19210101, 19220101)
+    assert TimeWindow.from_query("Nobel laureates 1921\u20131925") == TimeWindow(19210101, 19260101)
+    assert TimeWindow.from_query("Born on 14 March 1879 in Ulm") == TimeWindow(18790101, 18800101)
+    assert TimeWindow.from_query("Prizes between 1921 and 1930") == TimeWindow(19210101, 19310101)
+    # Numbers without year context are not years
+    assert TimeWindow.from_query("Einstein top 1500 results") is None
+    assert TimeWindow.from_query("Why does Einstein lookup give error 1404?") is None
+    with pytest.raises(ValueError):
+        TimeWindow.parse("soon")
+
+
+def test_triplet_properties_round_trip_interval():
+    edge = ContextEdge("A", "HELD", "B", RelationContext(temporal={"start": 1990}, valid_to="1999-06"))
+    props = triplet_properties(edge)
+    assert (props["valid_from"], props["valid_to"]) == (19900101, 19990701)
+    assert edge_from_properties("A", "B", props).context.interval == (19900101, 19990701)
+    plain = ContextEdge("A", "WON", "B", RelationContext(temporal={"year": 1921}))
+    assert edge_from_properties("A", "B", triplet_properties(plain)).context == plain.context
+
+
+def test_interval_index_matches_a_scan():
+    rng = random.Random(7)
+    index, intervals = IntervalIndex(rebuild_threshold=64), {}
+    for key in range(2000):
+        start = rng.randint(1800, 2000) * 10000 + 101
+        interval = (None if rng.random() < 0.1 else start, None if rng.random() < 0.1 else start + rng.randint(1, 30) * 10000)
+        index.add(key, interval)
+        intervals[key] = interval
+    for key in range(0, 2000, 7):
+        index.discard(key)
+        intervals.pop(key)
+    for key in range(1, 300, 5):
+        index.add(key, (19210101, 19210102))
+        intervals[key] = (19210101, 19210102)
+    for window in (TimeWindow(19210101, 19220101), TimeWindow(None, 18100101), TimeWindow(19900101, None)):
+        expected = {k for k, v in intervals.items() if v != (None, None) and window.overlaps(v)}
+        found = index.overlapping(window.start, window.end)
+        assert len(found) == len(set(found)) and set(found) == expected
+
+
+def _career():
+    cg = ContextGraph()
+    for eid, label in [("Q937", "Albert Einstein"), ("P", "Prussian Academy"), ("N", "Nobel Prize"),
+                       ("I", "Institute for Advanced Study"), ("U", "Ulm")]:
+        cg.add_node(ContextNode(eid, label))
+    cg.add_triplets_bulk([
+        ContextEdge("Q937", "MEMBER_OF", "P", RelationContext(temporal={"start": 1914, "end": 1933})),
+        ContextEdge("Q937", "WON", "N", RelationContext(temporal={"year": 1921})),
+        ContextEdge("Q937", "MEMBER_OF", "I", RelationContext(temporal={"start": 1933, "end": 1955})),
+        ContextEdge("Q937", "BORN_IN", "U"),
+    ])
+    return cg
+
+
+def test_window_is_pushed_into_neighborhood_fetches():
+    cg = _career()
+    in_1921 = {row["tail"]["id"] for row in cg.get_neighbors("Q937", window=TimeWindow.parse("1921"))}
+    assert in_1921 == {"P", "N", "U"}
+    dated_only = TimeWindow.parse("1921", include_undated=False)
+    assert {r["tail"]["id"] for r in cg.get_neighbors("Q937", window=dated_only)} == {"P", "N"}
+    # The per-hop limit applies to in-window triplets only
+    rows = cg.get_neighborhoods(["Q937"], per_hop_limit=1, window=TimeWindow.parse("1940"))["triplets"]
+    assert [r["tail"]["id"] for r in rows] == ["I"]
+
+    assert cg.find_triplets_in_window(TimeWindow.parse("1921..1933")) == ["Q937_MEMBER_OF_P", "Q937_WON_N",
+                                                                         "Q937_MEMBER_OF_I"]
+    cg.add_triplet_with_context(ContextEdge("Q937", "WON", "N", RelationContext(temporal={"year": 1922})))
+    assert cg.find_triplets_in_window(TimeWindow.parse("1921")) == ["Q937_MEMBER_OF_P"]
+
+
+def test_macer_loop_applies_the_query_window():
+    cg = _career()
+    reasoner = MACERReasoner(cg, FakeLLMInterface(), max_iterations=1, time_window="auto")
+    result = reasoner.reason("Albert Einstein in 1940")
+    tails = {row["tail"]["id"] for row in result["final_context"]}
+    assert tails and tails <= {"I", "U"}
+
+
+def test_windowed_neighborhoods_decode_only_visited_snapshot_edges(tmp_path):
+    from snapshot import load_snapshot, save_snapshot
+    cg = _career()
+    for i in range(20):
+        cg.add_node(ContextNode(f"X{i}", f"Other {i}"))
+        cg.add_triplet_with_context(ContextEdge(f"X{i}", "MET", "U", RelationContext(temporal={"year": 1900 + i})))
+    save_snapshot(cg, str(tmp_path / "snap"))
+    loaded = load_snapshot(str(tmp_path / "snap"))
+    rows = loaded.get_neighbors("Q937", window=TimeWindow.parse("1921"))
+    assert {row["tail"]["id"] for row in rows} == {"P", "N", "U"}
+    assert len(loaded.snapshot._edges) == 4
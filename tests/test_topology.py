@@ -0,0 +1,123 @@
+import random
+import threading
+import numpy as np
+import pytest
+from graph import ContextGraph
+from models import ContextNode, ContextEdge
+from topology import TopologyIndex
+from snapshot import load_snapshot, save_snapshot
+
+
+def _random_graph(n=300, m=1500, seed=5):
+    rng = random.Random(seed)
+    cg = ContextGraph()
+    cg.add_entities_bulk(ContextNode(f"E{i}", f"Entity {i}") for i in range(n))
+    cg.add_triplets_bulk(ContextEdge(f"E{rng.randrange(n)}", f"R{rng.randrange(5)}", f"E{rng.randrange(n)}")
+                         for _ in range(m))
+    return cg, rng
+
+
+def _check_against_lists(cg):
+    topo = cg.topology
+    for eid in random.Random(1).sample(list(cg.nodes), 40):
+        node = topo.encode([eid])
+        assert set(topo.decode(topo.neighbors(node))) == {e.tail for e in cg.edges[eid]}
+        assert set(topo.decode(topo.in_neighbors(node))) == {e.head for e in cg._in_edges[eid]}
+        assert topo.out_degree[node[0]] == len(cg.edges[eid]) and topo.in_degree[node[0]] == len(cg._in_edges[eid])
+        _, _, positions = topo.edges(node, relations=topo.relation_codes(["R1"]))
+        assert sorted(topo.triplet_ids(positions)) == sorted(
+            f"{eid}_R1_{e.tail}" for e in cg.edges[eid] if e.relation == "R1")
+
+
+def test_csr_matches_adjacency_lists_after_merges():
+    cg, rng = _random_graph()
+    _check_against_lists(cg)
+    # A small batch is merged into the existing rows, a large one triggers a rebuild
+    topo = cg.topology
+    cg.add_node(ContextNode("NEW", "New entity"))
+    cg.add_triplets_bulk([ContextEdge("NEW", "R0", "E1"), ContextEdge("E2", "R9", "NEW")])
+    # Re-adding an existing triplet only replaces its context
+    cg.add_triplet_with_context(next(iter(cg.triplets.values())))
+    _check_against_lists(cg)
+    assert len(topo) == len(cg.triplets) and cg.topology is topo
+    cg.add_triplets_bulk(ContextEdge(f"E{rng.randrange(300)}", "R7", f"E{rng.randrange(300)}") for _ in range(2000))
+    _check_against_lists(cg)
+    assert len(topo) == len(cg.triplets)
+
+
+def test_k_hop_matches_breadth_first_search():
+    cg, _ = _random_graph(n=500, m=900)
+    topo = cg.topology
+    for direction in ("out", "in", "both"):
+        nodes, hops = topo.k_hop(topo.encode(["E0", "E1"]), 3, direction=direction)
+        expected, frontier = {"E0": 0, "E1": 0}, ["E0", "E1"]
+        for hop in range(1, 4):
+            nxt = []
+            for eid in frontier:
+                ends = ([e.tail for e in cg.edges[eid]] if direction != "in" else []) + \
+                       ([e.head for e in cg._in_edges[eid]] if direction != "out" else [])
+                for other in ends:
+                    if other not in expected:
+                        expected[other] = hop
+                        nxt.append(other)
+            frontier = nxt
+        assert dict(zip(topo.decode(nodes), hops.tolist())) == expected
+        assert len(nodes) == len(np.unique(nodes))
+    with pytest.raises(ValueError):
+        topo.k_hop(topo.encode(["E0"]), 1, direction="sideways")
+
+
+def test_topology_of_a_snapshot_graph(tmp_path):
+    cg, _ = _random_graph(n=50, m=200)
+    save_snapshot(cg, str(tmp_path / "snap"))
+    loaded = load_snapshot(str(tmp_path / "snap"))
+    topo = loaded.topology
+    assert np.array_equal(np.sort(topo.out_degree), np.sort(cg.topology.out_degree))
+    _check_against_lists(loaded)
+
+
+def test_snapshot_topology_comes_from_columns_and_serves_string_lookups(tmp_path):
+    cg, _ = _random_graph(n=60, m=240)
+    save_snapshot(cg, str(tmp_path / "snap"))
+    loaded = load_snapshot(str(tmp_path / "snap"))
+    loaded.add_node(ContextNode("NEW", "New entity"))
+    loaded.add_triplet_with_context(ContextEdge("NEW", "R0", "E1"))
+    decoded = len(loaded.snapshot._edges)
+    triples = set(loaded.iter_entity_edges())
+    assert triples == {(e.head, e.relation, e.tail) for e in cg.triplets.values()} | {("NEW", "R0", "E1")}
+    # Building the index and listing the hops decoded no further Relation Contexts
+    assert len(loaded.snapshot._edges) == decoded
+
+    assert loaded.in_neighbors(["E1"]) == sorted({e.head for e in loaded.get_incoming_edges("E1")},
+                                                 key=loaded.topology.index.get)
+    assert set(loaded.neighbors(["E0", "E3"], relations=["R1"])) == {
+        e.tail for eid in ("E0", "E3") for e in cg.edges[eid] if e.relation == "R1"}
+    hops = loaded.k_hop(["NEW"], 2, direction="both")
+    assert hops["NEW"] == 0 and hops["E1"] == 1
+
+
+def test_concurrent_writes_and_reads_lose_no_edges():
+    topo = TopologyIndex.build([f"E{i}" for i in range(50)], [ContextEdge("E0", "R0", "E1")])
+    writers_done, errors = threading.Event(), []
+
+    def write(offset):
+        for i in range(2000):
+            topo.add_edge(f"E{(offset + i) % 50}", f"R{i % 3}", f"W{offset}_{i}")
+
+    def read():
+        while not writers_done.is_set():
+            csr = topo.forward()
+            if csr.indptr[-1] != csr.order.size or csr.indptr.size > len(topo.ids) + 1:
+                errors.append(csr)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    writers = [threading.Thread(target=write, args=(k,)) for k in range(4)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    writers_done.set()
+    for thread in readers:
+        thread.join()
+    assert not errors
+    assert len(topo) == 8001 and topo.out_degree.sum() == 8001 and topo.in_degree.sum() == 8001
@@ -23,3 +23,36 @@ def test_chunk_retrieval(provider):
     
     assert len(results) == 1
     assert "photoelectric" in results[0]['c']['content']
+
+def test_in_memory_chunk_retrieval_is_scored():
+    from graph import ContextGraph
+    graph = ContextGraph()
+    graph.add_chunk(ChunkNode("C1", "The law of the photoelectric effect was discovered by Einstein."))
+    graph.add_chunk(ChunkNode("C2", "The Royal Swedish Academy awards the prize every year."))
+
+    results = Neo4jRetriever(graph).search_chunks("photoelectric effect")
+    assert [r['c']['id'] for r in results] == ["C1"]
+    assert 0 < results[0]['score'] <= 1.0
+
+def test_vector_index_topk_ivf_and_mmap(tmp_path):
+    import numpy as np
+    from embeddings import VectorIndex
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(500, 32)).astype(np.float32)
+    index = VectorIndex(32, capacity=8)
+    index.add_many([f"v{i}" for i in range(500)], vectors)
+
+    query = vectors[42] + 0.01 * rng.normal(size=32)
+    exact = index.search(query, k=5)
+    assert exact[0][0] == "v42"
+    assert [s for _, s in exact] == sorted([s for _, s in exact], reverse=True)
+
+    index.build_ivf(n_lists=16)
+    assert index.search(query, k=1, n_probe=4)[0][0] == "v42"
+
+    index.save(str(tmp_path / "chunks"))
+    mapped = VectorIndex.load(str(tmp_path / "chunks"))
+    assert isinstance(mapped.vectors, np.memmap)
+    assert mapped.search(query, k=5) == exact
+    mapped.add("extra", vectors[0])
+    assert len(mapped) == 501
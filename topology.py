@@ -0,0 +1,238 @@
+import threading
+from array import array
+from collections import namedtuple
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from models import ContextEdge
+
+
+def row_positions(indptr: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions in `indices` of every entry of the given CSR rows, plus each row's length."""
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(int(lengths.sum())), lengths
+
+
+# One direction of the index: the edges of entity i are order[indptr[i]:indptr[i + 1]] (edge positions),
+# with the entity at the other end and the relation code of each alongside. Swapped as a whole on merge.
+Csr = namedtuple("Csr", ["indptr", "order", "others", "relations"])
+
+
+def _csr(keys: np.ndarray, others: np.ndarray, relations: np.ndarray, n: int) -> Csr:
+    order = np.argsort(keys, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=indptr[1:])
+    return Csr(indptr, order, others[order], relations[order])
+
+
+def _merge_into(csr: Csr, n: int, first: int, keys: np.ndarray, others: np.ndarray, relations: np.ndarray) -> Csr:
+    """`csr` plus edges at positions first, first + 1, ...: each new edge goes at the end of its row."""
+    indptr = np.concatenate([csr.indptr, np.full(n + 1 - csr.indptr.size, csr.indptr[-1])])
+    new = np.argsort(keys, kind="stable")
+    at = indptr[keys[new] + 1]
+    indptr[1:] += np.cumsum(np.bincount(keys, minlength=n))
+    return Csr(indptr, np.insert(csr.order, at, new + first), np.insert(csr.others, at, others[new]),
+               np.insert(csr.relations, at, relations[new]))
+
+
+class TopologyIndex:
+    """
+    Compressed-sparse-row index of the Entity–Triplet–Entity topology, both directions: entities
+    and relations are dense int codes, every triplet is a position in the edge_head/edge_relation/
+    edge_tail columns, and `out_degree`/`in_degree` come straight from the row pointers. Lookups
+    take and return int arrays, so neighbors, in_neighbors and k_hop expand whole frontiers per
+    NumPy call instead of per edge. Writes are buffered and folded in on the next read: a small
+    delta is merged into the existing rows, a large one (or the first) rebuilds the index.
+    """
+
+    def __init__(self, rebuild_fraction: float = 0.25):
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.relations: List[str] = []
+        self._relation_codes: Dict[str, int] = {}
+        self.rebuild_fraction = rebuild_fraction
+        self.edge_head = np.zeros(0, dtype=np.int32)
+        self.edge_relation = np.zeros(0, dtype=np.int32)
+        self.edge_tail = np.zeros(0, dtype=np.int32)
+        empty = Csr(np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                    np.zeros(0, dtype=np.int32))
+        self._out = self._in = empty
+        self._pending_head, self._pending_relation, self._pending_tail = array("i"), array("i"), array("i")
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, entity_ids: Iterable[str], edges: Iterable[ContextEdge], **kwargs) -> "TopologyIndex":
+        """Index over the given entities and the edges between them (e.g. a ContextGraph's nodes and triplets)."""
+        index = cls(**kwargs)
+        for entity_id in entity_ids:
+            index.add_node(entity_id)
+        for edge in edges:
+            index.add_edge(edge.head, edge.relation, edge.tail)
+        index._sync()
+        return index
+
+    @classmethod
+    def from_snapshot(cls, snapshot, **kwargs) -> "TopologyIndex":
+        """
+        Index over a snapshot's entities and triplets straight from its columns: the int codes and
+        CSR rows are already stored there, so only the id and relation strings are decoded.
+        """
+        index = cls(**kwargs)
+        index.ids = snapshot.entity_ids.strings()
+        index.index = {eid: i for i, eid in enumerate(index.ids)}
+        index.relations = list(snapshot.relations)
+        index._relation_codes = {r: i for i, r in enumerate(index.relations)}
+        index.edge_head = np.asarray(snapshot.edge_head, dtype=np.int32)
+        index.edge_relation = np.asarray(snapshot.edge_relation, dtype=np.int32)
+        index.edge_tail = np.asarray(snapshot.edge_tail, dtype=np.int32)
+        out_order = np.asarray(snapshot.out_order, dtype=np.int64)
+        in_order = np.asarray(snapshot.in_order, dtype=np.int64)
+        index._out = Csr(np.asarray(snapshot.out_indptr), out_order, index.edge_tail[out_order],
+                         index.edge_relation[out_order])
+        index._in = Csr(np.asarray(snapshot.in_indptr), in_order, index.edge_head[in_order],
+                        index.edge_relation[in_order])
+        return index
+
+    def __len__(self):
+        return self.edge_head.size + len(self._pending_head)
+
+    # --- writes (buffered) ---
+
+    def add_node(self, entity_id: str) -> int:
+        with self._lock:
+            return self._add_node(entity_id)
+
+    def _add_node(self, entity_id: str) -> int:
+        # Caller holds _lock
+        idx = self.index.get(entity_id)
+        if idx is None:
+            idx = self.index[entity_id] = len(self.ids)
+            self.ids.append(entity_id)
+        return idx
+
+    def add_edge(self, head: str, relation: str, tail: str):
+        """Appends a triplet; callers add each (head, relation, tail) once, as ContextGraph does."""
+        # Under the same lock as _sync, so an edge appended mid-merge is never swapped out unseen
+        with self._lock:
+            code = self._relation_codes.get(relation)
+            if code is None:
+                code = self._relation_codes[relation] = len(self.relations)
+                self.relations.append(relation)
+            self._pending_head.append(self._add_node(head))
+            self._pending_relation.append(code)
+            self._pending_tail.append(self._add_node(tail))
+
+    def _sync(self):
+        # The up-to-date check is under the lock too: a reader racing a merge waits for it
+        # instead of returning the rows from before it
+        with self._lock:
+            if not self._pending_head and self._out.indptr.size == len(self.ids) + 1:
+                return
+            n, first = len(self.ids), self.edge_head.size
+            heads = np.frombuffer(self._pending_head, dtype=np.int32).copy()
+            relations = np.frombuffer(self._pending_relation, dtype=np.int32).copy()
+            tails = np.frombuffer(self._pending_tail, dtype=np.int32).copy()
+            self._pending_head, self._pending_relation, self._pending_tail = array("i"), array("i"), array("i")
+            self.edge_head = np.concatenate([self.edge_head, heads])
+            self.edge_relation = np.concatenate([self.edge_relation, relations])
+            self.edge_tail = np.concatenate([self.edge_tail, tails])
+            if heads.size > self.rebuild_fraction * first:
+                self._out = _csr(self.edge_head, self.edge_tail, self.edge_relation, n)
+                self._in = _csr(self.edge_tail, self.edge_head, self.edge_relation, n)
+            else:
+                self._out = _merge_into(self._out, n, first, heads, tails, relations)
+                self._in = _merge_into(self._in, n, first, tails, heads, relations)
+
+    def forward(self) -> Csr:
+        self._sync()
+        return self._out
+
+    def reverse(self) -> Csr:
+        self._sync()
+        return self._in
+
+    # --- codes ---
+
+    def encode(self, entity_ids: Iterable[str]) -> np.ndarray:
+        """Entity codes of the given ids; unknown ids are left out."""
+        codes = [self.index[eid] for eid in entity_ids if eid in self.index]
+        return np.array(codes, dtype=np.int64)
+
+    def decode(self, nodes: np.ndarray) -> List[str]:
+        return [self.ids[i] for i in nodes.tolist()]
+
+    def relation_codes(self, relations: Iterable[str]) -> np.ndarray:
+        return np.array([self._relation_codes[r] for r in relations if r in self._relation_codes], dtype=np.int32)
+
+    def triples(self) -> Iterator[Tuple[str, str, str]]:
+        """Every indexed triplet as (head id, relation, tail id), in edge position order."""
+        self._sync()
+        for h, r, t in zip(self.edge_head.tolist(), self.edge_relation.tolist(), self.edge_tail.tolist()):
+            yield self.ids[h], self.relations[r], self.ids[t]
+
+    def triplet_ids(self, positions: np.ndarray) -> List[str]:
+        """Triplet ids ("head_RELATION_tail") of edge positions, for looking the edges up in ContextGraph.triplets."""
+        return [f"{self.ids[h]}_{self.relations[r]}_{self.ids[t]}" for h, r, t in
+                zip(self.edge_head[positions].tolist(), self.edge_relation[positions].tolist(),
+                    self.edge_tail[positions].tolist())]
+
+    # --- reads ---
+
+    @property
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.forward().indptr)
+
+    @property
+    def in_degree(self) -> np.ndarray:
+        return np.diff(self.reverse().indptr)
+
+    def edges(self, nodes: np.ndarray, incoming: bool = False,
+              relations: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(entity, entity at the other end, edge position) of every outgoing (or incoming) edge of `nodes`."""
+        csr = self.reverse() if incoming else self.forward()
+        nodes = np.asarray(nodes, dtype=np.int64)
+        positions, lengths = row_positions(csr.indptr, nodes)
+        sources, others, order = np.repeat(nodes, lengths), csr.others[positions], csr.order[positions]
+        if relations is not None:
+            keep = np.isin(csr.relations[positions], relations)
+            sources, others, order = sources[keep], others[keep], order[keep]
+        return sources, others, order
+
+    def neighbors(self, nodes: np.ndarray, relations: Optional[np.ndarray] = None) -> np.ndarray:
+        """Distinct tails of the outgoing edges of `nodes` (optionally only edges with the given relation codes)."""
+        return np.unique(self.edges(nodes, relations=relations)[1])
+
+    def in_neighbors(self, nodes: np.ndarray, relations: Optional[np.ndarray] = None) -> np.ndarray:
+        """Distinct heads of the incoming edges of `nodes`."""
+        return np.unique(self.edges(nodes, incoming=True, relations=relations)[1])
+
+    def k_hop(self, nodes: np.ndarray, k: int, direction: str = "out",
+              relations: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Breadth-first expansion from `nodes` up to `k` hops along outgoing ("out"), incoming ("in")
+        or either ("both") edges. Returns the entities reached and their hop distance (seeds at 0),
+        one frontier-wide lookup per hop.
+        """
+        if direction not in ("out", "in", "both"):
+            raise ValueError(f"Unknown direction: {direction!r}")
+        seen = np.zeros(len(self.ids), dtype=bool)
+        frontier = np.unique(np.asarray(nodes, dtype=np.int64))
+        seen[frontier] = True
+        reached, hops = [frontier], [np.zeros(frontier.size, dtype=np.int64)]
+        for hop in range(1, k + 1):
+            if not frontier.size:
+                break
+            parts = []
+            if direction in ("out", "both"):
+                parts.append(self.edges(frontier, relations=relations)[1])
+            if direction in ("in", "both"):
+                parts.append(self.edges(frontier, incoming=True, relations=relations)[1])
+            candidates = np.unique(np.concatenate(parts))
+            frontier = candidates[~seen[candidates]].astype(np.int64)
+            seen[frontier] = True
+            reached.append(frontier)
+            hops.append(np.full(frontier.size, hop, dtype=np.int64))
+        return np.concatenate(reached), np.concatenate(hops)